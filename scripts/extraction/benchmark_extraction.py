@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark extract_entities.py on a synthetic corpus.
+
+Measures per-call time for every extract_*, is_* and categorize_* function
+plus end-to-end messages/sec for process_messages, and saves the results as
+JSON. Pass --baseline to compare against a previous results file; the run
+exits non-zero when anything is slower than the baseline by more than
+--threshold.
+
+USAGE:
+  python3 scripts/extraction/benchmark_extraction.py --size 10000 -o bench.json
+  python3 scripts/extraction/benchmark_extraction.py --size 10000 --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import extract_entities
+from synthetic_corpus import write_corpus
+
+FUNCTIONS = [
+    'extract_contact_info', 'extract_price', 'extract_date', 'extract_time',
+    'extract_location', 'extract_organizer',
+    'is_event_message', 'is_place_message', 'is_service_message',
+    'categorize_event', 'categorize_place', 'categorize_service',
+    'classify_message',
+]
+
+# Per-function timings use at most this many bodies so large corpora stay quick
+MAX_FUNCTION_SAMPLE = 20000
+
+
+def _best_of(repeat: int, run: Callable[[], None]) -> float:
+    """Return the fastest wall time of repeat runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_functions(texts: List[str], repeat: int = 3) -> Dict[str, Dict]:
+    """Time every extractor function over the same list of message bodies."""
+    results = {}
+    for name in FUNCTIONS:
+        func = getattr(extract_entities, name)
+
+        def run():
+            for text in texts:
+                func(text)
+
+        seconds = _best_of(repeat, run)
+        results[name] = {
+            'calls': len(texts),
+            'seconds': round(seconds, 6),
+            'us_per_call': round(seconds / len(texts) * 1e6, 3) if texts else 0.0,
+        }
+    return results
+
+
+def time_end_to_end(corpus_path: str, messages: int, repeat: int = 3, workers: int = 1) -> Dict:
+    """Time process_messages over the corpus file."""
+    seconds = _best_of(repeat, lambda: extract_entities.process_messages(corpus_path, workers=workers))
+    return {
+        'messages': messages,
+        'workers': workers,
+        'seconds': round(seconds, 6),
+        'messages_per_sec': round(messages / seconds, 1) if seconds else 0.0,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return human-readable regressions that exceed threshold (a fraction)."""
+    regressions = []
+    for name, current in results['functions'].items():
+        previous = baseline.get('functions', {}).get(name)
+        if not previous or not previous['us_per_call']:
+            continue
+        change = current['us_per_call'] / previous['us_per_call'] - 1
+        if change > threshold:
+            regressions.append(
+                f"{name}: {previous['us_per_call']:.2f} -> {current['us_per_call']:.2f} us/call (+{change:.0%})"
+            )
+
+    previous = baseline.get('end_to_end', {}).get('messages_per_sec')
+    current = results['end_to_end']['messages_per_sec']
+    if previous and current < previous * (1 - threshold):
+        regressions.append(
+            f"process_messages: {previous:.0f} -> {current:.0f} messages/sec ({current / previous - 1:.0%})"
+        )
+    return regressions
+
+
+def run_benchmark(size: int, seed: int = 42, repeat: int = 3, workers: int = 1,
+                  corpus: Optional[str] = None) -> Dict:
+    """Generate (or reuse) a corpus and collect all timings."""
+    cleanup = corpus is None
+    if corpus is None:
+        fd, corpus = tempfile.mkstemp(prefix='whatsapp-corpus-', suffix='.json')
+        os.close(fd)
+        write_corpus(corpus, size, seed)
+
+    try:
+        texts = []
+        total = 0
+        for msg in extract_entities.iter_messages(corpus):
+            total += 1
+            if msg.get('message_body') and len(texts) < MAX_FUNCTION_SAMPLE:
+                texts.append(msg['message_body'])
+
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'corpus': corpus if not cleanup else f"synthetic:{size}:seed={seed}",
+                'messages': total,
+                'function_sample': len(texts),
+                'repeat': repeat,
+            },
+            'functions': time_functions(texts, repeat),
+            'end_to_end': time_end_to_end(corpus, total, repeat, workers),
+        }
+    finally:
+        if cleanup:
+            os.remove(corpus)
+
+
+def print_report(results: Dict) -> None:
+    meta = results['meta']
+    print(f"Corpus: {meta['corpus']} ({meta['messages']} messages, {meta['function_sample']} timed bodies)")
+    print(f"\n{'function':<24}{'us/call':>12}{'total s':>12}")
+    for name, timing in sorted(results['functions'].items(), key=lambda item: -item[1]['us_per_call']):
+        print(f"{name:<24}{timing['us_per_call']:>12.2f}{timing['seconds']:>12.3f}")
+    e2e = results['end_to_end']
+    print(f"\nprocess_messages: {e2e['messages_per_sec']:.0f} messages/sec "
+          f"({e2e['seconds']:.3f}s, workers={e2e['workers']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the WhatsApp entity extractor.')
+    parser.add_argument('--size', type=int, default=10000, help='Synthetic corpus size (1000 to 1000000)')
+    parser.add_argument('--corpus', help='Benchmark an existing export instead of a synthetic corpus')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is kept')
+    parser.add_argument('--workers', type=int, default=1, help='Workers for the end-to-end run')
+    parser.add_argument('-o', '--output', help='Write results JSON here')
+    parser.add_argument('--baseline', help='Results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Allowed slowdown vs baseline as a fraction (default 0.15)')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.size, args.seed, args.repeat, args.workers, args.corpus)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Columnar entity files (--format columnar).
+
+The JSON outputs repeat city_id, type, category and price_currency on every
+row and spell out the same text again wherever it recurs. Each entity kind
+gets its own .cols file (extracted-events.cols, extracted-places.cols,
+extracted-services.cols), which stores that kind's rows column by column:
+
+- low-cardinality columns are dictionary-encoded: the distinct values live
+  in the header and every row is a 1 or 2 byte code
+- text columns are (start, end) byte spans into the file's UTF-8 blob,
+  which all of its text columns share and in which identical strings are
+  stored once (a short message's title and its description, or a place
+  description repeated by reposts, point at the same bytes). Nothing is
+  shared across files: an event and a service extracted from the same
+  message each store the description in their own file
+- float and integer columns are packed float64 / int64 arrays
+- anything else (mixed types, nested values) is stored as a span of its JSON
+
+Layout: the magic bytes, a uint32 header length and a JSON header, then the
+column sections and the blob, each 8-byte aligned at the offsets the header
+lists (relative to the first aligned byte after the header). Integers are
+little-endian. ColumnarFile memory-maps the file and casts sections to typed
+memoryviews, or to NumPy arrays when NumPy is installed, so opening even a
+large extraction only parses the header; values are decoded when a row or
+column is read.
+
+USAGE:
+  python3 scripts/extraction/columnar_store.py extracted-places.cols
+  python3 scripts/extraction/columnar_store.py extracted-places.cols --json extracted-places.json
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # optional: typed memoryviews serve the same sections
+    numpy = None
+
+COLUMNAR_EXTENSION = '.cols'
+MAGIC = b'WAXCOLS\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# A column is dictionary-encoded when each distinct value repeats at least
+# this many times on average (or the column is entirely null) and there are
+# few enough distinct values to keep the header small; the rest are spans
+DICT_MIN_REPEAT = 2
+DICT_MAX_VALUES = 1 << 12
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _typecode(candidates: str, size: int) -> str:
+    for code in candidates:
+        if array(code).itemsize == size:
+            return code
+    raise RuntimeError(f"no array typecode of {size} bytes among {candidates!r}")
+
+
+# Section dtypes -> array/memoryview typecodes and NumPy dtypes
+TYPECODES = {
+    'u8': 'B', 'u16': 'H', 'u32': _typecode('IL', 4), 'u64': _typecode('LQ', 8),
+    'i64': _typecode('lq', 8), 'f64': 'd',
+}
+NUMPY_DTYPES = {'u8': '<u1', 'u16': '<u2', 'u32': '<u4', 'u64': '<u8', 'i64': '<i8', 'f64': '<f8'}
+
+_SCALARS = (str, int, float, bool)
+
+
+def _code_dtype(count: int) -> str:
+    return 'u8' if count <= 1 << 8 else 'u16'
+
+
+def _pad(length: int) -> int:
+    return -length % ALIGNMENT
+
+
+# ============================================
+# WRITING
+# ============================================
+
+class ColumnBuilder:
+    """
+    Accumulates entity rows column by column and writes them as one .cols
+    file. Rows that lack a column read back with None in it.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: Dict[str, List] = {}
+
+    def add(self, entity: Mapping) -> None:
+        columns = self.columns
+        for key, value in entity.items():
+            try:
+                columns[key].append(value)
+            except KeyError:
+                columns[key] = [None] * self.rows + [value]
+        self.rows += 1
+        if len(entity) < len(columns):
+            for column in columns.values():
+                if len(column) < self.rows:
+                    column.append(None)
+
+    def write_to(self, f: BinaryIO) -> int:
+        """Encode the columns into f. Returns the number of bytes written."""
+        sections: List[bytes] = []
+        offset = 0
+
+        def section(data: array) -> Dict:
+            nonlocal offset
+            if sys.byteorder != 'little':
+                data = array(data.typecode, data)
+                data.byteswap()
+            raw = data.tobytes()
+            entry = {'offset': offset, 'length': len(raw)}
+            sections.append(raw + b'\x00' * _pad(len(raw)))
+            offset += len(raw) + _pad(len(raw))
+            return entry
+
+        blob = _TextBlob()
+        columns = []
+        for name, values in self.columns.items():
+            column = _encode_column(name, values, blob)
+            for key in ('codes', 'spans', 'values', 'nulls'):
+                if key in column:
+                    dtype, data = column[key]
+                    column[key] = {**section(data), 'dtype': dtype}
+            columns.append(column)
+        # The blob follows the typed sections, so its spans can be read without one
+        blob_entry = {'offset': offset, 'length': blob.length}
+
+        header = json.dumps({
+            'format': 'whatsapp-entities-columnar',
+            'version': FORMAT_VERSION,
+            'byteorder': 'little',
+            'rows': self.rows,
+            'columns': columns,
+            'blob': blob_entry,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        prefix = MAGIC + struct.pack('<I', len(header)) + header
+        f.write(prefix + b'\x00' * _pad(len(prefix)))
+        for raw in sections:
+            f.write(raw)
+        for chunk in blob.chunks:
+            f.write(chunk)
+        return len(prefix) + _pad(len(prefix)) + offset + blob.length
+
+
+class _TextBlob:
+    """UTF-8 strings laid end to end; each distinct string is stored once."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.length = 0
+        self._spans: Dict[str, Tuple[int, int]] = {}
+
+    def span(self, text: str) -> Tuple[int, int]:
+        span = self._spans.get(text)
+        if span is None:
+            data = text.encode('utf-8')
+            span = self._spans[text] = (self.length, self.length + len(data))
+            self.chunks.append(data)
+            self.length += len(data)
+        return span
+
+
+def _nulls(values: List) -> Optional[Tuple[str, array]]:
+    if all(value is not None for value in values):
+        return None
+    return 'u8', array('B', [value is None for value in values])
+
+
+def _encode_column(name: str, values: List, blob: _TextBlob) -> Dict:
+    """Pick an encoding for one column and return its header entry with raw sections."""
+    kinds = {type(value) for value in values if value is not None}
+
+    if all(kind in _SCALARS for kind in kinds):
+        # With more than one type, (type, value) keys keep 1, 1.0 and True apart
+        keys = values if len(kinds) <= 1 else [(type(value), value) for value in values]
+        distinct = dict.fromkeys(keys)
+        if len(distinct) <= DICT_MAX_VALUES and (
+                not kinds or len(distinct) * DICT_MIN_REPEAT <= len(values)):
+            codes = {key: code for code, key in enumerate(distinct)}
+            dtype = _code_dtype(len(codes))
+            return {
+                'name': name,
+                'encoding': 'dict',
+                'dictionary': list(distinct) if keys is values else [value for _, value in distinct],
+                'codes': (dtype, array(TYPECODES[dtype], [codes[key] for key in keys])),
+            }
+
+    column = {'name': name}
+    if kinds == {float}:
+        column['encoding'] = 'f64'
+        column['values'] = ('f64', array('d', [0.0 if value is None else value for value in values]))
+    elif kinds == {int} and all(value is None or INT64_MIN <= value <= INT64_MAX for value in values):
+        column['encoding'] = 'i64'
+        column['values'] = ('i64', array(TYPECODES['i64'], [value or 0 for value in values]))
+    else:
+        if kinds == {str}:
+            column['encoding'] = 'text'
+            texts = values
+        else:
+            column['encoding'] = 'json'
+            texts = [None if value is None else json.dumps(value, ensure_ascii=False) for value in values]
+        spans = []
+        span = blob.span
+        for text in texts:
+            spans.extend((0, 0) if text is None else span(text))
+        # Spans end inside the blob, whose length only grows
+        dtype = 'u32' if blob.length < 1 << 32 else 'u64'
+        column['spans'] = (dtype, array(TYPECODES[dtype], spans))
+
+    nulls = _nulls(values)
+    if nulls is not None:
+        column['nulls'] = nulls
+    return column
+
+
+def write_columnar(path: str, entities) -> int:
+    """Write an iterable of entity mappings to a .cols file. Returns the row count."""
+    builder = ColumnBuilder()
+    for entity in entities:
+        builder.add(entity)
+    with open(path, 'wb') as f:
+        builder.write_to(f)
+    return builder.rows
+
+
+# ============================================
+# READING
+# ============================================
+
+class ColumnarFile:
+    """
+    Read-only, memory-mapped view of a .cols file.
+
+    Rows can be read one at a time (file[i]) or all at once (iteration,
+    to_dicts()); column(name) decodes a whole column, and codes()/dictionary()
+    or values()/spans() expose the encoded sections for vectorized filters
+    without decoding anything.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty, not a columnar entity file")
+        self._views: Dict[Tuple[str, str], object] = {}
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self) -> None:
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a columnar entity file")
+        (length,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._map[start:start + length].decode('utf-8'))
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{self.path} has columnar format version {header.get('version')}, "
+                             f"expected {FORMAT_VERSION}")
+        self.header = header
+        self.rows: int = header['rows']
+        self._base = start + length + _pad(start + length)
+        self._columns: Dict[str, Dict] = {column['name']: column for column in header['columns']}
+        blob = header['blob']
+        self._blob_start = self._base + blob['offset']
+
+    # ------------------------------------------------------------------
+    # Encoded sections
+    # ------------------------------------------------------------------
+
+    @property
+    def names(self) -> List[str]:
+        """Column names in the order of the original entity keys."""
+        return list(self._columns)
+
+    def encoding(self, name: str) -> str:
+        return self._columns[name]['encoding']
+
+    def _section(self, name: str, key: str):
+        view = self._views.get((name, key))
+        if view is None:
+            entry = self._columns[name].get(key)
+            if entry is None:
+                return None
+            start = self._base + entry['offset']
+            dtype = entry['dtype']
+            if numpy is not None:
+                view = numpy.frombuffer(self._map, dtype=NUMPY_DTYPES[dtype],
+                                        count=entry['length'] // numpy.dtype(NUMPY_DTYPES[dtype]).itemsize,
+                                        offset=start)
+            elif sys.byteorder == 'little':
+                view = memoryview(self._map)[start:start + entry['length']].cast(TYPECODES[dtype])
+            else:
+                view = array(TYPECODES[dtype], self._map[start:start + entry['length']])
+                view.byteswap()
+            self._views[(name, key)] = view
+        return view
+
+    def dictionary(self, name: str) -> List:
+        """Distinct values of a dictionary-encoded column, indexed by code."""
+        return self._columns[name]['dictionary']
+
+    def codes(self, name: str):
+        """Per-row dictionary codes of a dictionary-encoded column."""
+        return self._section(name, 'codes')
+
+    def values(self, name: str):
+        """Packed per-row numbers of an f64/i64 column (0 where null)."""
+        return self._section(name, 'values')
+
+    def spans(self, name: str):
+        """Flat (start, end) blob offsets of a text/json column, two per row."""
+        return self._section(name, 'spans')
+
+    def nulls(self, name: str):
+        """Per-row null flags, or None when the column has no nulls."""
+        return self._section(name, 'nulls')
+
+    # ------------------------------------------------------------------
+    # Decoded values
+    # ------------------------------------------------------------------
+
+    def column(self, name: str) -> List:
+        """Decode a whole column into a list of Python values."""
+        column = self._columns[name]
+        encoding = column['encoding']
+        if encoding == 'dict':
+            dictionary = column['dictionary']
+            return [dictionary[code] for code in self.codes(name).tolist()]
+
+        if encoding in ('f64', 'i64'):
+            values = self.values(name).tolist()
+        else:
+            spans = self.spans(name).tolist()
+            blob, base = self._map, self._blob_start
+            values = [blob[base + start:base + end].decode('utf-8')
+                      for start, end in zip(spans[0::2], spans[1::2])]
+        nulls = self.nulls(name)
+        if nulls is not None:
+            values = [None if null else value for value, null in zip(values, nulls.tolist())]
+        if encoding == 'json':
+            values = [None if value is None else json.loads(value) for value in values]
+        return values
+
+    def value(self, name: str, row: int):
+        """Decode one cell."""
+        column = self._columns[name]
+        if column['encoding'] == 'dict':
+            return column['dictionary'][self.codes(name)[row]]
+        nulls = self.nulls(name)
+        if nulls is not None and nulls[row]:
+            return None
+        if column['encoding'] in ('f64', 'i64'):
+            return self.values(name)[row].item() if numpy is not None else self.values(name)[row]
+        spans = self.spans(name)
+        start, end = self._blob_start + int(spans[2 * row]), self._blob_start + int(spans[2 * row + 1])
+        text = self._map[start:end].decode('utf-8')
+        return json.loads(text) if column['encoding'] == 'json' else text
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, row: int) -> Dict:
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+        return {name: self.value(name, row) for name in self._columns}
+
+    def __iter__(self) -> Iterator[Dict]:
+        names = self.names
+        for values in zip(*(self.column(name) for name in names)):
+            yield dict(zip(names, values))
+
+    def to_dicts(self) -> List[Dict]:
+        """All rows as dicts with the original key order."""
+        return list(self)
+
+    # ------------------------------------------------------------------
+    # Lifetime
+    # ------------------------------------------------------------------
+
+    def close(self) -> None:
+        # Views into the map must be released before it can be closed
+        for view in self._views.values():
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = {}
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # a NumPy array handed out by codes()/values() still refers to it
+        self._file.close()
+
+    def __enter__(self) -> 'ColumnarFile':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def iter_columnar(path: str) -> Iterator[Dict]:
+    """Yield the rows of a .cols file as dicts."""
+    with ColumnarFile(path) as table:
+        yield from table
+
+
+# ============================================
+# MAIN
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect a columnar entity file or convert it to JSON.')
+    parser.add_argument('path', help='A .cols file written with --format columnar')
+    parser.add_argument('--json', metavar='OUTPUT',
+                        help='Write the rows as a pretty JSON array (the --format json layout)')
+    args = parser.parse_args()
+
+    with ColumnarFile(args.path) as table:
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(table.to_dicts(), f, indent=2, ensure_ascii=False)
+            print(f"✅ {len(table)} rows -> {args.json}")
+            return
+
+        blob = table.header['blob']['length']
+        print(f"{args.path}: {len(table)} rows, {len(table.names)} columns, {blob} byte text blob")
+        for column in table.header['columns']:
+            detail = f"{len(column['dictionary'])} values" if column['encoding'] == 'dict' else ''
+            null_count = table.column(column['name']).count(None)
+            print(f"  {column['name']:<20}{column['encoding']:<6}{detail:<12}{null_count:>8} null")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Check that extract_entities.py still extracts what a baseline revision did.
+
+Optimizations to the extractors (normalize-once, compiled rules, budgets)
+are meant to leave the output unchanged. This script checks out a baseline
+revision into a temporary git worktree, runs its extract_entities.py and the
+working tree's on the same corpus with --deterministic-ids, and compares the
+two outputs entity by entity and field by field.
+
+The default corpus is synthetic_corpus.py's: multi-line bodies with an emoji
+on most lines, phones, prices and handles next to line breaks, which is
+where a view that joins text across lines or emojis goes wrong.
+
+Every value must match exactly. Fields whose change is intended can be
+skipped with --ignore.
+
+USAGE:
+  python3 scripts/extraction/compare_extraction.py 100a11e
+  python3 scripts/extraction/compare_extraction.py HEAD~3 --size 50000 --ignore contact_instagram
+  python3 scripts/extraction/compare_extraction.py 100a11e --corpus data/raw/messages.json
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from db_loader import iter_extracted
+from synthetic_corpus import write_corpus
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_PATH = os.path.join('scripts', 'extraction', 'extract_entities.py')
+MAX_EXAMPLES = 3
+
+
+def _repo_root() -> str:
+    return subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=SCRIPT_DIR, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def run_extraction(script: str, corpus: str, output_dir: str) -> None:
+    """Run one extract_entities.py on corpus with stable entity ids."""
+    os.makedirs(output_dir, exist_ok=True)
+    subprocess.run([sys.executable, script, corpus, '--deterministic-ids', '--output-dir', output_dir],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def load_entities(output_dir: str) -> Dict[Tuple[str, str], Dict]:
+    return {(kind, entity['id']): dict(entity) for kind, entity in iter_extracted(output_dir)}
+
+
+def compare_outputs(baseline: Dict[Tuple[str, str], Dict], current: Dict[Tuple[str, str], Dict],
+                    ignore: Tuple[str, ...] = ()) -> Dict:
+    """Count missing/extra entities and per-field value differences."""
+    fields: Dict[str, Dict] = {}
+    for key in baseline.keys() & current.keys():
+        old, new = baseline[key], current[key]
+        for field in old.keys() | new.keys():
+            if field in ignore:
+                continue
+            before, after = old.get(field), new.get(field)
+            if before == after:
+                continue
+            stats = fields.setdefault(field, {'count': 0, 'examples': []})
+            stats['count'] += 1
+            if len(stats['examples']) < MAX_EXAMPLES:
+                stats['examples'].append({'kind': key[0], 'id': key[1], 'baseline': before, 'current': after})
+    return {
+        'baseline_entities': len(baseline),
+        'current_entities': len(current),
+        'missing': sorted(baseline.keys() - current.keys())[:MAX_EXAMPLES],
+        'missing_count': len(baseline.keys() - current.keys()),
+        'extra_count': len(current.keys() - baseline.keys()),
+        'fields': fields,
+    }
+
+
+def print_report(result: Dict) -> List[str]:
+    """Print the comparison and return the list of failures."""
+    print(f"Entities: {result['baseline_entities']} baseline, {result['current_entities']} current")
+    failures = []
+    if result['missing_count']:
+        failures.append(f"{result['missing_count']} entities missing, e.g. {result['missing']}")
+    if result['extra_count']:
+        failures.append(f"{result['extra_count']} entities not in the baseline")
+    for field, stats in sorted(result['fields'].items()):
+        failures.append(f"{field}: {stats['count']} values differ")
+        for example in stats['examples']:
+            print(f"  {field} [{example['kind']} {example['id']}]: "
+                  f"{example['baseline']!r} -> {example['current']!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare extract_entities.py output against a baseline revision.')
+    parser.add_argument('baseline', help='Git revision to compare against (needs --deterministic-ids)')
+    parser.add_argument('--corpus', default=None, help='Message export to extract (default: a synthetic corpus)')
+    parser.add_argument('--size', type=int, default=20000, help='Synthetic corpus size (default 20000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ignore', action='append', default=[], metavar='FIELD',
+                        help='Field whose changes are expected (repeatable)')
+    args = parser.parse_args()
+
+    root = _repo_root()
+    work_dir = tempfile.mkdtemp(prefix='extraction-compare-')
+    worktree = os.path.join(work_dir, 'baseline')
+    try:
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.baseline], cwd=root, check=True,
+                       capture_output=True)
+        corpus = args.corpus
+        if corpus is None:
+            corpus = os.path.join(work_dir, 'corpus.jsonl')
+            write_corpus(corpus, args.size, args.seed, jsonl=True)
+
+        print(f"Extracting with {args.baseline}...")
+        run_extraction(os.path.join(worktree, SCRIPT_PATH), corpus, os.path.join(work_dir, 'baseline-out'))
+        print("Extracting with the working tree...")
+        run_extraction(os.path.join(root, SCRIPT_PATH), corpus, os.path.join(work_dir, 'current-out'))
+
+        result = compare_outputs(load_entities(os.path.join(work_dir, 'baseline-out')),
+                                 load_entities(os.path.join(work_dir, 'current-out')),
+                                 tuple(args.ignore))
+        failures = print_report(result)
+    finally:
+        subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=root, capture_output=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ Output differs from {args.baseline}:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\n✅ Output matches {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Bulk database loader for extracted entities.
+
+Two paths, both fed straight from the extraction pipeline:
+
+- COPY streams: one PostgreSQL COPY file per table (text/TSV or CSV format)
+  plus a psql script that loads them with \\copy. Escaping is done per field
+  by the COPY rules, so quotes, tabs and newlines in message text can never
+  break a statement the way they could in INSERTS.sql.
+- Batched upserts: executemany() of INSERT ... ON CONFLICT (id) DO UPDATE in
+  batches, which works against PostgreSQL (psycopg2, placeholder '%s') and
+  against a local SQLite stand-in (placeholder '?') for testing.
+
+USAGE:
+  python3 scripts/extraction/db_loader.py data/raw --copy-dir data/final/copy
+  python3 scripts/extraction/db_loader.py data/raw --sqlite /tmp/mazunte.db
+  python3 scripts/extraction/db_loader.py --from-extracted data/final --copy-dir data/final/copy
+"""
+
+import argparse
+import os
+import sqlite3
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, TextIO, Tuple
+
+from columnar_store import COLUMNAR_EXTENSION, iter_columnar
+from extract_entities import OUTPUT_FILES, expand_inputs, iter_entities, iter_input_messages, iter_messages
+from landmark_resolver import LandmarkResolver
+
+APPROVAL_STATUS = 'pending'
+# Profile that owns imported rows; the same one set-profile-id.js gives INSERTS.sql
+PROFILE_ID = '520e75eb-b615-4d9a-a369-b218373c6c05'
+# Owner columns: events and services have profile_id, places have created_by
+OWNER_COLUMNS = ('profile_id', 'created_by')
+
+# kind -> (table, columns). Columns are entity keys except approval_status,
+# which extracted rows always load as 'pending', and the owner columns, which
+# load the profile id. lat/lng stay NULL unless locations were resolved with
+# --landmarks.
+TABLES = {
+    'event': ('events', (
+        'id', 'profile_id', 'city_id', 'title', 'description', 'date', 'time', 'location_name', 'lat', 'lng',
+        'category', 'price', 'organizer_name', 'contact_phone', 'contact_whatsapp',
+        'contact_instagram', 'contact_email', 'approval_status',
+    )),
+    'place': ('places', (
+        'id', 'city_id', 'name', 'type', 'category', 'description', 'location_name', 'lat', 'lng',
+        'hours', 'contact_phone', 'contact_whatsapp', 'contact_instagram', 'contact_email', 'website_url',
+        'created_by',
+    )),
+    'service': ('services', (
+        'id', 'profile_id', 'city_id', 'title', 'description', 'category', 'price_type', 'price_amount',
+        'price_currency', 'price_notes', 'contact_phone', 'contact_whatsapp', 'contact_instagram',
+        'contact_email', 'approval_status',
+    )),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+# Formats of a previous extraction's outputs, fastest to load first
+EXTRACTED_EXTENSIONS = (COLUMNAR_EXTENSION, '.ndjson', '.ndjson.gz', '.json', '.json.gz')
+
+
+def row_values(kind: str, entity: Mapping, profile_id: str = PROFILE_ID) -> Tuple:
+    """Return the column values of an entity in TABLES order."""
+    _, columns = TABLES[kind]
+    return tuple(APPROVAL_STATUS if column == 'approval_status'
+                 else profile_id if column in OWNER_COLUMNS
+                 else entity.get(column)
+                 for column in columns)
+
+
+def iter_extracted(output_dir: str) -> Iterator[Tuple[str, Mapping]]:
+    """Yield (kind, entity) pairs from a previous extraction's output files."""
+    for kind, basename in OUTPUT_FILES.items():
+        for extension in EXTRACTED_EXTENSIONS:
+            path = os.path.join(output_dir, basename + extension)
+            if os.path.exists(path):
+                read = iter_columnar if extension == COLUMNAR_EXTENSION else iter_messages
+                for entity in read(path):
+                    yield kind, entity
+                break
+
+
+# ============================================
+# COPY STREAMS
+# ============================================
+
+_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_text_field(value) -> str:
+    if value is None:
+        return '\\N'
+    return str(value).translate(_TEXT_ESCAPES)
+
+
+def _copy_csv_field(value) -> str:
+    # Unquoted empty is NULL in COPY CSV, so every non-null value is quoted
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def format_copy_row(values: Sequence, fmt: str = 'text') -> str:
+    """Format one row for COPY ... FROM in text (TSV) or CSV format."""
+    if fmt == 'csv':
+        return ','.join(_copy_csv_field(value) for value in values) + '\n'
+    return '\t'.join(_copy_text_field(value) for value in values) + '\n'
+
+
+def copy_statement(kind: str, fmt: str = 'text', source: str = 'STDIN') -> str:
+    """Return the COPY statement that loads a stream written for kind."""
+    table, columns = TABLES[kind]
+    return f"COPY {table} ({', '.join(columns)}) FROM {source} WITH (FORMAT {fmt})"
+
+
+class CopyStreamWriter:
+    """Writes one COPY data file per table as entities are produced."""
+
+    def __init__(self, output_dir: str, fmt: str = 'text', profile_id: str = PROFILE_ID):
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.profile_id = profile_id
+        self.extension = '.csv' if fmt == 'csv' else '.tsv'
+        self.counts = {kind: 0 for kind in TABLES}
+        self._files: Dict[str, TextIO] = {}
+
+    def path(self, kind: str) -> str:
+        return os.path.join(self.output_dir, TABLES[kind][0] + self.extension)
+
+    def __enter__(self) -> 'CopyStreamWriter':
+        os.makedirs(self.output_dir, exist_ok=True)
+        # newline='' keeps \r inside CSV values as written
+        self._files = {kind: open(self.path(kind), 'w', encoding='utf-8', newline='') for kind in TABLES}
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        for f in self._files.values():
+            f.close()
+        if exc_type is None:
+            self.write_load_script()
+
+    def write(self, kind: str, entity: Mapping) -> None:
+        self._files[kind].write(format_copy_row(row_values(kind, entity, self.profile_id), self.fmt))
+        self.counts[kind] += 1
+
+    def observe(self, entities: Iterable[Tuple[str, Mapping]]) -> Iterator[Tuple[str, Mapping]]:
+        """Write (kind, entity) pairs as they stream past, yielding them unchanged."""
+        for kind, entity in entities:
+            self.write(kind, entity)
+            yield kind, entity
+
+    def write_load_script(self) -> str:
+        """Write load.sql, a psql script that \\copy-loads every stream in one transaction."""
+        script_path = os.path.join(self.output_dir, 'load.sql')
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write('-- Generated by scripts/extraction/db_loader.py\n')
+            f.write('-- Run with: psql "$DATABASE_URL" -f load.sql (from this directory)\n\n')
+            f.write('BEGIN;\n')
+            for kind in TABLES:
+                table, columns = TABLES[kind]
+                f.write(f"\\copy {table} ({', '.join(columns)}) FROM '{table}{self.extension}' "
+                        f"WITH (FORMAT {self.fmt})\n")
+            f.write('COMMIT;\n')
+        return script_path
+
+
+# ============================================
+# BATCHED UPSERTS
+# ============================================
+
+def upsert_statement(kind: str, placeholder: str = '?') -> str:
+    """INSERT ... ON CONFLICT (id) DO UPDATE, valid for PostgreSQL and SQLite >= 3.24."""
+    table, columns = TABLES[kind]
+    updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column != 'id')
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))}) "
+        f"ON CONFLICT (id) DO UPDATE SET {updates}"
+    )
+
+
+def load_batches(conn, entities: Iterable[Tuple[str, Mapping]], batch_size: int = DEFAULT_BATCH_SIZE,
+                 placeholder: str = '?', profile_id: str = PROFILE_ID) -> Dict[str, int]:
+    """
+    Upsert (kind, entity) pairs with executemany, one transaction per batch.
+
+    Works with any DB-API connection; pass placeholder='%s' for psycopg2.
+    """
+    statements = {kind: upsert_statement(kind, placeholder) for kind in TABLES}
+    pending: Dict[str, List[Tuple]] = {kind: [] for kind in TABLES}
+    counts = {kind: 0 for kind in TABLES}
+
+    def flush(kind: str) -> None:
+        rows = pending[kind]
+        if not rows:
+            return
+        cursor = conn.cursor()
+        cursor.executemany(statements[kind], rows)
+        conn.commit()
+        counts[kind] += len(rows)
+        pending[kind] = []
+
+    for kind, entity in entities:
+        pending[kind].append(row_values(kind, entity, profile_id))
+        if len(pending[kind]) >= batch_size:
+            flush(kind)
+    for kind in TABLES:
+        flush(kind)
+    return counts
+
+
+def create_sqlite_schema(conn: sqlite3.Connection) -> None:
+    """Create minimal events/places/services tables in a SQLite stand-in database."""
+    for table, columns in TABLES.values():
+        definitions = ', '.join('id TEXT PRIMARY KEY' if column == 'id' else f"{column} TEXT"
+                                for column in columns)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definitions})")
+    conn.commit()
+
+
+# ============================================
+# MAIN
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract entities and bulk-load them into the database.')
+    parser.add_argument('inputs', nargs='*', help='Message exports or directories of exports')
+    parser.add_argument('--from-extracted', metavar='DIR',
+                        help='Load the extracted-* outputs of an earlier extract_entities.py run '
+                             '(.cols, .ndjson or .json) instead of extracting the inputs')
+    parser.add_argument('--copy-dir', help='Write PostgreSQL COPY streams and load.sql here')
+    parser.add_argument('--copy-format', choices=['text', 'csv'], default='text',
+                        help='COPY format: text (TSV, default) or csv')
+    parser.add_argument('--sqlite', help='Upsert into this SQLite database (created if missing)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--profile-id', default=PROFILE_ID,
+                        help='Profile that owns the loaded rows (events/services profile_id, places created_by)')
+    parser.add_argument('--workers', type=int, default=1, help='Extraction worker processes')
+    parser.add_argument('--deterministic-ids', action='store_true',
+                        help='Derive entity ids from the source message so re-loads upsert in place')
+    parser.add_argument('--landmarks', action='append', default=[], metavar='JSON',
+                        help='Fill lat/lng by resolving locations against this landmarks file (repeatable)')
+    args = parser.parse_args()
+
+    if not args.copy_dir and not args.sqlite:
+        parser.error('choose at least one of --copy-dir or --sqlite')
+    if bool(args.inputs) == bool(args.from_extracted):
+        parser.error('give either message inputs or --from-extracted')
+
+    if args.from_extracted:
+        print(f"Loading entities from the outputs in {args.from_extracted}...")
+        entities = iter_extracted(args.from_extracted)
+    else:
+        inputs = expand_inputs(args.inputs)
+        print(f"Loading entities extracted from {', '.join(inputs)}...")
+        resolver = LandmarkResolver.from_files(args.landmarks) if args.landmarks else None
+        entities = iter_entities(iter_input_messages(inputs), workers=args.workers,
+                                 deterministic_ids=args.deterministic_ids, resolver=resolver)
+
+    # One pass feeds both sinks: extracting twice would give the two sinks
+    # different random ids (and double the extraction time)
+    with ExitStack() as stack:
+        writer = None
+        if args.copy_dir:
+            writer = stack.enter_context(CopyStreamWriter(args.copy_dir, args.copy_format, args.profile_id))
+            entities = writer.observe(entities)
+        if args.sqlite:
+            conn = sqlite3.connect(args.sqlite)
+            stack.callback(conn.close)
+            create_sqlite_schema(conn)
+            counts = load_batches(conn, entities, args.batch_size, profile_id=args.profile_id)
+        else:
+            for _ in entities:
+                pass
+
+    if writer is not None:
+        for kind, count in writer.counts.items():
+            print(f"✅ {count} rows -> {writer.path(kind)}")
+        print(f"   Load with: cd {args.copy_dir} && psql \"$DATABASE_URL\" -f load.sql")
+    if args.sqlite:
+        for kind, count in counts.items():
+            print(f"✅ {count} rows upserted into {TABLES[kind][0]} ({args.sqlite})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Output writers for extracted entities.
+
+Writers share one interface (write/commit/abort, usable as a context manager)
+so the extractor can emit any format:
+
+- 'json':   a pretty-printed JSON array, identical to json.dump(indent=2)
+- 'ndjson': one compact JSON object per line, flushed as entities arrive
+- 'columnar': a memory-mappable .cols file (see columnar_store), built in
+  memory and written on commit
+
+JSON and NDJSON can be gzip-compressed, and every format writes to '<path>.partial' and rename
+into place on commit so a crash never leaves a truncated output behind.
+Readers that want to follow a run in progress can tail the .partial NDJSON
+file, or pass atomic=False to write straight to the final path. NDJSON
+writers can also append to an existing file (append=True, never atomic),
+which is how follow mode grows its outputs batch by batch.
+"""
+
+import gzip
+import json
+import os
+from typing import Dict, Mapping, Optional, TextIO
+
+from columnar_store import COLUMNAR_EXTENSION, ColumnBuilder
+
+PARTIAL_SUFFIX = '.partial'
+
+
+def _as_dict(entity: Mapping) -> Dict:
+    """Serialize entity records; plain dicts pass through unchanged."""
+    to_dict = getattr(entity, 'to_dict', None)
+    return to_dict() if to_dict is not None else entity
+
+
+class EntityWriter:
+    """Base writer: handles the temp file, compression and the final rename."""
+
+    extension = ''
+
+    # Formats whose files stay valid when more entities are appended later
+    appendable = False
+
+    def __init__(self, path: str, compress: bool = False, atomic: bool = True, append: bool = False):
+        if append and not self.appendable:
+            raise ValueError(f"{type(self).__name__} cannot append to an existing file")
+        self.path = path
+        self.compress = compress
+        self.atomic = atomic and not append
+        self.append = append
+        self.count = 0
+        self._write_path = path + PARTIAL_SUFFIX if self.atomic else path
+        self._file: Optional[TextIO] = None
+
+    def __enter__(self) -> 'EntityWriter':
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def open(self) -> 'EntityWriter':
+        mode = 'a' if self.append else 'w'
+        if self.compress:
+            self._file = gzip.open(self._write_path, mode + 't', encoding='utf-8')
+        else:
+            self._file = open(self._write_path, mode, encoding='utf-8')
+        self._start()
+        return self
+
+    def write(self, entity: Mapping) -> None:
+        self._write(_as_dict(entity))
+        self.count += 1
+
+    def commit(self) -> None:
+        """Finish the file and move it to its final path."""
+        self._finish()
+        self._file.close()
+        if self.atomic:
+            os.replace(self._write_path, self.path)
+
+    def abort(self) -> None:
+        """Close and discard a partially written file."""
+        if self._file is not None:
+            self._file.close()
+        if self.atomic and os.path.exists(self._write_path):
+            os.remove(self._write_path)
+
+    def _start(self) -> None:
+        pass
+
+    def _write(self, entity: Dict) -> None:
+        raise NotImplementedError
+
+    def _finish(self) -> None:
+        pass
+
+
+class JsonArrayWriter(EntityWriter):
+    """Pretty JSON array, byte-compatible with json.dump(entities, indent=2)."""
+
+    extension = '.json'
+
+    def _write(self, entity: Dict) -> None:
+        body = json.dumps(entity, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        self._file.write(('[\n  ' if self.count == 0 else ',\n  ') + body)
+
+    def _finish(self) -> None:
+        self._file.write('\n]' if self.count else '[]')
+
+
+class NdjsonWriter(EntityWriter):
+    """Newline-delimited JSON, flushed every flush_every entities."""
+
+    extension = '.ndjson'
+    appendable = True
+
+    def __init__(self, path: str, compress: bool = False, atomic: bool = True,
+                 append: bool = False, flush_every: int = 1):
+        super().__init__(path, compress, atomic, append)
+        self.flush_every = max(1, flush_every)
+
+    def _write(self, entity: Dict) -> None:
+        self._file.write(json.dumps(entity, ensure_ascii=False) + '\n')
+        if (self.count + 1) % self.flush_every == 0:
+            self._file.flush()
+
+
+class ColumnarWriter(EntityWriter):
+    """Dictionary-encoded columns with a shared text blob, readable with columnar_store.ColumnarFile."""
+
+    extension = COLUMNAR_EXTENSION
+
+    def __init__(self, path: str, compress: bool = False, atomic: bool = True, append: bool = False):
+        if compress:
+            raise ValueError("columnar files are memory-mapped and cannot be gzip-compressed")
+        super().__init__(path, compress, atomic, append)
+        self._builder = ColumnBuilder()
+
+    def open(self) -> 'ColumnarWriter':
+        self._file = open(self._write_path, 'wb')
+        return self
+
+    def _write(self, entity: Dict) -> None:
+        self._builder.add(entity)
+
+    def _finish(self) -> None:
+        self._builder.write_to(self._file)
+
+
+WRITERS = {
+    'json': JsonArrayWriter,
+    'ndjson': NdjsonWriter,
+    'columnar': ColumnarWriter,
+}
+
+
+def output_path(output_dir: str, basename: str, fmt: str = 'json', compress: bool = False) -> str:
+    """Return the output path for a base name such as 'extracted-events'."""
+    return os.path.join(output_dir, basename + WRITERS[fmt].extension + ('.gz' if compress else ''))
+
+
+def open_writers(paths: Dict[str, str], fmt: str = 'json', compress: bool = False,
+                 atomic: bool = True, append: bool = False) -> Dict[str, EntityWriter]:
+    """Open one writer per entity kind."""
+    writers = {}
+    try:
+        for kind, path in paths.items():
+            writers[kind] = WRITERS[fmt](path, compress=compress, atomic=atomic, append=append).open()
+    except Exception:
+        for writer in writers.values():
+            writer.abort()
+        raise
+    return writers
@@ -3,14 +3,89 @@
 Extract events, places, and services from WhatsApp messages.
 """
 
+import argparse
+import gzip
+import hashlib
+import itertools
 import json
+import multiprocessing
+import os
 import re
+import sys
 import uuid
+from collections import deque
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from functools import cached_property
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
-def extract_contact_info(text: str) -> Dict[str, Optional[str]]:
+from columnar_store import COLUMNAR_EXTENSION, iter_columnar
+from entity_writers import WRITERS, open_writers, output_path
+from follow_mode import (DEFAULT_BATCH_SIZE as DEFAULT_FOLLOW_BATCH, DEFAULT_MAX_INTERVAL, STATE_FILE,
+                         FileFollower, SqlFollower, connect_database, follow)
+from landmark_resolver import DEFAULT_MIN_SCORE, LandmarkResolver, Match
+from message_budget import DEFAULT_MAX_CHARS, DEFAULT_MAX_SECONDS, MessageBudget
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateFilter
+from organizers import ORGANIZERS_FILE, OrganizerIndex, summarize as summarize_organizers
+from rule_set import Classification, KeywordClassifier, RuleSet, load_rules
+from text_normalizer import NormalizedText, normalize
+
+# ============================================
+# RULES
+# ============================================
+
+# Keywords, categories and extractor patterns come from rules/*.json (see
+# rule_set.py). use_rules() switches every extractor to another rule set.
+RULES: RuleSet = load_rules()
+CLASSIFIER: KeywordClassifier = RULES.classifier
+
+def active_rules() -> RuleSet:
+    """Return the rule set the extractors are currently using."""
+    return RULES
+
+def use_rules(rules: RuleSet) -> None:
+    """Make rules the active rule set for the extractors and the classifier."""
+    global RULES, CLASSIFIER
+    RULES, CLASSIFIER = rules, rules.classifier
+
+# Length/time limits per message (see message_budget.py); use_budget() swaps them
+BUDGET: MessageBudget = MessageBudget()
+
+def active_budget() -> MessageBudget:
+    """Return the per-message budget extraction is currently using."""
+    return BUDGET
+
+def use_budget(budget: MessageBudget) -> None:
+    """Make budget the per-message limit for extraction in this process."""
+    global BUDGET
+    BUDGET = budget
+
+def reload_rules_if_changed() -> bool:
+    """
+    Reload the active rules if their files were edited. A file that fails to
+    load (e.g. saved mid-edit) keeps the current rules until it changes again.
+    """
+    if not RULES.changed():
+        return False
+    try:
+        rules = load_rules(RULES.source)
+    except (OSError, ValueError, KeyError, re.error) as e:
+        RULES.mark_current()
+        print(f"Keeping rules {RULES.version}: reloading {RULES.source} failed ({e})", file=sys.stderr)
+        return False
+    use_rules(rules)
+    return True
+
+
+# ============================================
+# FIELD EXTRACTORS
+# ============================================
+
+def extract_contact_info(text: Union[str, NormalizedText]) -> Dict[str, Optional[str]]:
     """Extract contact information from message text."""
+    view = normalize(text)
+    folded = view.folded
     contact = {
         'contact_phone': None,
         'contact_whatsapp': None,
@@ -19,63 +94,54 @@ def extract_contact_info(text: str) -> Dict[str, Optional[str]]:
         'website_url': None
     }
 
+    rules = RULES
+
     # Phone patterns (various formats)
-    phone_patterns = [
-        r'\b(\+?52\s?1?\s?\d{10})\b',
-        r'\b(\d{10})\b',
-        r'\b(\+?\d{1,3}[\s-]?\d{3,4}[\s-]?\d{3,4}[\s-]?\d{3,4})\b'
-    ]
-    for pattern in phone_patterns:
-        match = re.search(pattern, text)
+    for pattern in rules.phone_patterns:
+        match = re.search(pattern, folded)
         if match:
-            contact['contact_phone'] = match.group(1).strip()
+            contact['contact_phone'] = view.span(*match.span(1)).strip()
             break
 
     # WhatsApp (often mentioned explicitly)
-    wa_match = re.search(r'(?:whatsapp|wa|what\'s app)[\s:]*(\+?\d[\d\s-]+)', text, re.IGNORECASE)
+    wa_match = re.search(rules.whatsapp_pattern, folded)
     if wa_match:
-        contact['contact_whatsapp'] = wa_match.group(1).strip()
+        contact['contact_whatsapp'] = view.span(*wa_match.span(1)).strip()
 
     # Instagram
-    ig_patterns = [
-        r'(?:instagram|ig|insta)[\s:@]*([a-zA-Z0-9._]+)',
-        r'@([a-zA-Z0-9._]+)'
-    ]
-    for pattern in ig_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in rules.instagram_patterns:
+        match = re.search(pattern, folded)
         if match:
-            username = match.group(1).strip()
+            username = view.span(*match.span(1)).strip()
             if username and len(username) > 2 and not username.startswith('g.us'):
                 contact['contact_instagram'] = username
                 break
 
     # Email
-    email_match = re.search(r'\b([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b', text)
+    email_match = re.search(rules.email_pattern, folded)
     if email_match:
-        contact['contact_email'] = email_match.group(1).strip()
+        contact['contact_email'] = view.span(*email_match.span(1)).strip()
 
     # Website
-    url_match = re.search(r'(?:https?://)?(?:www\.)?([a-zA-Z0-9-]+\.[a-zA-Z]{2,}(?:/[^\s]*)?)', text)
+    url_match = re.search(rules.website_pattern, folded)
     if url_match:
-        contact['website_url'] = url_match.group(0).strip()
+        contact['website_url'] = view.span(*url_match.span()).strip()
 
     return contact
 
-def extract_price(text: str) -> Tuple[Optional[str], Optional[float], Optional[str]]:
+def extract_price(text: Union[str, NormalizedText]) -> Tuple[Optional[str], Optional[float], Optional[str]]:
     """Extract price information from text. Returns (full_price_string, amount, currency)."""
+    view = normalize(text)
+    folded = view.folded
+    rules = RULES
+
     # Look for free
-    if re.search(r'\b(?:free|gratis|gratuito)\b', text, re.IGNORECASE):
+    if re.search(rules.free_pattern, folded):
         return ('Free', 0.0, None)
 
     # Look for price patterns
-    price_patterns = [
-        r'(\$\s?\d+(?:,\d{3})*(?:\.\d{2})?)\s*(MXN|USD|pesos?)?',
-        r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(MXN|USD|pesos?)',
-        r'(MXN|USD)?\s*(\$?\s?\d+(?:,\d{3})*(?:\.\d{2})?)'
-    ]
-
-    for pattern in price_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in rules.price_patterns:
+        match = re.search(pattern, folded)
         if match:
             groups = match.groups()
             amount_str = ''.join(c for c in str(groups[0] if groups[0] else groups[1]) if c.isdigit() or c == '.')
@@ -90,39 +156,30 @@ def extract_price(text: str) -> Tuple[Optional[str], Optional[float], Optional[s
                     elif len(groups) > 0 and groups[0]:
                         if 'PESO' in groups[0].upper():
                             currency = 'MXN'
-                    return (match.group(0), amount, currency if currency else 'MXN')
+                    return (view.span(*match.span()), amount, currency if currency else rules.default_currency)
                 except ValueError:
                     pass
 
     return (None, None, None)
 
-def extract_date(text: str) -> Optional[str]:
+def extract_date(text: Union[str, NormalizedText]) -> Optional[str]:
     """Extract date from text and convert to YYYY-MM-DD format."""
-    # Date patterns
-    patterns = [
-        r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})',  # DD/MM/YYYY or MM/DD/YYYY
-        r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})',  # YYYY-MM-DD
-        r'(\d{1,2})\s+(?:de\s+)?([A-Za-z]+)\s+(?:de\s+)?(\d{4})',  # DD de Mes de YYYY
-    ]
-
-    months_es = {
-        'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
-        'julio': 7, 'agosto': 8, 'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-    }
+    folded = normalize(text).folded
+    rules = RULES
 
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for kind, pattern in rules.date_patterns:
+        match = re.search(pattern, folded)
         if match:
             groups = match.groups()
             try:
-                if pattern == patterns[2]:  # Month name pattern
+                if kind == 'day_month_name_year':  # DD de Mes de YYYY
                     day = int(groups[0])
-                    month_name = groups[1].lower()
+                    month_name = groups[1]
                     year = int(groups[2])
-                    month = months_es.get(month_name)
+                    month = rules.months.get(month_name)
                     if month:
                         return f"{year:04d}-{month:02d}-{day:02d}"
-                elif pattern == patterns[1]:  # YYYY-MM-DD
+                elif kind == 'year_month_day':  # YYYY-MM-DD
                     return f"{int(groups[0]):04d}-{int(groups[1]):02d}-{int(groups[2]):02d}"
                 else:  # DD/MM/YYYY - assume day/month format
                     day = int(groups[0])
@@ -134,33 +191,29 @@ def extract_date(text: str) -> Optional[str]:
                 pass
 
     # Look for relative dates
-    if re.search(r'\b(?:hoy|today)\b', text, re.IGNORECASE):
+    if re.search(rules.today_pattern, folded):
         return datetime.now().strftime('%Y-%m-%d')
-    if re.search(r'\b(?:mañana|tomorrow)\b', text, re.IGNORECASE):
+    if re.search(rules.tomorrow_pattern, folded):
         from datetime import timedelta
         return (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
 
     return None
 
-def extract_time(text: str) -> Optional[str]:
+def extract_time(text: Union[str, NormalizedText]) -> Optional[str]:
     """Extract time from text and convert to HH:MM:SS format."""
-    # Time patterns
-    patterns = [
-        r'(\d{1,2}):(\d{2})\s*(?:am|pm|AM|PM)?',
-        r'(\d{1,2})\s*(?:am|pm|AM|PM)',
-    ]
+    folded = normalize(text).folded
 
-    for pattern in patterns:
-        match = re.search(pattern, text)
+    for pattern in RULES.time_patterns:
+        match = re.search(pattern, folded)
         if match:
             groups = match.groups()
             hour = int(groups[0])
             minute = int(groups[1]) if len(groups) > 1 and groups[1] else 0
 
             # Handle AM/PM
-            if re.search(r'pm', match.group(0), re.IGNORECASE) and hour < 12:
+            if 'pm' in match.group(0) and hour < 12:
                 hour += 12
-            elif re.search(r'am', match.group(0), re.IGNORECASE) and hour == 12:
+            elif 'am' in match.group(0) and hour == 12:
                 hour = 0
 
             if 0 <= hour < 24 and 0 <= minute < 60:
@@ -168,112 +221,53 @@ def extract_time(text: str) -> Optional[str]:
 
     return None
 
-def is_event_message(text: str) -> bool:
+# ============================================
+# CLASSIFICATION
+# ============================================
+
+def classify_message(text: Union[str, NormalizedText]) -> Classification:
+    """Classify a message against every keyword table in one pass."""
+    result = CLASSIFIER.classify(normalize(text).folded)
+    place_type = result['place_type']
+    return Classification(
+        is_event=result['event'],
+        is_place=result['place'],
+        is_service=result['service'],
+        event_category=result['event_category'] or 'other',
+        place_type=place_type or 'venue',
+        place_category=RULES.place_categories[place_type] if place_type else 'General',
+        service_category=result['service_category'] or 'other'
+    )
+
+def is_event_message(text: Union[str, NormalizedText]) -> bool:
     """Determine if a message is advertising an event."""
-    event_keywords = [
-        r'\bevento\b', r'\bworkshop\b', r'\btaller\b', r'\bclase\b', r'\bclass\b',
-        r'\bfiesta\b', r'\bparty\b', r'\bconcert\b', r'\bconcierto\b',
-        r'\bperformance\b', r'\bgathering\b', r'\breunión\b', r'\bceremony\b',
-        r'\bceremonia\b', r'\bfestival\b', r'\bretiro\b', r'\bretreat\b',
-        r'\bcircle\b', r'\bcírculo\b', r'\bsession\b', r'\bsesión\b',
-        r'\binvit(?:ación|amos|an)\b', r'\bnext\b', r'\bpróximo\b',
-        r'\bthis\s+(?:week|friday|saturday|sunday)\b',
-        r'\beste\s+(?:viernes|sábado|domingo|fin de semana)\b'
-    ]
-
-    return any(re.search(keyword, text, re.IGNORECASE) for keyword in event_keywords)
-
-def is_place_message(text: str) -> bool:
-    """Determine if a message mentions a place/venue."""
-    place_keywords = [
-        r'\brestaurant\b', r'\bcafe\b', r'\bcafé\b', r'\bbar\b',
-        r'\bhotel\b', r'\bhostel\b', r'\bcabañas?\b', r'\bbeach\b', r'\bplaya\b',
-        r'\bstudio\b', r'\bvenue\b', r'\bespacio\b', r'\btienda\b', r'\bshop\b',
-        r'\blocation\b', r'\bubicación\b', r'\baddress\b', r'\bdirección\b',
-        r'\babre\b', r'\bopen\b', r'\bhorario\b', r'\bhours\b'
-    ]
+    return CLASSIFIER.classify(normalize(text).folded)['event']
 
-    return any(re.search(keyword, text, re.IGNORECASE) for keyword in place_keywords)
+def is_place_message(text: Union[str, NormalizedText]) -> bool:
+    """Determine if a message mentions a place/venue."""
+    return CLASSIFIER.classify(normalize(text).folded)['place']
 
-def is_service_message(text: str) -> bool:
+def is_service_message(text: Union[str, NormalizedText]) -> bool:
     """Determine if a message is offering a service."""
-    service_keywords = [
-        r'\bofrez(?:co|ca)\b', r'\boffer\b', r'\bservicio\b', r'\bservice\b',
-        r'\byoga\b', r'\bmasaje\b', r'\bmassage\b', r'\btherapy\b', r'\bterapia\b',
-        r'\bteaching\b', r'\benseñanza\b', r'\bclases?\b', r'\blessons?\b',
-        r'\btransport\b', r'\btransporte\b', r'\bdriver\b', r'\bchofer\b',
-        r'\bcleaning\b', r'\blimpieza\b', r'\brepair\b', r'\breparación\b',
-        r'\bcooking\b', r'\bcocina\b', r'\bhaircut\b', r'\bcorte de pelo\b',
-        r'\bvendo\b', r'\bselling\b', r'\bfor sale\b', r'\bse vende\b'
-    ]
-
-    return any(re.search(keyword, text, re.IGNORECASE) for keyword in service_keywords)
-
-def categorize_event(text: str) -> str:
-    """Categorize an event based on keywords."""
-    categories = {
-        'party': [r'\bfiesta\b', r'\bparty\b', r'\bdance\b', r'\bbaile\b', r'\bdj\b'],
-        'workshop': [r'\bworkshop\b', r'\btaller\b', r'\btraining\b', r'\bentrenamiento\b'],
-        'wellness': [r'\byoga\b', r'\bmeditation\b', r'\bmeditación\b', r'\bwellness\b', r'\bbienestar\b', r'\bhealing\b', r'\bsanación\b'],
-        'music': [r'\bmusic\b', r'\bmúsica\b', r'\bconcert\b', r'\bconcierto\b', r'\bband\b', r'\bbanda\b', r'\blive\s+music\b'],
-        'art': [r'\bart\b', r'\barte\b', r'\bpainting\b', r'\bpintura\b', r'\bexhibition\b', r'\bexposición\b', r'\bcraft\b'],
-        'spirituality': [r'\bspiritual\b', r'\bceremony\b', r'\bceremonia\b', r'\bcircle\b', r'\bcírculo\b', r'\brituel\b', r'\britual\b'],
-        'food': [r'\bfood\b', r'\bcomida\b', r'\bdinner\b', r'\bcena\b', r'\blunch\b', r'\bcocina\b', r'\bcooking\b'],
-        'sports': [r'\bsport\b', r'\bdeporte\b', r'\bsurf\b', r'\bhiking\b', r'\bcaminata\b', r'\bfitness\b']
-    }
+    return CLASSIFIER.classify(normalize(text).folded)['service']
 
-    for category, keywords in categories.items():
-        if any(re.search(keyword, text, re.IGNORECASE) for keyword in keywords):
-            return category
-
-    return 'other'
+def categorize_event(text: Union[str, NormalizedText]) -> str:
+    """Categorize an event based on keywords."""
+    return classify_message(text).event_category
 
-def categorize_place(text: str) -> Tuple[str, str]:
+def categorize_place(text: Union[str, NormalizedText]) -> Tuple[str, str]:
     """Categorize a place. Returns (type, category)."""
-    place_types = {
-        'restaurant': ([r'\brestaurant\b', r'\bcafe\b', r'\bcafé\b', r'\bbar\b', r'\bfood\b', r'\bcomida\b'], 'Food & Drink'),
-        'accommodation': ([r'\bhotel\b', r'\bhostel\b', r'\bcabaña\b', r'\bcabin\b', r'\bstay\b', r'\balojamiento\b'], 'Lodging'),
-        'venue': ([r'\bvenue\b', r'\bespacio\b', r'\bsala\b', r'\bhall\b', r'\bcenter\b', r'\bcentro\b'], 'Event Space'),
-        'activity': ([r'\bbeach\b', r'\bplaya\b', r'\bsurf\b', r'\btour\b', r'\bactividad\b', r'\bactivity\b'], 'Activities'),
-        'shop': ([r'\btienda\b', r'\bshop\b', r'\bstore\b', r'\bmercado\b', r'\bmarket\b'], 'Shopping'),
-        'studio': ([r'\bstudio\b', r'\bespacio\b', r'\bgallery\b', r'\bgalería\b'], 'Creative Space')
-    }
-
-    for place_type, (keywords, category) in place_types.items():
-        if any(re.search(keyword, text, re.IGNORECASE) for keyword in keywords):
-            return (place_type, category)
-
-    return ('venue', 'General')
+    classification = classify_message(text)
+    return (classification.place_type, classification.place_category)
 
-def categorize_service(text: str) -> str:
+def categorize_service(text: Union[str, NormalizedText]) -> str:
     """Categorize a service."""
-    categories = {
-        'wellness': [r'\byoga\b', r'\bmasaje\b', r'\bmassage\b', r'\btherapy\b', r'\bterapia\b', r'\bhealing\b', r'\breiki\b'],
-        'art': [r'\bart\b', r'\barte\b', r'\bpainting\b', r'\bmusic\b', r'\bmúsica\b', r'\bcraft\b'],
-        'education': [r'\bteaching\b', r'\bclase\b', r'\blesson\b', r'\btutoría\b', r'\bcurso\b', r'\bcourse\b'],
-        'food': [r'\bfood\b', r'\bcomida\b', r'\bcooking\b', r'\bcatering\b', r'\bchef\b'],
-        'accommodation': [r'\broom\b', r'\bhabitación\b', r'\brent\b', r'\balquiler\b', r'\bstay\b'],
-        'transportation': [r'\btransport\b', r'\btaxi\b', r'\bdriver\b', r'\bchofer\b', r'\bcar\b', r'\bcoche\b'],
-        'repair': [r'\brepair\b', r'\breparación\b', r'\bfix\b', r'\barreglo\b'],
-        'beauty': [r'\bhair\b', r'\bpelo\b', r'\bnails\b', r'\buñas\b', r'\bbeauty\b', r'\bbelleza\b']
-    }
-
-    for category, keywords in categories.items():
-        if any(re.search(keyword, text, re.IGNORECASE) for keyword in keywords):
-            return category
-
-    return 'other'
+    return classify_message(text).service_category
 
 def extract_location(text: str) -> Optional[str]:
     """Extract location/venue name from text."""
     # Look for location indicators
-    location_patterns = [
-        r'(?:en|at|@)\s+([A-Z][A-Za-z\s]{2,30})',
-        r'(?:ubicación|location|lugar|place)[\s:]+([A-Za-z\s]{3,30})',
-        r'(?:venue|espacio)[\s:]+([A-Za-z\s]{3,30})'
-    ]
-
-    for pattern in location_patterns:
+    for pattern in RULES.location_patterns:
         match = re.search(pattern, text)
         if match:
             location = match.group(1).strip()
@@ -284,12 +278,7 @@ def extract_location(text: str) -> Optional[str]:
 
 def extract_organizer(text: str) -> Optional[str]:
     """Extract organizer name from text."""
-    organizer_patterns = [
-        r'(?:organiza|organized by|host|hosted by)[\s:]+([A-Z][A-Za-z\s]{2,30})',
-        r'(?:con|with|by)\s+([A-Z][A-Za-z\s]{2,30})',
-    ]
-
-    for pattern in organizer_patterns:
+    for pattern in RULES.organizer_patterns:
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             organizer = match.group(1).strip()
@@ -298,109 +287,893 @@ def extract_organizer(text: str) -> Optional[str]:
 
     return None
 
-def process_messages(input_file: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
-    """Process messages and extract events, places, and services."""
+# ============================================
+# STREAMING INPUT
+# ============================================
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        messages = json.load(f)
+READ_CHUNK_SIZE = 1 << 16
 
-    events = []
-    places = []
-    services = []
+# Messages per task when extracting with a process pool
+DEFAULT_CHUNK_SIZE = 500
 
-    for msg in messages:
-        message_id = msg.get('id')
-        text = msg.get('message_body', '')
+def iter_messages(input_file: str) -> Iterator[Dict]:
+    """
+    Yield messages one at a time from a JSON array export or a JSONL file.
+
+    The format is detected from the first non-whitespace character, and JSON
+    arrays are decoded element by element so the whole export never has to be
+    held in memory. Files ending in .gz are decompressed on the fly.
+    """
+    opener = gzip.open if input_file.endswith('.gz') else open
+    with opener(input_file, 'rt', encoding='utf-8') as f:
+        head = ''
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            head = chunk.lstrip()
+            if head:
+                break
 
-        if not text or len(text) < 10:
+        if head[0] == '[':
+            yield from _iter_json_array(f, head[1:])
+        else:
+            yield from _iter_json_lines(f, head)
+
+
+def _iter_json_array(f: TextIO, buffer: str) -> Iterator[Dict]:
+    """Decode the elements of a JSON array incrementally from an open file."""
+    decoder = json.JSONDecoder()
+    eof = False
+    pos = 0
+
+    while True:
+        # Skip separators between elements
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError('Need more data', buffer, pos)
+            item, end = decoder.raw_decode(buffer, pos)
+            # A scalar that ends exactly at the buffer edge may continue in the next chunk
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError('Need more data', buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
             continue
 
-        contact_info = extract_contact_info(text)
-
-        # Extract events
-        if is_event_message(text):
-            event = {
-                'id': str(uuid.uuid4()),
-                'city_id': 'mazunte',
-                'message_id': message_id,
-                'title': text[:100].strip() if len(text) > 100 else text.strip(),
-                'description': text,
-                'date': extract_date(text),
-                'time': extract_time(text),
-                'location_name': extract_location(text),
-                'category': categorize_event(text),
-                'price': extract_price(text)[0],
-                'organizer_name': extract_organizer(text),
-                **contact_info
-            }
-            events.append(event)
-
-        # Extract places
-        if is_place_message(text):
-            place_type, place_category = categorize_place(text)
-            place = {
-                'id': str(uuid.uuid4()),
-                'city_id': 'mazunte',
-                'message_id': message_id,
-                'name': extract_location(text) or text[:50].strip(),
-                'type': place_type,
-                'category': place_category,
-                'description': text,
-                'location_name': extract_location(text),
-                'hours': None,  # Could be extracted with more specific patterns
-                **contact_info
-            }
-            places.append(place)
-
-        # Extract services
-        if is_service_message(text):
-            price_str, price_amount, price_currency = extract_price(text)
-            service = {
-                'id': str(uuid.uuid4()),
-                'city_id': 'mazunte',
-                'message_id': message_id,
-                'title': text[:100].strip() if len(text) > 100 else text.strip(),
-                'description': text,
-                'category': categorize_service(text),
-                'price_type': 'fixed' if price_amount else 'negotiable',
-                'price_amount': price_amount,
-                'price_currency': price_currency,
-                'price_notes': price_str,
-                **contact_info
-            }
-            services.append(service)
-
-    return events, places, services
+        yield item
+        pos = end
+
+
+def _iter_json_lines(f: TextIO, head: str) -> Iterator[Dict]:
+    """Decode newline-delimited JSON, starting with an already-read chunk."""
+    pending = head
+    while True:
+        chunk = f.read(READ_CHUNK_SIZE)
+        pending += chunk
+        lines = pending.split('\n')
+        # Keep the trailing partial line until more data (or EOF) arrives
+        pending = lines.pop() if chunk else ''
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        if not chunk:
+            return
+
+# ============================================
+# MULTI-FILE INPUT
+# ============================================
+
+INPUT_EXTENSIONS = ('.json', '.jsonl', '.ndjson', '.json.gz', '.jsonl.gz', '.ndjson.gz')
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Expand directories into their message exports, sorted by file name."""
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(INPUT_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    return files
+
+class MessageDeduplicator:
+    """
+    Drops messages already seen in an earlier (overlapping) export.
+
+    WhatsApp ids identify a message across snapshots, but the listener's
+    local_* ids are generated per capture, so those are matched on
+    (group_id, timestamp, body hash) instead. Only 16-byte digests are kept.
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self.duplicates = 0
+
+    @staticmethod
+    def key(msg: Dict) -> bytes:
+        message_id = msg.get('id')
+        if message_id and not str(message_id).startswith('local_'):
+            source = f"id\0{message_id}"
+        else:
+            body_hash = hashlib.sha1((msg.get('message_body') or '').encode('utf-8')).hexdigest()
+            source = f"local\0{msg.get('group_id')}\0{msg.get('timestamp')}\0{body_hash}"
+        return hashlib.blake2b(source.encode('utf-8'), digest_size=16).digest()
+
+    def filter(self, messages: Iterable[Dict]) -> Iterator[Dict]:
+        for msg in messages:
+            key = self.key(msg)
+            if key in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(key)
+            yield msg
+
+def iter_input_messages(inputs: Iterable[str],
+                        deduplicator: Optional[MessageDeduplicator] = None) -> Iterator[Dict]:
+    """Stream messages from several exports (files or directories) as one deduplicated stream."""
+    messages = itertools.chain.from_iterable(iter_messages(path) for path in expand_inputs(inputs))
+    return (deduplicator or MessageDeduplicator()).filter(messages)
+
+# ============================================
+# EXTRACTION PIPELINE
+# ============================================
+
+# Namespace for reproducible entity ids (uuid5 of kind + source message)
+ENTITY_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'whatsapp-scrapper/extract-entities')
+
+def make_entity_id(kind: str, message_id: Optional[str], text: str, deterministic: bool = False) -> str:
+    """Return a random entity id, or a stable one derived from the source message."""
+    if not deterministic:
+        return str(uuid.uuid4())
+    source = message_id if message_id is not None else hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return str(uuid.uuid5(ENTITY_ID_NAMESPACE, f"{kind}:{source}"))
+
+class MessageAnalysis:
+    """
+    Lazily computed features of one message body.
+
+    Each derived field is extracted on first access and cached, so the event,
+    place and service builders share a single extractor call per field and a
+    message that matches no entity type never pays for contact parsing. The
+    body is normalized once and that view is shared by the classifier and
+    the contact, price, date and time extractors.
+
+    With a MessageBudget, a long body is analysed through its head/tail
+    window, and extractors that would start after the message's deadline
+    return their empty value instead of running.
+    """
+
+    def __init__(self, text: str, resolver: Optional[LandmarkResolver] = None,
+                 budget: Optional[MessageBudget] = None):
+        self.text = budget.window(text) if budget is not None else text
+        self.resolver = resolver
+        self.budget = budget
+        self.deadline = budget.deadline() if budget is not None else None
+        self.over_budget = False
+
+    def _run(self, name: str, extractor: Callable, arg, empty):
+        if self.deadline is not None and perf_counter() > self.deadline:
+            self.budget.skip(name, first=not self.over_budget)
+            self.over_budget = True
+            return empty
+        return extractor(arg)
+
+    @cached_property
+    def normalized(self) -> NormalizedText:
+        return normalize(self.text)
+
+    @cached_property
+    def classification(self) -> Classification:
+        return classify_message(self.normalized)
+
+    @cached_property
+    def contact_info(self) -> Dict[str, Optional[str]]:
+        return self._run('contact', extract_contact_info, self.normalized, dict.fromkeys(CONTACT_KEYS))
+
+    @cached_property
+    def price(self) -> Tuple[Optional[str], Optional[float], Optional[str]]:
+        return self._run('price', extract_price, self.normalized, (None, None, None))
+
+    @cached_property
+    def date(self) -> Optional[str]:
+        return self._run('date', extract_date, self.normalized, None)
+
+    @cached_property
+    def time(self) -> Optional[str]:
+        return self._run('time', extract_time, self.normalized, None)
+
+    @cached_property
+    def location(self) -> Optional[str]:
+        return self._run('location', extract_location, self.text, None)
+
+    @cached_property
+    def organizer(self) -> Optional[str]:
+        return self._run('organizer', extract_organizer, self.text, None)
+
+    @cached_property
+    def landmark(self) -> Optional[Match]:
+        if self.resolver is None:
+            return None
+        return self._run('landmark', self.resolver.resolve, self.location, None)
+
+# ============================================
+# ENTITY RECORDS
+# ============================================
+
+CONTACT_KEYS = ('contact_phone', 'contact_whatsapp', 'contact_instagram', 'contact_email', 'website_url')
+
+def _title(text: str) -> str:
+    return text[:100].strip() if len(text) > 100 else text.strip()
+
+class EntityRecord(Mapping):
+    """
+    Compact, read-only view of one extracted entity.
+
+    Records keep a reference to the source message body and to the contact
+    dict shared by every entity of that message, and derive the title-like
+    fields on demand. They behave as mappings with the same keys, in the same
+    order, as the JSON rows; to_dict() produces the serialized shape.
+    """
+
+    __slots__ = ('id', 'city_id', 'message_id', 'description', 'contact')
+
+    kind = ''
+    KEYS: Tuple[str, ...] = ()
+    _COMPUTED: Dict[str, Callable[['EntityRecord'], object]] = {}
+
+    def __init__(self, id: str, message_id: Optional[str], description: str,
+                 contact: Dict[str, Optional[str]], city_id: str = 'mazunte'):
+        self.id = id
+        self.city_id = city_id
+        self.message_id = message_id
+        self.description = description
+        self.contact = contact
+
+    def __getitem__(self, key: str):
+        if key in self.contact:
+            return self.contact[key]
+        getter = self._COMPUTED.get(key)
+        if getter is not None:
+            return getter(self)
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r}, message_id={self.message_id!r})"
+
+    def to_dict(self) -> Dict:
+        """Return the entity in its serialized JSON shape."""
+        return {key: self[key] for key in self.KEYS}
+
+class EventRecord(EntityRecord):
+    __slots__ = ('date', 'time', 'location_name', 'category', 'price', 'organizer_name')
+
+    kind = 'event'
+    KEYS = ('id', 'city_id', 'message_id', 'title', 'description', 'date', 'time',
+            'location_name', 'category', 'price', 'organizer_name') + CONTACT_KEYS
+    _COMPUTED = {'title': lambda record: _title(record.description)}
+
+    def __init__(self, id, message_id, description, contact, date, time, location_name,
+                 category, price, organizer_name, city_id='mazunte'):
+        super().__init__(id, message_id, description, contact, city_id)
+        self.date = date
+        self.time = time
+        self.location_name = location_name
+        self.category = category
+        self.price = price
+        self.organizer_name = organizer_name
+
+class PlaceRecord(EntityRecord):
+    __slots__ = ('type', 'category', 'location_name')
+
+    kind = 'place'
+    KEYS = ('id', 'city_id', 'message_id', 'name', 'type', 'category', 'description',
+            'location_name', 'hours') + CONTACT_KEYS
+    _COMPUTED = {
+        'name': lambda record: record.location_name or record.description[:50].strip(),
+        'hours': lambda record: None,  # Could be extracted with more specific patterns
+    }
+
+    def __init__(self, id, message_id, description, contact, type, category, location_name,
+                 city_id='mazunte'):
+        super().__init__(id, message_id, description, contact, city_id)
+        self.type = type
+        self.category = category
+        self.location_name = location_name
+
+class ServiceRecord(EntityRecord):
+    __slots__ = ('category', 'price_amount', 'price_currency', 'price_notes')
+
+    kind = 'service'
+    KEYS = ('id', 'city_id', 'message_id', 'title', 'description', 'category', 'price_type',
+            'price_amount', 'price_currency', 'price_notes') + CONTACT_KEYS
+    _COMPUTED = {
+        'title': lambda record: _title(record.description),
+        'price_type': lambda record: 'fixed' if record.price_amount else 'negotiable',
+    }
+
+    def __init__(self, id, message_id, description, contact, category, price_amount,
+                 price_currency, price_notes, city_id='mazunte'):
+        super().__init__(id, message_id, description, contact, city_id)
+        self.category = category
+        self.price_amount = price_amount
+        self.price_currency = price_currency
+        self.price_notes = price_notes
+
+# Added to events and places when a landmark resolver is in use
+LANDMARK_KEYS = ('lat', 'lng', 'place_id', 'match_score')
+
+def _landmark_getter(key: str) -> Callable[[EntityRecord], object]:
+    def get(record):
+        match = record.landmark
+        if match is None:
+            return None
+        return match.score if key == 'match_score' else getattr(match.landmark, key)
+    return get
+
+_LANDMARK_FIELDS = {key: _landmark_getter(key) for key in LANDMARK_KEYS}
+
+class LocatedEventRecord(EventRecord):
+    """Event with the coordinates of the landmark its location resolved to."""
+    __slots__ = ('landmark',)
+
+    KEYS = EventRecord.KEYS + LANDMARK_KEYS
+    _COMPUTED = {**EventRecord._COMPUTED, **_LANDMARK_FIELDS}
+
+    def __init__(self, *args, landmark: Optional[Match] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.landmark = landmark
+
+class LocatedPlaceRecord(PlaceRecord):
+    """Place with the coordinates of the landmark its location resolved to."""
+    __slots__ = ('landmark',)
+
+    KEYS = PlaceRecord.KEYS + LANDMARK_KEYS
+    _COMPUTED = {**PlaceRecord._COMPUTED, **_LANDMARK_FIELDS}
+
+    def __init__(self, *args, landmark: Optional[Match] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.landmark = landmark
+
+def _located(analysis: MessageAnalysis) -> Dict[str, Optional[Match]]:
+    """Landmark keyword argument for Located*Record, empty without a resolver."""
+    return {'landmark': analysis.landmark} if analysis.resolver is not None else {}
+
+def extract_message(msg: Dict, deterministic_ids: bool = False,
+                    resolver: Optional[LandmarkResolver] = None) -> List[Tuple[str, EntityRecord]]:
+    """
+    Extract entities from a single message. Returns (kind, record) pairs.
+
+    With a resolver, events and places also carry lat, lng, place_id and
+    match_score of the landmark their location name resolved to.
+    """
+    message_id = msg.get('id')
+    text = msg.get('message_body', '')
+
+    if not text or len(text) < 10:
+        return []
+
+    extracted = []
+    city_id = RULES.city_id
+    analysis = MessageAnalysis(text, resolver, BUDGET)
+    classification = analysis.classification
+    if resolver is not None:
+        event_record, place_record = LocatedEventRecord, LocatedPlaceRecord
+    else:
+        event_record, place_record = EventRecord, PlaceRecord
+
+    # Extract events
+    if classification.is_event:
+        event = event_record(
+            id=make_entity_id('event', message_id, text, deterministic_ids),
+            message_id=message_id,
+            description=text,
+            contact=analysis.contact_info,
+            date=analysis.date,
+            time=analysis.time,
+            location_name=analysis.location,
+            category=classification.event_category,
+            price=analysis.price[0],
+            organizer_name=analysis.organizer,
+            city_id=city_id,
+            **_located(analysis)
+        )
+        extracted.append(('event', event))
+
+    # Extract places
+    if classification.is_place:
+        place = place_record(
+            id=make_entity_id('place', message_id, text, deterministic_ids),
+            message_id=message_id,
+            description=text,
+            contact=analysis.contact_info,
+            type=classification.place_type,
+            category=classification.place_category,
+            location_name=analysis.location,
+            city_id=city_id,
+            **_located(analysis)
+        )
+        extracted.append(('place', place))
+
+    # Extract services
+    if classification.is_service:
+        price_str, price_amount, price_currency = analysis.price
+        service = ServiceRecord(
+            id=make_entity_id('service', message_id, text, deterministic_ids),
+            message_id=message_id,
+            description=text,
+            contact=analysis.contact_info,
+            category=classification.service_category,
+            price_amount=price_amount,
+            price_currency=price_currency,
+            price_notes=price_str,
+            city_id=city_id
+        )
+        extracted.append(('service', service))
+
+    return extracted
+
+def iter_entities(messages: Iterable[Dict], workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  deterministic_ids: bool = False,
+                  resolver: Optional[LandmarkResolver] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Lazily extract (kind, entity) pairs from a stream of messages.
+
+    With workers > 1 the stream is split into chunks that are extracted in a
+    process pool; results are yielded in the original message order.
+    """
+    if workers <= 1:
+        for msg in messages:
+            yield from extract_message(msg, deterministic_ids, resolver)
+        return
+
+    yield from _iter_entities_parallel(messages, workers, chunk_size, deterministic_ids, resolver)
+
+# Landmark resolver of a pool worker, sent once per process by _init_worker
+_worker_resolver: Optional[LandmarkResolver] = None
+
+def _init_worker(resolver: Optional[LandmarkResolver], rules: RuleSet, budget: MessageBudget) -> None:
+    # Spawned workers re-import this module with the default rules and budget
+    global _worker_resolver
+    _worker_resolver = resolver
+    use_rules(rules)
+    use_budget(budget)
+
+def _extract_chunk(chunk: List[Dict], deterministic_ids: bool) -> Tuple[List[Tuple[str, Dict]], Dict]:
+    """Worker entry point: extract every message of one chunk in order, plus its budget counts."""
+    extracted = []
+    for msg in chunk:
+        extracted.extend(extract_message(msg, deterministic_ids, _worker_resolver))
+    return extracted, BUDGET.take_counts()
+
+def _chunked(messages: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Group a message stream into lists of at most size messages."""
+    chunk = []
+    for msg in messages:
+        chunk.append(msg)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _iter_entities_parallel(messages: Iterable[Dict], workers: int, chunk_size: int,
+                            deterministic_ids: bool,
+                            resolver: Optional[LandmarkResolver] = None) -> Iterator[Tuple[str, Dict]]:
+    """Extract chunks in a process pool, keeping at most a few chunks in flight."""
+    max_in_flight = workers * 2
+    initargs = (resolver, RULES, MessageBudget(BUDGET.max_chars, BUDGET.max_seconds))
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = deque()
+
+        def drain() -> List[Tuple[str, Dict]]:
+            extracted, counts = pending.popleft().get()
+            BUDGET.merge(counts)
+            return extracted
+
+        for chunk in _chunked(messages, chunk_size):
+            pending.append(pool.apply_async(_extract_chunk, (chunk, deterministic_ids)))
+            # Results are drained in submission order, which keeps the output order
+            # identical to a serial run and bounds how much input is buffered.
+            if len(pending) >= max_in_flight:
+                yield from drain()
+        while pending:
+            yield from drain()
+
+def process_messages(input_file: str, workers: int = 1, deterministic_ids: bool = False,
+                     resolver: Optional[LandmarkResolver] = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """Process messages and extract events, places, and services."""
+    results = {'event': [], 'place': [], 'service': []}
+    for kind, entity in iter_entities(iter_messages(input_file), workers=workers,
+                                      deterministic_ids=deterministic_ids, resolver=resolver):
+        results[kind].append(entity)
+    return results['event'], results['place'], results['service']
+
+# ============================================
+# OUTPUT
+# ============================================
+
+DEFAULT_INPUT = '/Users/astralamat/Documents/Code/whatsapp-scrapper/data/messages_20251026_201832.json'
+DEFAULT_OUTPUT_DIR = '/Users/astralamat/Documents/Code/whatsapp-scrapper'
+
+OUTPUT_FILES = {
+    'event': 'extracted-events',
+    'place': 'extracted-places',
+    'service': 'extracted-services',
+}
+
+INDEX_FILE = 'extraction-index.json'
+CLUSTERS_FILE = 'message-clusters.json'
+INDEX_VERSION = 2
+
+def output_paths(output_dir: str, fmt: str = 'json', compress: bool = False) -> Dict[str, str]:
+    """Return the output file path for each entity kind."""
+    return {kind: output_path(output_dir, name, fmt, compress) for kind, name in OUTPUT_FILES.items()}
+
+def write_entities(paths: Dict[str, str], entities: Iterable[Tuple[str, Mapping]], fmt: str = 'json',
+                   compress: bool = False, atomic: bool = True) -> Dict[str, int]:
+    """
+    Stream (kind, entity) pairs into one output file per kind.
+
+    With atomic writes every file is committed only after the whole stream has
+    been consumed, so the previous outputs stay readable until the new ones
+    exist. If extraction fails, the partial files are discarded.
+    """
+    writers = open_writers(paths, fmt, compress, atomic)
+    try:
+        for kind, entity in entities:
+            writers[kind].write(entity)
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+
+    for writer in writers.values():
+        writer.commit()
+    return {kind: writer.count for kind, writer in writers.items()}
+
+# ============================================
+# INCREMENTAL EXTRACTION
+# ============================================
+
+def message_content_hash(msg: Dict) -> str:
+    """Hash the parts of a message that affect extraction."""
+    return hashlib.sha1((msg.get('message_body') or '').encode('utf-8')).hexdigest()
+
+class ExtractionIndex:
+    """
+    Persistent record of processed messages and their content hashes.
+
+    Messages are keyed by their MessageDeduplicator identity: the WhatsApp
+    id when there is one, otherwise (group, timestamp, body). The listener's
+    local_* ids change with every capture, so keying on them would extract
+    the same message again from each overlapping snapshot.
+    """
+
+    def __init__(self, path: str, messages: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.messages = messages if messages is not None else {}
+        self.changed = 0  # messages yielded by filter_changed()
+
+    @classmethod
+    def load(cls, path: str) -> 'ExtractionIndex':
+        """Load an index from disk, starting empty if it is missing or outdated."""
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get('messages', {}))
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'messages': self.messages}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def filter_changed(self, messages: Iterable[Dict], replaced_ids: set) -> Iterator[Dict]:
+        """
+        Yield only new or edited messages, recording them in the index.
+
+        The ids of edited messages are added to replaced_ids so the entities
+        extracted from their previous text can be dropped when the outputs
+        are merged. New messages have no previous entities to drop.
+        """
+        for msg in messages:
+            content_hash = message_content_hash(msg)
+            key = MessageDeduplicator.key(msg).hex()
+            previous = self.messages.get(key)
+            if previous == content_hash:
+                continue
+            self.messages[key] = content_hash
+            if previous is not None and msg.get('id') is not None:
+                replaced_ids.add(msg['id'])
+            self.changed += 1
+            yield msg
+
+def _iter_existing(path: str, kind: str, replaced_ids: set) -> Iterator[Tuple[str, Dict]]:
+    """Yield previously extracted entities whose source message was not re-extracted."""
+    if not os.path.exists(path):
+        return
+    read = iter_columnar if path.endswith(COLUMNAR_EXTENSION) else iter_messages
+    for entity in read(path):
+        if entity.get('message_id') not in replaced_ids:
+            yield kind, entity
+
+def run_incremental(inputs: List[str], paths: Dict[str, str], index_path: str,
+                    workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    deterministic_ids: bool = False, fmt: str = 'json', compress: bool = False,
+                    deduplicator: Optional[MessageDeduplicator] = None,
+                    resolver: Optional[LandmarkResolver] = None,
+                    organizers: Optional[OrganizerIndex] = None) -> Tuple[Dict[str, int], int]:
+    """
+    Extract only new or edited messages and merge them into the existing outputs.
+
+    Returns (entity counts per kind, number of messages re-extracted). The
+    index is saved only after the merged outputs have been committed. An
+    OrganizerIndex sees the whole merged history, not just the new entities.
+    """
+    index = ExtractionIndex.load(index_path)
+    replaced_ids = set()
+    changed = index.filter_changed(iter_input_messages(inputs, deduplicator), replaced_ids)
+
+    # Only the new entities are held in memory; existing ones are streamed
+    fresh = list(iter_entities(changed, workers=workers, chunk_size=chunk_size,
+                               deterministic_ids=deterministic_ids, resolver=resolver))
+
+    merged = itertools.chain(
+        *(_iter_existing(path, kind, replaced_ids) for kind, path in paths.items()),
+        fresh
+    )
+    if organizers is not None:
+        merged = organizers.observe(merged)
+    # Always atomic: the existing outputs are read while the merged ones are written
+    counts = write_entities(paths, merged, fmt, compress, atomic=True)
+    index.save()
+    return counts, index.changed
+
+# ============================================
+# FOLLOW MODE
+# ============================================
+
+def run_follow(source, paths: Dict[str, str], deterministic_ids: bool = False, compress: bool = False,
+               batch_size: int = DEFAULT_FOLLOW_BATCH, max_interval: float = DEFAULT_MAX_INTERVAL,
+               idle_exit: Optional[float] = None,
+               near_duplicates: Optional[NearDuplicateFilter] = None,
+               deduplicator: Optional[MessageDeduplicator] = None,
+               resolver: Optional[LandmarkResolver] = None) -> Dict:
+    """
+    Extract messages from a FileFollower or SqlFollower as they arrive and
+    append the entities to NDJSON outputs. Batches are extracted in-process:
+    they are small, and a pool would only add latency. Edited rule files are
+    picked up before the next batch.
+    """
+    deduplicator = deduplicator or MessageDeduplicator()
+
+    def extract(batch: List[Dict]) -> Iterator[Tuple[str, Dict]]:
+        if reload_rules_if_changed():
+            print(f"Reloaded rules {RULES.version} from {RULES.source}", flush=True)
+        messages = deduplicator.filter(batch)
+        if near_duplicates is not None:
+            messages = near_duplicates.filter(messages)
+        return iter_entities(messages, deterministic_ids=deterministic_ids, resolver=resolver)
+
+    def report(batch: Dict) -> None:
+        entities = batch['entities']
+        print(f"[{datetime.now():%H:%M:%S}] {batch['messages']} new messages -> "
+              f"{entities['event']} events, {entities['place']} places, {entities['service']} services "
+              f"({batch['seconds'] * 1000:.0f} ms)", flush=True)
+
+    return follow(source, extract, paths, compress=compress, batch_size=batch_size,
+                  max_interval=max_interval, idle_exit=idle_exit, on_batch=report)
 
 def main():
-    input_file = '/Users/astralamat/Documents/Code/whatsapp-scrapper/data/messages_20251026_201832.json'
+    parser = argparse.ArgumentParser(description='Extract events, places, and services from WhatsApp messages.')
+    parser.add_argument('inputs', nargs='*', default=[DEFAULT_INPUT],
+                        help='Message exports (JSON array or JSONL) or directories of exports; '
+                             'overlapping snapshots are merged and deduplicated')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help='Directory for the extracted-*.json files')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Extract with a pool of N processes (output order is unchanged)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Messages per worker task when --workers > 1')
+    parser.add_argument('--deterministic-ids', action='store_true',
+                        help='Derive entity ids from the source message instead of random UUIDs')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only extract new or edited messages and merge them into existing outputs')
+    parser.add_argument('--index-file', default=None,
+                        help=f'Checkpoint index for --incremental (default: <output-dir>/{INDEX_FILE})')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='json',
+                        help='json: pretty JSON arrays (default); ndjson: one entity per line, flushed as '
+                             'produced; columnar: memory-mappable .cols files for fast downstream loading')
+    parser.add_argument('--gzip', action='store_true',
+                        help='Gzip-compress the output files')
+    parser.add_argument('--no-atomic', action='store_true',
+                        help='Write straight to the final paths instead of .partial files renamed on completion')
+    parser.add_argument('--near-dedupe', action='store_true',
+                        help=f'Extract each cluster of near-duplicate reposts once (members go to {CLUSTERS_FILE})')
+    parser.add_argument('--near-dedupe-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Estimated Jaccard similarity at which two messages are reposts')
+    parser.add_argument('--landmarks', action='append', default=[], metavar='JSON',
+                        help='Resolve event/place locations against this landmarks file (repeatable), '
+                             'adding lat, lng, place_id and match_score')
+    parser.add_argument('--landmark-min-score', type=float, default=DEFAULT_MIN_SCORE,
+                        help='Minimum fuzzy match score for a landmark (0-1)')
+    parser.add_argument('--organizers', action='store_true',
+                        help='Normalize contacts and group entities sharing a phone, WhatsApp, Instagram '
+                             f'or email into organizers (written to {ORGANIZERS_FILE})')
+    parser.add_argument('--max-message-chars', type=int, default=DEFAULT_MAX_CHARS,
+                        help='Extract longer messages from their first and last half of this many '
+                             f'characters (default {DEFAULT_MAX_CHARS}, 0 for no limit)')
+    parser.add_argument('--message-budget-ms', type=float, default=DEFAULT_MAX_SECONDS * 1000,
+                        help='Skip the remaining extractors of a message after this much time '
+                             f'(default {DEFAULT_MAX_SECONDS * 1000:.0f}, 0 for no limit)')
+    parser.add_argument('--rules', default=None, metavar='CITY_OR_JSON',
+                        help='Extraction rules: a city with a file in rules/ (e.g. zipolite) or a rules '
+                             'JSON path (default: rules/default.json)')
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep running: tail the inputs (files or directories of session files) and '
+                             'append entities from new messages to NDJSON outputs')
+    parser.add_argument('--follow-db', default=None, metavar='DSN',
+                        help='With --follow, poll this SQLite file or postgresql:// URL for '
+                             'whatsapp_messages rows with processed = false instead of tailing files')
+    parser.add_argument('--follow-batch', type=int, default=DEFAULT_FOLLOW_BATCH,
+                        help='Most messages extracted per micro-batch in --follow mode')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_MAX_INTERVAL,
+                        help='Longest pause between polls while --follow is idle (seconds)')
+    parser.add_argument('--idle-exit', type=float, default=None, metavar='SECONDS',
+                        help='Stop --follow after this many seconds without new messages')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record per-stage timings, pattern hit counts and the slowest messages')
+    parser.add_argument('--profile-output', default=None,
+                        help='Also write the --profile report as JSON to this file')
+    parser.add_argument('--profile-top', type=int, default=10,
+                        help='Number of slowest messages to report with --profile')
+    args = parser.parse_args()
+
+    if args.incremental and args.no_atomic:
+        parser.error('--incremental always commits outputs atomically; drop --no-atomic')
+    if args.incremental and args.near_dedupe:
+        # An incremental run only sees new messages: it would overwrite the clusters of
+        # earlier runs and could not match reposts against representatives extracted before
+        parser.error('--near-dedupe cannot be combined with --incremental')
+    if args.format == 'columnar' and args.gzip:
+        parser.error('columnar outputs are memory-mapped and cannot be gzip-compressed; drop --gzip')
+    if args.follow_db and not args.follow:
+        parser.error('--follow-db requires --follow')
+    if args.follow and (args.incremental or args.profile or args.profile_output or args.organizers):
+        parser.error('--follow cannot be combined with --incremental, --profile or --organizers')
+    if args.follow and args.format != 'ndjson':
+        # Appending needs a format that stays valid line by line
+        print("Follow mode appends NDJSON; writing .ndjson outputs")
+        args.format = 'ndjson'
 
-    print(f"Processing messages from {input_file}...")
-    events, places, services = process_messages(input_file)
+    if args.rules:
+        try:
+            use_rules(load_rules(args.rules))
+        except (OSError, ValueError, KeyError, re.error) as e:
+            parser.error(f"--rules: {e}")
+        print(f"Using {RULES.city_id} rules {RULES.version} from {RULES.source}")
+    use_budget(MessageBudget(args.max_message_chars, args.message_budget_ms / 1000))
 
-    # Write events
-    events_file = '/Users/astralamat/Documents/Code/whatsapp-scrapper/extracted-events.json'
-    with open(events_file, 'w', encoding='utf-8') as f:
-        json.dump(events, f, indent=2, ensure_ascii=False)
-    print(f"Extracted {len(events)} events to {events_file}")
+    profiler = None
+    if args.profile or args.profile_output:
+        from extraction_profiler import ExtractionProfiler
+        if args.workers > 1:
+            print("Profiling runs in-process; ignoring --workers")
+            args.workers = 1
+        profiler = ExtractionProfiler(top=args.profile_top).install(sys.modules[__name__])
 
-    # Write places
-    places_file = '/Users/astralamat/Documents/Code/whatsapp-scrapper/extracted-places.json'
-    with open(places_file, 'w', encoding='utf-8') as f:
-        json.dump(places, f, indent=2, ensure_ascii=False)
-    print(f"Extracted {len(places)} places to {places_file}")
+    paths = output_paths(args.output_dir, args.format, args.gzip)
+    near_duplicates = NearDuplicateFilter(args.near_dedupe_threshold) if args.near_dedupe else None
+    organizers = OrganizerIndex() if args.organizers else None
+    deduplicator = MessageDeduplicator()
+    resolver = None
+    if args.landmarks:
+        resolver = LandmarkResolver.from_files(args.landmarks, args.landmark_min_score)
+        print(f"Resolving locations against {len(resolver)} landmarks")
 
-    # Write services
-    services_file = '/Users/astralamat/Documents/Code/whatsapp-scrapper/extracted-services.json'
-    with open(services_file, 'w', encoding='utf-8') as f:
-        json.dump(services, f, indent=2, ensure_ascii=False)
-    print(f"Extracted {len(services)} services to {services_file}")
+    if args.follow:
+        if args.follow_db:
+            conn, placeholder = connect_database(args.follow_db)
+            source = SqlFollower(conn, placeholder)
+            print(f"Following unprocessed rows in {args.follow_db} (Ctrl+C to stop)...")
+        else:
+            state_path = os.path.join(args.output_dir, STATE_FILE)
+            source = FileFollower(args.inputs, state_path)
+            print(f"Following {', '.join(args.inputs)} (state: {state_path}, Ctrl+C to stop)...")
+        stats = run_follow(source, paths, deterministic_ids=args.deterministic_ids, compress=args.gzip,
+                           batch_size=args.follow_batch, max_interval=args.poll_interval,
+                           idle_exit=args.idle_exit, near_duplicates=near_duplicates,
+                           deduplicator=deduplicator, resolver=resolver)
+        counts = stats['counts']
+        print(f"\nStopped after {stats['messages']} messages in {stats['batches']} batches "
+              f"(slowest batch {stats['max_batch_seconds'] * 1000:.0f} ms)")
+        print(f"Appended {counts['event']} events, {counts['place']} places and "
+              f"{counts['service']} services to {args.output_dir}")
+        if BUDGET.summary():
+            print(f"Budget: {BUDGET.summary()}")
+        return
+
+    inputs = expand_inputs(args.inputs)
+    print(f"Processing messages from {', '.join(inputs)}...")
+
+    if args.incremental:
+        index_path = args.index_file or os.path.join(args.output_dir, INDEX_FILE)
+        counts, changed = run_incremental(inputs, paths, index_path, workers=args.workers,
+                                          chunk_size=args.chunk_size,
+                                          deterministic_ids=args.deterministic_ids,
+                                          fmt=args.format, compress=args.gzip,
+                                          deduplicator=deduplicator, resolver=resolver,
+                                          organizers=organizers)
+        print(f"Re-extracted {changed} new or edited messages (index: {index_path})")
+    else:
+        # Entities are written as they are extracted so memory stays flat
+        messages = iter_input_messages(inputs, deduplicator)
+        if near_duplicates is not None:
+            messages = near_duplicates.filter(messages)
+        entities = iter_entities(messages, workers=args.workers,
+                                 chunk_size=args.chunk_size, deterministic_ids=args.deterministic_ids,
+                                 resolver=resolver)
+        if organizers is not None:
+            entities = organizers.observe(entities)
+        counts = write_entities(paths, entities, args.format, args.gzip, atomic=not args.no_atomic)
+
+    if deduplicator.duplicates:
+        print(f"Skipped {deduplicator.duplicates} messages already seen in an earlier export")
+    if near_duplicates is not None:
+        clusters_path = os.path.join(args.output_dir, CLUSTERS_FILE)
+        near_duplicates.save_clusters(clusters_path)
+        print(f"Skipped {near_duplicates.duplicates} near-duplicate reposts "
+              f"({len(near_duplicates.duplicate_clusters())} clusters in {clusters_path})")
+    if BUDGET.summary():
+        print(f"Budget: {BUDGET.summary()}")
+    if organizers is not None:
+        organizers_path = os.path.join(args.output_dir, ORGANIZERS_FILE)
+        clusters = organizers.save(organizers_path)
+        print(f"{summarize_organizers(clusters, organizers.unlinked)} ({organizers_path})")
+
+    print(f"Extracted {counts['event']} events to {paths['event']}")
+    print(f"Extracted {counts['place']} places to {paths['place']}")
+    print(f"Extracted {counts['service']} services to {paths['service']}")
 
     print("\n=== SUMMARY ===")
-    print(f"Total Events: {len(events)}")
-    print(f"Total Places: {len(places)}")
-    print(f"Total Services: {len(services)}")
-    print(f"Total Extracted: {len(events) + len(places) + len(services)}")
+    print(f"Total Events: {counts['event']}")
+    print(f"Total Places: {counts['place']}")
+    print(f"Total Services: {counts['service']}")
+    print(f"Total Extracted: {sum(counts.values())}")
+
+    if profiler:
+        profiler.uninstall()
+        report = profiler.report()
+        profiler.print_report(report)
+        if args.profile_output:
+            from extraction_profiler import write_report
+            write_report(report, args.profile_output)
+            print(f"\nProfile written to {args.profile_output}")
 
 if __name__ == '__main__':
     main()
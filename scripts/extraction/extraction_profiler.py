@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation for extract_entities.py (--profile).
+
+Nothing here runs unless a profiler is installed: install() swaps the
+extractor module's stage functions, its `re` reference and its classifier
+for timing/counting wrappers, and uninstall() puts the originals back, so a
+normal run pays no instrumentation cost at all.
+
+The report records:
+- wall time and call counts per stage (contact, date, time, price, location,
+  organizer, classification, id generation, JSON serialization, input parsing)
+- match/miss counts per regex pattern and per classifier keyword
+- the slowest N messages with their body lengths
+"""
+
+import heapq
+import json
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+import entity_writers
+
+# Stage name -> function name in extract_entities
+STAGES = {
+    'contact': 'extract_contact_info',
+    'date': 'extract_date',
+    'time': 'extract_time',
+    'price': 'extract_price',
+    'location': 'extract_location',
+    'organizer': 'extract_organizer',
+    'normalization': 'normalize',
+    'classification': 'classify_message',
+    'id_generation': 'make_entity_id',
+}
+
+
+class _StageStats:
+    __slots__ = ('calls', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class _CountingRe:
+    """Stand-in for the `re` module that counts matches and misses per pattern."""
+
+    def __init__(self, counts: Dict[str, List[int]]):
+        self._counts = counts
+
+    def __getattr__(self, name):
+        return getattr(re, name)
+
+    def _record(self, pattern, match):
+        key = pattern if isinstance(pattern, str) else pattern.pattern
+        entry = self._counts.get(key)
+        if entry is None:
+            entry = self._counts[key] = [0, 0]
+        entry[0 if match else 1] += 1
+        return match
+
+    def search(self, pattern, string, flags=0):
+        return self._record(pattern, re.search(pattern, string, flags))
+
+    def match(self, pattern, string, flags=0):
+        return self._record(pattern, re.match(pattern, string, flags))
+
+
+class ExtractionProfiler:
+    """Collects per-stage timings and pattern statistics for one extraction run."""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.stages: Dict[str, _StageStats] = {name: _StageStats() for name in STAGES}
+        self.stages['serialization'] = _StageStats()
+        self.stages['input_parsing'] = _StageStats()
+        self.pattern_counts: Dict[str, List[int]] = {}
+        self.keyword_hits: Dict[int, int] = {}
+        self.classified = 0
+        self.messages = 0
+        self.message_seconds = 0.0
+        self._slowest: List = []  # min-heap of (seconds, seq, message_id, length)
+        self._originals: Dict = {}
+        self._module = None
+        self._started = 0.0
+        self.wall_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------------
+
+    def install(self, module) -> 'ExtractionProfiler':
+        """Instrument an imported extract_entities module."""
+        self._module = module
+        names = list(STAGES.values()) + ['extract_message', 'iter_messages', 're', 'CLASSIFIER']
+        self._originals = {name: getattr(module, name) for name in names}
+        self._originals['writer_write'] = entity_writers.EntityWriter.write
+
+        for stage, name in STAGES.items():
+            setattr(module, name, self._timed(stage, self._originals[name]))
+        module.extract_message = self._timed_message(self._originals['extract_message'])
+        module.iter_messages = self._timed_input(self._originals['iter_messages'])
+        module.re = _CountingRe(self.pattern_counts)
+        module.CLASSIFIER = self._counting_classifier(self._originals['CLASSIFIER'])
+        entity_writers.EntityWriter.write = self._timed_write(self._originals['writer_write'])
+
+        self._started = time.perf_counter()
+        return self
+
+    def uninstall(self) -> None:
+        """Restore the original functions."""
+        self.wall_seconds = time.perf_counter() - self._started
+        entity_writers.EntityWriter.write = self._originals.pop('writer_write')
+        for name, original in self._originals.items():
+            setattr(self._module, name, original)
+        self._originals = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._originals:
+            self.uninstall()
+
+    # ------------------------------------------------------------------
+    # Wrappers
+    # ------------------------------------------------------------------
+
+    def _timed(self, stage: str, func):
+        stats = self.stages[stage]
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.seconds += clock() - start
+        return wrapper
+
+    def _timed_message(self, func):
+        clock = time.perf_counter
+
+        def wrapper(msg, *args, **kwargs):
+            start = clock()
+            result = func(msg, *args, **kwargs)
+            elapsed = clock() - start
+            self.messages += 1
+            self.message_seconds += elapsed
+            entry = (elapsed, self.messages, msg.get('id'), len(msg.get('message_body') or ''))
+            if len(self._slowest) < self.top:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+            return result
+        return wrapper
+
+    def _timed_input(self, func):
+        stats = self.stages['input_parsing']
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs) -> Iterator[Dict]:
+            iterator = iter(func(*args, **kwargs))
+            while True:
+                start = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    stats.seconds += clock() - start
+                    return
+                stats.calls += 1
+                stats.seconds += clock() - start
+                yield item
+        return wrapper
+
+    def _timed_write(self, method):
+        stats = self.stages['serialization']
+        clock = time.perf_counter
+
+        def wrapper(writer, entity):
+            start = clock()
+            try:
+                return method(writer, entity)
+            finally:
+                stats.calls += 1
+                stats.seconds += clock() - start
+        return wrapper
+
+    def _counting_classifier(self, classifier):
+        """Return a copy of the classifier that counts hits per keyword pattern."""
+        profiler = self
+        base = type(classifier)
+
+        class CountingClassifier(base):
+            def matched_patterns(self, text):
+                profiler.classified += 1
+                seen = set()
+                for index in base.matched_patterns(self, text):
+                    if index not in seen:
+                        seen.add(index)
+                        profiler.keyword_hits[index] = profiler.keyword_hits.get(index, 0) + 1
+                    yield index
+
+        counting = CountingClassifier.__new__(CountingClassifier)
+        counting.__dict__.update(classifier.__dict__)
+        return counting
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def report(self) -> Dict:
+        """Return the collected statistics as a JSON-serializable dict."""
+        stages = {
+            name: {
+                'calls': stats.calls,
+                'seconds': round(stats.seconds, 6),
+                'us_per_call': round(stats.seconds / stats.calls * 1e6, 3) if stats.calls else 0.0,
+            }
+            for name, stats in self.stages.items()
+        }
+
+        patterns = {
+            pattern: {'matches': matches, 'misses': misses}
+            for pattern, (matches, misses) in self.pattern_counts.items()
+        }
+        classifier = self._originals.get('CLASSIFIER') or getattr(self._module, 'CLASSIFIER', None)
+        if classifier is not None:
+            for index, keyword in enumerate(classifier.keywords):
+                hits = self.keyword_hits.get(index, 0)
+                patterns[f"keyword:{keyword}"] = {'matches': hits, 'misses': self.classified - hits}
+
+        slowest = [
+            {'message_id': message_id, 'length': length, 'ms': round(seconds * 1000, 3)}
+            for seconds, _, message_id, length in sorted(self._slowest, reverse=True)
+        ]
+
+        return {
+            'wall_seconds': round(self.wall_seconds, 6),
+            'messages': self.messages,
+            'extraction_seconds': round(self.message_seconds, 6),
+            'stages': stages,
+            'patterns': patterns,
+            'slowest_messages': slowest,
+        }
+
+    def print_report(self, report: Optional[Dict] = None) -> None:
+        report = report or self.report()
+        print("\n=== PROFILE ===")
+        print(f"Wall time: {report['wall_seconds']:.3f}s for {report['messages']} messages "
+              f"({report['extraction_seconds']:.3f}s in extract_message)")
+
+        print(f"\n{'stage':<18}{'calls':>10}{'seconds':>12}{'us/call':>12}")
+        for name, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"{name:<18}{stats['calls']:>10}{stats['seconds']:>12.4f}{stats['us_per_call']:>12.2f}")
+
+        print("\nMost-matched patterns:")
+        ranked = sorted(report['patterns'].items(), key=lambda item: -item[1]['matches'])
+        for pattern, counts in ranked[:15]:
+            print(f"  {counts['matches']:>8} hit / {counts['misses']:>8} miss  {pattern}")
+
+        print(f"\nSlowest {len(report['slowest_messages'])} messages:")
+        for entry in report['slowest_messages']:
+            print(f"  {entry['ms']:>9.3f} ms  len={entry['length']:<6} {entry['message_id']}")
+
+
+def write_report(report: Dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Warm extraction server.
+
+Running extract_entities.py per call pays for interpreter startup, imports
+and pattern compilation every time (a few hundred ms), which dominates tiny
+batches. This server loads everything once and keeps it warm:
+
+- POST /extract takes one message object, a JSON array of messages, or
+  {"messages": [...]}, and returns {"events": [...], "places": [...],
+  "services": [...]} in the extract_entities.py output shape
+- concurrent requests are coalesced: one extraction thread drains the queue
+  into micro-batches (up to --max-batch messages, waiting at most --max-wait
+  ms for requests already in flight), so many small callers cost one pass
+  instead of many threads fighting over the GIL, and a lone caller never
+  waits
+- GET /stats reports request/message/batch counters, throughput and latency
+  percentiles; GET /health answers "ok"
+- edited rule files (--rules, see rule_set.py) are reloaded between batches
+  without a restart
+
+Listens on 127.0.0.1:8765 by default, or on a Unix socket with --socket.
+
+USAGE:
+  python3 scripts/extraction/extraction_server.py --landmarks docs/reference/mazunte-landmarks.json
+  curl -s localhost:8765/extract -d '{"id": "1", "message_body": "Taller de yoga el sábado 10am"}'
+  curl -s --unix-socket /tmp/extract.sock http://x/stats
+"""
+
+import argparse
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from extract_entities import (OUTPUT_FILES, active_budget, active_rules, extract_message, reload_rules_if_changed,
+                              use_rules)
+from landmark_resolver import DEFAULT_MIN_SCORE, LandmarkResolver
+from rule_set import load_rules
+
+# latency_histogram.py is shared with the Places scraper one directory up
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency_histogram import LatencyHistogram  # noqa: E402
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# listen() backlog; the socketserver default of 5 refuses connections under a burst of clients
+REQUEST_QUEUE_SIZE = 128
+# How often the extraction thread checks the rule files for edits
+RULES_CHECK_SECONDS = 1.0
+
+RESPONSE_KEYS = {kind: kind + 's' for kind in OUTPUT_FILES}  # 'event' -> 'events'
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Job:
+    __slots__ = ('messages', 'enqueued', 'done', 'result')
+
+    def __init__(self, messages: List[Dict]):
+        self.messages = messages
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, List[Dict]]] = None
+
+
+class BatchExtractor:
+    """
+    Single extraction thread fed by a queue. Jobs that arrive while a batch
+    is being collected are extracted together; each job still gets back only
+    the entities of its own messages, in message order.
+    """
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 deterministic_ids: bool = False, resolver: Optional[LandmarkResolver] = None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.deterministic_ids = deterministic_ids
+        self.resolver = resolver
+        self.started = time.time()
+        self.requests = 0
+        self.messages = 0
+        self.batches = 0
+        self.entities = {kind: 0 for kind in OUTPUT_FILES}
+        self.rule_reloads = 0
+        self._rules_checked = time.monotonic()
+        self.request_latency = LatencyHistogram(LATENCY_BUCKETS_MS)
+        self.batch_latency = LatencyHistogram(LATENCY_BUCKETS_MS)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: 'queue.Queue[_Job]' = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='extractor', daemon=True)
+        self._thread.start()
+
+    def extract(self, messages: List[Dict]) -> Dict[str, List[Dict]]:
+        """Extract messages through the shared batch loop; blocks until done."""
+        job = _Job(messages)
+        with self._lock:
+            self._in_flight += 1
+        self._queue.put(job)
+        job.done.wait()
+        with self._lock:
+            self._in_flight -= 1
+            self.requests += 1
+            self.request_latency.add((time.perf_counter() - job.enqueued) * 1000)
+        return job.result
+
+    def _collect(self, jobs: List[_Job]) -> None:
+        """Fill jobs with the next batch; jobs is the caller's, so a failure can still answer them."""
+        jobs.append(self._queue.get())
+        size = len(jobs[0].messages)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                # Only wait for company that is already on its way; a lone caller
+                # is extracted immediately
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._in_flight <= len(jobs):
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            jobs.append(job)
+            size += len(job.messages)
+
+    def _check_rules(self) -> None:
+        now = time.monotonic()
+        if now - self._rules_checked < RULES_CHECK_SECONDS:
+            return
+        self._rules_checked = now
+        if reload_rules_if_changed():
+            self.rule_reloads += 1
+            rules = active_rules()
+            print(f"Reloaded rules {rules.version} from {rules.source}", flush=True)
+
+    def _run(self) -> None:
+        while True:
+            jobs: List[_Job] = []
+            try:
+                self._collect(jobs)
+                self._check_rules()
+                self._extract(jobs)
+            except Exception as e:
+                # The thread must survive: every later request would wait on it forever
+                error = {'error': f"{type(e).__name__}: {e}"}
+                print(f"Extraction batch failed: {error['error']}", file=sys.stderr, flush=True)
+                for job in jobs:
+                    if not job.done.is_set():
+                        job.result = error
+                        job.done.set()
+
+    def _extract(self, jobs: List[_Job]) -> None:
+        started = time.perf_counter()
+        extracted = 0
+        for job in jobs:
+            result = {key: [] for key in RESPONSE_KEYS.values()}
+            try:
+                for msg in job.messages:
+                    for kind, entity in extract_message(msg, self.deterministic_ids, self.resolver):
+                        result[RESPONSE_KEYS[kind]].append(entity.to_dict())
+            except Exception as e:
+                result = {'error': f"{type(e).__name__}: {e}"}
+            job.result = result
+            extracted += len(job.messages)
+            job.done.set()
+
+        with self._lock:
+            self.batches += 1
+            self.messages += extracted
+            for kind, key in RESPONSE_KEYS.items():
+                self.entities[kind] += sum(len(job.result.get(key, ())) for job in jobs)
+            self.batch_latency.add((time.perf_counter() - started) * 1000)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            uptime = time.time() - self.started
+            return {
+                'uptime_s': round(uptime, 1),
+                'requests': self.requests,
+                'messages': self.messages,
+                'batches': self.batches,
+                'messages_per_batch': round(self.messages / self.batches, 2) if self.batches else None,
+                'messages_per_s': round(self.messages / uptime, 1) if uptime else None,
+                'queued': self._queue.qsize(),
+                'entities': dict(self.entities),
+                'request_latency': self.request_latency.summary(),
+                'batch_latency': self.batch_latency.summary(),
+                'landmarks': len(self.resolver) if self.resolver is not None else 0,
+                'rules': {'city_id': active_rules().city_id, 'version': active_rules().version,
+                          'reloads': self.rule_reloads},
+                'budget': active_budget().counts(),
+            }
+
+
+def parse_messages(payload) -> List[Dict]:
+    """Accept one message, a list of messages, or {"messages": [...]}."""
+    if isinstance(payload, dict) and 'messages' in payload:
+        payload = payload['messages']
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not all(isinstance(msg, dict) for msg in payload):
+        raise ValueError('expected a message object, a list of messages, or {"messages": [...]}')
+    return payload
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    server_version = 'WhatsAppExtractor/1.0'
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients skip the TCP handshake per call
+    # Headers and body are separate writes; with Nagle on, the body waits for the
+    # client's delayed ACK (~40 ms) on every keep-alive response
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status: int, body) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/stats':
+            self._send_json(200, self.server.extractor.stats())
+        else:
+            self._send_json(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != '/extract':
+            self._send_json(404, {'error': f"unknown path {self.path}"})
+            return
+        # Validate before reading: a bad length would raise here or block in rfile.read(-1)
+        header = self.headers.get('Content-Length') or '0'
+        length = int(header) if header.strip().isdecimal() else -1
+        if length < 0:
+            self._send_json(400, {'error': f"invalid Content-Length: {header!r}"})
+            self.close_connection = True
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': f"body larger than {MAX_BODY_BYTES} bytes"})
+            self.close_connection = True
+            return
+        try:
+            messages = parse_messages(json.loads(self.rfile.read(length) or b'null'))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        result = self.server.extractor.extract(messages)
+        self._send_json(500 if 'error' in result else 200, result)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixExtractionHandler(ExtractionHandler):
+    disable_nagle_algorithm = False  # TCP_NODELAY does not apply to Unix sockets
+
+
+class ExtractionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+def make_server(extractor: BatchExtractor, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                socket_path: Optional[str] = None, verbose: bool = False):
+    """Build a threaded HTTP server on a TCP port or a Unix socket."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, UnixExtractionHandler)
+    else:
+        server = ExtractionHTTPServer((host, port), ExtractionHandler)
+    server.extractor = extractor
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve entity extraction over HTTP with warm caches.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', default=None, metavar='PATH',
+                        help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help='Most messages coalesced into one extraction pass')
+    parser.add_argument('--max-wait', type=float, default=DEFAULT_MAX_WAIT_MS, metavar='MS',
+                        help='How long a batch waits for more concurrent requests')
+    parser.add_argument('--deterministic-ids', action='store_true',
+                        help='Derive entity ids from the source message instead of random UUIDs')
+    parser.add_argument('--landmarks', action='append', default=[], metavar='JSON',
+                        help='Resolve event/place locations against this landmarks file (repeatable)')
+    parser.add_argument('--landmark-min-score', type=float, default=DEFAULT_MIN_SCORE)
+    parser.add_argument('--rules', default=None, metavar='CITY_OR_JSON',
+                        help='Extraction rules: a city with a file in rules/ or a rules JSON path')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    if args.rules:
+        use_rules(load_rules(args.rules))
+    resolver = None
+    if args.landmarks:
+        resolver = LandmarkResolver.from_files(args.landmarks, args.landmark_min_score)
+    extractor = BatchExtractor(args.max_batch, args.max_wait, args.deterministic_ids, resolver)
+    # Warm the regex cache and normalizer tables before the first request
+    extract_message({'id': 'warmup', 'message_body': 'Taller de yoga este sábado 10am $200 MXN +52 958 123 4567'},
+                    resolver=resolver)
+
+    server = make_server(extractor, args.host, args.port, args.socket, args.verbose)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    rules = active_rules()
+    print(f"Extraction server listening on {where} (POST /extract, GET /stats; "
+          f"{rules.city_id} rules {rules.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        stats = extractor.stats()
+        print(f"\nServed {stats['requests']} requests, {stats['messages']} messages "
+              f"in {stats['batches']} batches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Follow mode: near-real-time extraction from the listener's outputs.
+
+Instead of a one-shot batch over finished exports, follow() keeps polling a
+message source and extracts whatever arrived since the last poll in small
+batches, appending the entities to the NDJSON outputs:
+
+- FileFollower tails session files and directories of them. JSONL files are
+  read from the last byte offset (a half-written trailing line waits for the
+  next poll); JSON arrays, which the listener rewrites whole on every
+  message, are re-read only when their size or mtime changed and only the
+  elements past the last seen count are new. New session files that appear
+  in a followed directory are picked up automatically.
+- SqlFollower polls a whatsapp_messages table (Supabase/PostgreSQL, or a
+  local SQLite stand-in) for rows with processed = false and marks them
+  processed once their entities are written.
+
+Polling backs off while nothing arrives (one stat() per file per poll, up to
+max_interval apart), so an idle follower uses next to no CPU, and resets to
+the shortest interval as soon as a message shows up; with the default 0.5s
+ceiling a new message is extracted well under a second after it lands.
+
+Delivery is at-least-once: a batch is acknowledged (file checkpoint saved,
+rows marked processed) only after its entities have been flushed.
+"""
+
+import gzip
+import json
+import os
+import signal
+import time
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from entity_writers import open_writers
+
+DEFAULT_BATCH_SIZE = 100
+READ_CHUNK_SIZE = 1 << 16
+MIN_INTERVAL = 0.05
+DEFAULT_MAX_INTERVAL = 0.5
+STATE_FILE = 'follow-state.json'
+STATE_VERSION = 1
+
+MESSAGE_TABLE = 'whatsapp_messages'
+FOLLOW_EXTENSIONS = ('.json', '.jsonl', '.ndjson', '.json.gz', '.jsonl.gz', '.ndjson.gz')
+
+
+# ============================================
+# FILE SOURCE
+# ============================================
+
+def _signature(stat: os.stat_result) -> List[int]:
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class FileFollower:
+    """
+    Yields messages appended to files, or to files inside directories, since
+    the previous poll. Its state (per-file offsets and counts) can be saved
+    and restored so a restarted follower resumes where it stopped.
+    """
+
+    def __init__(self, paths: Iterable[str], state_path: Optional[str] = None):
+        self.paths = list(paths)
+        self.state_path = state_path
+        # path -> {'format': 'lines' | 'array', 'offset', 'count', 'signature'}
+        self.files: Dict[str, Dict] = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == STATE_VERSION:
+                self.files = data.get('files', {})
+
+    def _current_files(self) -> List[str]:
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                files.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if name.endswith(FOLLOW_EXTENSIONS)
+                )
+            elif os.path.exists(path):
+                files.append(path)
+        return files
+
+    def poll(self, limit: int = DEFAULT_BATCH_SIZE) -> List[Dict]:
+        """Return up to limit messages that arrived since the last poll, file by file."""
+        messages = []
+        for path in self._current_files():
+            if len(messages) >= limit:
+                break
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entry = self.files.get(path)
+            if entry is not None and entry['signature'] == _signature(stat):
+                continue
+            if entry is None or (entry['format'] == 'lines' and stat.st_size < entry['offset']):
+                # New file, or a JSONL file truncated/replaced since the last poll. Array
+                # files shrink for a moment on every rewrite; _read_whole compares counts
+                entry = {'format': None, 'offset': 0, 'count': 0, 'signature': None}
+                self.files[path] = entry
+            messages.extend(self._read(path, entry, stat, limit - len(messages)))
+        return messages
+
+    def _read(self, path: str, entry: Dict, stat: os.stat_result, limit: int) -> List[Dict]:
+        if entry['format'] is None:
+            entry['format'] = self._detect(path)
+            if entry['format'] is None:
+                return []  # still empty
+        if entry['format'] == 'lines' and not path.endswith('.gz'):
+            return self._read_lines(path, entry, stat, limit)
+        return self._read_whole(path, entry, stat, limit)
+
+    @staticmethod
+    def _detect(path: str) -> Optional[str]:
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                head = f.read(4096).lstrip()
+        except (OSError, EOFError):
+            return None  # a compressed file still being written
+        if not head:
+            return None
+        return 'array' if head[0] == '[' else 'lines'
+
+    @staticmethod
+    def _read_lines(path: str, entry: Dict, stat: os.stat_result, limit: int) -> List[Dict]:
+        messages = []
+        pending = b''
+        eof = False
+        with open(path, 'rb') as f:
+            f.seek(entry['offset'])
+            while len(messages) < limit and not eof:
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                pending += chunk
+                pos = 0
+                while len(messages) < limit:
+                    newline = pending.find(b'\n', pos)
+                    if newline < 0:
+                        break
+                    line = pending[pos:newline]
+                    pos = newline + 1
+                    if line.strip():
+                        messages.append(json.loads(line))
+                # Only complete lines are consumed; a partial last line is re-read next poll
+                entry['offset'] += pos
+                pending = pending[pos:]
+        entry['count'] += len(messages)
+        # The file is caught up only if it was read to the end with no partial line left
+        entry['signature'] = _signature(stat) if eof and not pending else None
+        return messages
+
+    @staticmethod
+    def _read_whole(path: str, entry: Dict, stat: os.stat_result, limit: int) -> List[Dict]:
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                if entry['format'] == 'array':
+                    items = json.load(f)
+                else:
+                    items = [json.loads(line) for line in f if line.strip()]
+        except (ValueError, OSError, EOFError):
+            # Caught mid-rewrite; the signature is left stale so the next poll retries
+            return []
+        if len(items) < entry['count']:
+            # The file was replaced by a shorter one; the deduplicator drops repeats
+            entry['count'] = 0
+        messages = items[entry['count']:entry['count'] + limit]
+        entry['count'] += len(messages)
+        entry['offset'] = stat.st_size
+        entry['signature'] = _signature(stat) if entry['count'] == len(items) else None
+        return messages
+
+    def ack(self, messages: List[Dict]) -> None:
+        """Persist the read positions once the polled messages have been written."""
+        if not self.state_path:
+            return
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'files': self.files}, f)
+        os.replace(temp_path, self.state_path)
+
+    def close(self) -> None:
+        pass
+
+
+# ============================================
+# DATABASE SOURCE
+# ============================================
+
+def connect_database(dsn: str):
+    """
+    Open a DB-API connection for a source DSN: postgres:// or postgresql://
+    URLs use psycopg2, anything else is a SQLite database path.
+    Returns (connection, placeholder).
+    """
+    if dsn.startswith(('postgres://', 'postgresql://')):
+        try:
+            import psycopg2
+        except ImportError:
+            raise SystemExit("psycopg2 is required to follow a PostgreSQL database "
+                             "(pip install psycopg2-binary)")
+        return psycopg2.connect(dsn), '%s'
+
+    import sqlite3
+    return sqlite3.connect(dsn), '?'
+
+
+class SqlFollower:
+    """Polls a messages table for unprocessed rows and marks them processed on ack."""
+
+    def __init__(self, conn, placeholder: str = '?', table: str = MESSAGE_TABLE):
+        self.conn = conn
+        self.placeholder = placeholder
+        self.table = table
+
+    def poll(self, limit: int = DEFAULT_BATCH_SIZE) -> List[Dict]:
+        """Return up to limit unprocessed rows as message dicts, oldest first."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT * FROM {self.table} WHERE processed IS NOT TRUE "
+            f"ORDER BY timestamp, id LIMIT {int(limit)}"
+        )
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        cursor.close()
+        # Ending the read transaction lets the next poll see newly inserted rows
+        self.conn.commit()
+
+        messages = []
+        for row in rows:
+            msg = dict(zip(columns, row))
+            msg['id'] = str(msg['id'])
+            if isinstance(msg.get('metadata'), str):
+                msg['metadata'] = json.loads(msg['metadata'] or '{}')
+            messages.append(msg)
+        return messages
+
+    def ack(self, messages: List[Dict]) -> None:
+        ids = [msg['id'] for msg in messages]
+        if not ids:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            f"UPDATE {self.table} SET processed = TRUE WHERE id = {self.placeholder}",
+            [(message_id,) for message_id in ids],
+        )
+        cursor.close()
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ============================================
+# FOLLOW LOOP
+# ============================================
+
+class IdleBackoff:
+    """Poll interval that doubles while idle, up to max_interval, and resets on activity."""
+
+    def __init__(self, max_interval: float = DEFAULT_MAX_INTERVAL, min_interval: float = MIN_INTERVAL):
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.interval = self.min_interval
+
+    def reset(self) -> None:
+        self.interval = self.min_interval
+
+    def wait(self) -> None:
+        time.sleep(self.interval)
+        self.interval = min(self.interval * 2, self.max_interval)
+
+
+def follow(source, extract: Callable[[List[Dict]], Iterable[Tuple[str, Mapping]]],
+           paths: Dict[str, str], compress: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+           max_interval: float = DEFAULT_MAX_INTERVAL, idle_exit: Optional[float] = None,
+           on_batch: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Poll source until interrupted (SIGINT/SIGTERM) or, with idle_exit, until
+    nothing has arrived for that many seconds. Each poll returns one
+    micro-batch of at most batch_size messages, which is extracted with
+    extract(messages), appended to the NDJSON files in paths, and then
+    acknowledged to the source. Returns run statistics.
+    """
+    stats = {'batches': 0, 'messages': 0, 'counts': {kind: 0 for kind in paths},
+             'batch_seconds': 0.0, 'max_batch_seconds': 0.0}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    writers = open_writers(paths, 'ndjson', compress, append=True)
+    backoff = IdleBackoff(max_interval)
+    last_activity = time.monotonic()
+    try:
+        while not stopping:
+            started = time.monotonic()
+            batch = source.poll(batch_size)
+            if not batch:
+                if idle_exit is not None and started - last_activity >= idle_exit:
+                    break
+                backoff.wait()
+                continue
+
+            backoff.reset()
+            written = {kind: 0 for kind in paths}
+            # NDJSON writers flush every entity, so the batch is on disk before the ack
+            for kind, entity in extract(batch):
+                writers[kind].write(entity)
+                written[kind] += 1
+            source.ack(batch)
+
+            last_activity = time.monotonic()
+            elapsed = last_activity - started
+            stats['batches'] += 1
+            stats['messages'] += len(batch)
+            stats['batch_seconds'] += elapsed
+            stats['max_batch_seconds'] = max(stats['max_batch_seconds'], elapsed)
+            for kind, count in written.items():
+                stats['counts'][kind] += count
+            if on_batch is not None:
+                on_batch({'messages': len(batch), 'entities': written, 'seconds': elapsed})
+    finally:
+        for writer in writers.values():
+            writer.commit()
+        source.close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    return stats
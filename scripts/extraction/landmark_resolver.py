@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Fuzzy resolution of extracted venue names to known landmarks.
+
+extract_location() returns free text such as "Casa Pan de Miel" or
+"Playa Mermejita tomorrow". LandmarkResolver maps that text to a landmark
+from the Google Places scrape (Mazunte_Landmarks_Google_API.json) or the
+curated docs/reference/mazunte-landmarks.json, including aliases:
+
+- names are accent-folded, case-folded and reduced to words, then split
+  into word-padded character trigrams
+- an inverted index maps each trigram to the landmarks containing it;
+  a lookup only counts shared trigrams through those posting lists and
+  scores the few best candidates exactly, so the cost depends on the query
+  length, not on the number of landmarks
+- the query's rarest trigrams are counted first and counting stops once a
+  fixed budget of postings has been read, so trigrams shared by many
+  landmarks ("casa", "playa") never make a lookup scan the whole index
+
+The score is the Dice coefficient of the two trigram sets, or, for names
+long enough to be specific, how much of the landmark name appears in the
+query (so "at Casa Pan de Miel this Sunday" still resolves).
+"""
+
+import heapq
+import json
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_MIN_SCORE = 0.75
+
+# Candidates scored exactly per lookup, ranked by shared trigram count
+MAX_CANDIDATES = 8
+# Landmark names with fewer trigrams than this only match on Dice similarity
+MIN_CONTAINMENT_GRAMS = 8
+CONTAINMENT_WEIGHT = 0.9
+# Postings read per lookup once the rarest MIN_COUNTED_GRAMS have been counted
+POSTINGS_BUDGET = 256
+MIN_COUNTED_GRAMS = 3
+CACHE_SIZE = 4096
+
+
+class Landmark(NamedTuple):
+    name: str
+    lat: Optional[float]
+    lng: Optional[float]
+    place_id: Optional[str]
+
+
+class Match(NamedTuple):
+    landmark: Landmark
+    score: float
+
+
+def fold(text: str) -> str:
+    """Accent-fold, case-fold and reduce text to space-separated words."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in stripped.casefold()).split())
+
+
+def trigrams(folded: str) -> frozenset:
+    """Word-padded character trigrams of folded text."""
+    grams = set()
+    for word in folded.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _coordinate(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_landmarks(path: str) -> List[Tuple[Landmark, List[str]]]:
+    """
+    Read a landmarks JSON array as (landmark, names) pairs.
+
+    Accepts the Google scrape rows (name, latitude, longitude, place_id) and
+    the curated reference rows (name, aliases, lat, lng).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+
+    landmarks = []
+    for row in rows:
+        name = row.get('name')
+        if not name or name == 'N/A':
+            continue
+        landmark = Landmark(
+            name=name,
+            lat=_coordinate(row.get('lat', row.get('latitude'))),
+            lng=_coordinate(row.get('lng', row.get('longitude'))),
+            place_id=row.get('place_id'),
+        )
+        landmarks.append((landmark, [name] + list(row.get('aliases') or [])))
+    return landmarks
+
+
+class LandmarkResolver:
+    """Trigram index over landmark names and aliases."""
+
+    def __init__(self, landmarks: Iterable[Tuple[Landmark, List[str]]],
+                 min_score: float = DEFAULT_MIN_SCORE):
+        self.min_score = min_score
+        self.landmarks: List[Landmark] = []
+        # One entry per indexed name: (landmark index, trigram set)
+        self._names: List[Tuple[int, frozenset]] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._cache: Dict[str, Optional[Match]] = {}
+        self.lookups = 0
+        self.matched = 0
+
+        for landmark, names in landmarks:
+            landmark_index = len(self.landmarks)
+            self.landmarks.append(landmark)
+            for name in names:
+                folded = fold(name)
+                if not folded:
+                    continue
+                self._exact.setdefault(folded, landmark_index)
+                name_index = len(self._names)
+                grams = trigrams(folded)
+                self._names.append((landmark_index, grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(name_index)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str], min_score: float = DEFAULT_MIN_SCORE) -> 'LandmarkResolver':
+        landmarks = []
+        for path in paths:
+            landmarks.extend(load_landmarks(path))
+        return cls(landmarks, min_score)
+
+    def __len__(self) -> int:
+        return len(self.landmarks)
+
+    def _score(self, query: frozenset, name: frozenset) -> float:
+        shared = len(query & name)
+        if not shared:
+            return 0.0
+        score = 2 * shared / (len(query) + len(name))
+        if len(name) >= MIN_CONTAINMENT_GRAMS:
+            score = max(score, CONTAINMENT_WEIGHT * shared / len(name))
+        return score
+
+    def _lookup(self, folded: str) -> Optional[Match]:
+        landmark_index = self._exact.get(folded)
+        if landmark_index is not None:
+            return Match(self.landmarks[landmark_index], 1.0)
+
+        query = trigrams(folded)
+        postings = sorted((self._postings[gram] for gram in query if gram in self._postings), key=len)
+        counts: Dict[int, int] = {}
+        read = 0
+        for counted, names in enumerate(postings):
+            if counted >= MIN_COUNTED_GRAMS and read + len(names) > POSTINGS_BUDGET:
+                break
+            read += len(names)
+            for name_index in names:
+                counts[name_index] = counts.get(name_index, 0) + 1
+        if not counts:
+            return None
+
+        candidates = heapq.nsmallest(MAX_CANDIDATES, counts,
+                                     key=lambda name_index: (-counts[name_index], name_index))
+        best_index, best_score = None, 0.0
+        for name_index in candidates:
+            landmark_index, grams = self._names[name_index]
+            score = self._score(query, grams)
+            if score > best_score:
+                best_index, best_score = landmark_index, score
+        if best_index is None or best_score < self.min_score:
+            return None
+        return Match(self.landmarks[best_index], round(best_score, 3))
+
+    def resolve(self, text: Optional[str]) -> Optional[Match]:
+        """Return the best landmark match for text, or None below min_score."""
+        if not text:
+            return None
+        self.lookups += 1
+        folded = fold(text)
+        if folded in self._cache:
+            match = self._cache[folded]
+        else:
+            match = self._lookup(folded) if folded else None
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[folded] = match
+        if match is not None:
+            self.matched += 1
+        return match
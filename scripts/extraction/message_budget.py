@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Per-message work budget for extract_entities.py.
+
+The field extractors are regexes over the whole message body, so their cost
+grows with the body, and one huge forwarded message can stall the batch it
+is in. MessageBudget bounds that work and degrades instead of stalling:
+
+- length: a body longer than max_chars is extracted from a window of its
+  first and last max_chars / 2 characters (titles, dates and venues tend to
+  lead, contacts to close). Descriptions and entity ids keep the full text.
+- time: once a message has spent max_seconds on normalization,
+  classification and extractors, the extractors it has not run yet are
+  skipped and their fields left empty. A regex cannot be interrupted
+  mid-match, so the window is what bounds any single call (regex_fuzz.py
+  measures the worst case per pattern); the deadline keeps a slow message
+  from also paying for every remaining extractor.
+
+Every degradation is counted, so a run can report how often it happened.
+The defaults sit far above any real message, so normal output is never
+affected.
+"""
+
+import time
+from typing import Dict, Optional
+
+DEFAULT_MAX_CHARS = 20000
+DEFAULT_MAX_SECONDS = 0.5
+
+
+class MessageBudget:
+    """Length and time limits per message, with counters of what was cut."""
+
+    def __init__(self, max_chars: Optional[int] = DEFAULT_MAX_CHARS,
+                 max_seconds: Optional[float] = DEFAULT_MAX_SECONDS):
+        # 0 or None disables a limit
+        self.max_chars = max_chars or None
+        self.max_seconds = max_seconds or None
+        self.reset()
+
+    def reset(self) -> None:
+        self.truncated = 0  # messages extracted from a window
+        self.over_time = 0  # messages that ran out of time
+        self.skipped: Dict[str, int] = {}  # extractor -> messages it was skipped for
+
+    def window(self, text: str) -> str:
+        """The part of text the extractors see: all of it, or its head and tail."""
+        if self.max_chars is None or len(text) <= self.max_chars:
+            return text
+        self.truncated += 1
+        half = self.max_chars // 2
+        return text[:half] + '\n' + text[-half:]
+
+    def deadline(self) -> Optional[float]:
+        """perf_counter() value after which a message starting now is over budget."""
+        return time.perf_counter() + self.max_seconds if self.max_seconds is not None else None
+
+    def skip(self, extractor: str, first: bool) -> None:
+        """Record a skipped extractor; first is True for a message's first skip."""
+        self.skipped[extractor] = self.skipped.get(extractor, 0) + 1
+        if first:
+            self.over_time += 1
+
+    # ------------------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------------------
+
+    def counts(self) -> Dict:
+        return {'truncated': self.truncated, 'over_time': self.over_time, 'skipped': dict(self.skipped)}
+
+    def take_counts(self) -> Dict:
+        """Return the counters and reset them, e.g. to ship a worker's counts to the parent."""
+        counts = self.counts()
+        self.reset()
+        return counts
+
+    def merge(self, counts: Dict) -> None:
+        self.truncated += counts['truncated']
+        self.over_time += counts['over_time']
+        for extractor, skipped in counts['skipped'].items():
+            self.skipped[extractor] = self.skipped.get(extractor, 0) + skipped
+
+    def summary(self) -> Optional[str]:
+        """One line describing the degradations, or None if there were none."""
+        parts = []
+        if self.truncated:
+            parts.append(f"{self.truncated} messages longer than {self.max_chars} characters "
+                         f"extracted from their first and last {self.max_chars // 2}")
+        if self.over_time:
+            skipped = ', '.join(f"{name} {count}" for name, count in sorted(self.skipped.items()))
+            parts.append(f"{self.over_time} messages over the {self.max_seconds * 1000:g} ms budget "
+                         f"(skipped: {skipped})")
+        return '; '.join(parts) if parts else None
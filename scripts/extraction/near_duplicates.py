@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate message detection with MinHash and locality-sensitive hashing.
+
+Community groups repost the same flyer with small edits, and overlapping
+snapshots repeat whole histories. NearDuplicateFilter clusters those reposts
+in a single streaming pass so each cluster is extracted once:
+
+- message bodies are normalized (case, punctuation, emojis) and split into
+  word shingles
+- each shingle is hashed once and folded into a one-permutation MinHash
+  signature (num_perm bins, densified for short messages)
+- signatures are split into bands; messages sharing a band bucket with a
+  cluster representative are compared by estimated Jaccard similarity
+
+Only cluster representatives are indexed, so the work per message depends on
+the number of colliding clusters, not on the size of the history.
+"""
+
+import hashlib
+import heapq
+import json
+import operator
+import os
+import re
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+SHINGLE_SIZE = 2
+NUM_PERM = 64
+NUM_BANDS = 16
+DEFAULT_THRESHOLD = 0.7
+
+# Representatives compared per message, most band collisions first, and the
+# most representatives kept per band bucket. Together they keep the pass
+# linear even when a template produces many similar-but-distinct posts.
+MAX_CANDIDATES = 16
+MAX_BUCKET_SIZE = 32
+
+_TOKEN = re.compile(r'\w+')
+_MASK32 = 0xFFFFFFFF
+_EMPTY = _MASK32 + 1
+
+
+def _mix(value: int) -> int:
+    """Finalize a 32-bit hash (murmur3 fmix32) so bins and values are well spread."""
+    value ^= value >> 16
+    value = (value * 0x85EBCA6B) & _MASK32
+    value ^= value >> 13
+    value = (value * 0xC2B2AE35) & _MASK32
+    value ^= value >> 16
+    return value
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Return the word shingles of a normalized message body."""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) <= size:
+        return [' '.join(tokens)] if tokens else []
+    return [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def minhash(text: str, num_perm: int = NUM_PERM) -> Optional[array]:
+    """
+    Compute a one-permutation MinHash signature for text.
+
+    Each shingle is hashed once; the hash picks a bin and the remaining bits
+    compete for that bin's minimum. Empty bins borrow the value of the next
+    filled bin (rotation densification) so short texts still compare well.
+    """
+    grams = shingles(text)
+    if not grams:
+        return None
+
+    bins = [_EMPTY] * num_perm
+    for gram in set(grams):
+        value = _mix(zlib.crc32(gram.encode('utf-8')))
+        index = value % num_perm
+        rest = value // num_perm
+        if rest < bins[index]:
+            bins[index] = rest
+
+    if _EMPTY in bins:
+        # Walk right to left twice (circularly) so every empty bin sees its
+        # nearest filled bin; borrowed values are offset by the distance so
+        # they never equal a genuinely filled bin.
+        nearest = None
+        for i in range(2 * num_perm - 1, -1, -1):
+            j = i % num_perm
+            if bins[j] < _EMPTY:
+                nearest = i
+            elif i < num_perm and nearest is not None:
+                bins[j] = bins[nearest % num_perm] + (nearest - i) * _EMPTY
+    return array('Q', bins)
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimate Jaccard similarity from two signatures."""
+    return sum(map(operator.eq, a, b)) / len(a)
+
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate clusterer.
+
+    filter() yields the first message of each cluster (its representative)
+    and records later near-duplicates as members of that cluster.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM,
+                 num_bands: int = NUM_BANDS, max_candidates: int = MAX_CANDIDATES):
+        if num_perm % num_bands:
+            raise ValueError('num_perm must be a multiple of num_bands')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.num_bands = num_bands
+        self.rows = num_perm // num_bands
+        self.max_candidates = max_candidates
+        self.clusters: Dict[str, List[str]] = {}
+        self._signatures: Dict[str, array] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(num_bands)]
+        self._exact: Dict[bytes, str] = {}
+        self.seen = 0
+        self.duplicates = 0
+
+    def _find_cluster(self, signature: array) -> Optional[str]:
+        collisions: Dict[str, int] = {}
+        for band in range(self.num_bands):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for representative in self._buckets[band].get(key, ()):
+                collisions[representative] = collisions.get(representative, 0) + 1
+
+        ranked = heapq.nlargest(self.max_candidates, collisions.items(), key=lambda item: item[1])
+        for representative, _ in ranked:
+            if similarity(signature, self._signatures[representative]) >= self.threshold:
+                return representative
+        return None
+
+    def _index(self, message_id: str, signature: array) -> None:
+        self._signatures[message_id] = signature
+        for band in range(self.num_bands):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            bucket = self._buckets[band].setdefault(key, [])
+            # A saturated bucket is shared by too many posts to be informative
+            if len(bucket) < MAX_BUCKET_SIZE:
+                bucket.append(message_id)
+
+    def assign(self, message_id: str, text: str) -> Optional[str]:
+        """
+        Place a message in a cluster. Returns the representative id when the
+        message is a near-duplicate, or None when it starts a new cluster.
+        """
+        self.seen += 1
+        normalized = ' '.join(_TOKEN.findall(text.lower()))
+        exact_key = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+        representative = self._exact.get(exact_key)
+
+        signature = None
+        if representative is None:
+            signature = minhash(text, self.num_perm)
+            if signature is not None:
+                representative = self._find_cluster(signature)
+
+        if representative is not None:
+            self.clusters[representative].append(message_id)
+            self.duplicates += 1
+            return representative
+
+        self._exact[exact_key] = message_id
+        self.clusters[message_id] = [message_id]
+        if signature is not None:
+            self._index(message_id, signature)
+        return None
+
+    def filter(self, messages: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield messages that start a new cluster; messages without a body pass through."""
+        for msg in messages:
+            text = msg.get('message_body')
+            message_id = msg.get('id')
+            if not text or message_id is None:
+                yield msg
+                continue
+            if self.assign(message_id, text) is None:
+                yield msg
+
+    def duplicate_clusters(self) -> List[Dict]:
+        """Return clusters with more than one member, in first-seen order."""
+        return [
+            {'representative_id': representative, 'member_ids': members}
+            for representative, members in self.clusters.items()
+            if len(members) > 1
+        ]
+
+    def save_clusters(self, path: str) -> None:
+        """Write the multi-member clusters atomically as a JSON array."""
+        temp_path = path + '.partial'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.duplicate_clusters(), f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
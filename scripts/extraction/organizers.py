@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Contact normalization and organizer resolution.
+
+extract_contact_info() returns contacts as the message wrote them, so one
+organizer appears as "958 123 4567", "+52 1 958 123 4567" and
+"wa: 9581234567" across hundreds of events, places and services.
+contact_keys() maps each contact to a canonical key:
+
+- phones and WhatsApp numbers share one E.164 key ("tel:+529581234567");
+  ten-digit national numbers and the old mobile prefixes (+52 1, 044/045)
+  get the Mexican country code
+- Instagram handles and emails are lower-cased ("ig:casaluna", "email:...")
+
+Websites are left out: link-in-bio and social domains are shared by
+unrelated organizers.
+
+OrganizerIndex links every entity that shares any key with a union-find over
+the keys, so resolving the full history is a single near-linear pass (one
+find per key, with union by size and path halving) instead of comparing
+entities pairwise. Each resulting set is one organizer.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+COUNTRY_CODE = '52'  # Mexico; ten-digit numbers without a country code are national
+NATIONAL_DIGITS = 10
+ORGANIZERS_FILE = 'organizers.json'
+
+_NON_DIGIT = re.compile(r'\D')
+# Instagram: letters, digits, '.' and '_', no leading or doubled periods
+_HANDLE = re.compile(r'^(?!\.)(?!.*\.\.)[a-z0-9._]{1,30}$')
+
+
+# ============================================
+# NORMALIZATION
+# ============================================
+
+@lru_cache(maxsize=1 << 16)
+def normalize_phone(raw: Optional[str]) -> Optional[str]:
+    """Return a phone number in E.164 form ('+529581234567'), or None if it isn't one."""
+    if not raw:
+        return None
+    digits = _NON_DIGIT.sub('', raw)
+    international = raw.lstrip().startswith('+')
+    if digits.startswith('00'):
+        digits, international = digits[2:], True
+
+    if not international:
+        if len(digits) == NATIONAL_DIGITS:
+            return f'+{COUNTRY_CODE}{digits}'
+        # 044/045 + ten digits: the retired domestic mobile prefix
+        if len(digits) == NATIONAL_DIGITS + 3 and digits[:3] in ('044', '045'):
+            return f'+{COUNTRY_CODE}{digits[3:]}'
+        if not digits.startswith(COUNTRY_CODE):
+            return None
+
+    if digits.startswith(COUNTRY_CODE):
+        national = digits[len(COUNTRY_CODE):]
+        # +52 1 was dialed before mobile numbers; it's the same line
+        if len(national) == NATIONAL_DIGITS + 1 and national.startswith('1'):
+            national = national[1:]
+        return f'+{COUNTRY_CODE}{national}' if len(national) == NATIONAL_DIGITS else None
+
+    return f'+{digits}' if 8 <= len(digits) <= 15 else None
+
+
+def normalize_handle(raw: Optional[str]) -> Optional[str]:
+    """Return an Instagram handle without '@', lower-cased, or None if it isn't valid."""
+    if not raw:
+        return None
+    handle = raw.strip().lstrip('@').rstrip('.').lower()
+    return handle if _HANDLE.match(handle) else None
+
+
+def normalize_email(raw: Optional[str]) -> Optional[str]:
+    if not raw:
+        return None
+    email = raw.strip().rstrip('.').lower()
+    return email if '@' in email else None
+
+
+def contact_keys(entity: Mapping) -> List[str]:
+    """Canonical contact keys of an entity (or a contact dict), without duplicates."""
+    keys = []
+    for field in ('contact_phone', 'contact_whatsapp'):
+        phone = normalize_phone(entity.get(field))
+        if phone:
+            keys.append(f'tel:{phone}')
+    handle = normalize_handle(entity.get('contact_instagram'))
+    if handle:
+        keys.append(f'ig:{handle}')
+    email = normalize_email(entity.get('contact_email'))
+    if email:
+        keys.append(f'email:{email}')
+    return list(dict.fromkeys(keys))
+
+
+# ============================================
+# UNION-FIND
+# ============================================
+
+class UnionFind:
+    """Disjoint sets over dense integer ids, with union by size and path halving."""
+
+    def __init__(self):
+        self.parent: List[int] = []
+        self.size: List[int] = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+# ============================================
+# ORGANIZER INDEX
+# ============================================
+
+class OrganizerIndex:
+    """
+    Groups entities into organizers: two entities belong to the same
+    organizer when they share a contact key, directly or through a chain of
+    other entities. Only keys are kept in the union-find; each entity stores
+    the id of one of its keys.
+    """
+
+    def __init__(self):
+        self.sets = UnionFind()
+        self._key_ids: Dict[str, int] = {}
+        self._entities: List[Tuple[str, str, int]] = []  # (kind, entity id, key id)
+        self.unlinked = 0  # entities without any usable contact
+
+    def _key_id(self, key: str) -> int:
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = self.sets.add()
+        return key_id
+
+    def add(self, kind: str, entity: Mapping) -> None:
+        keys = contact_keys(entity)
+        if not keys:
+            self.unlinked += 1
+            return
+        first = self._key_id(keys[0])
+        for key in keys[1:]:
+            self.sets.union(first, self._key_id(key))
+        self._entities.append((kind, entity.get('id'), first))
+
+    def observe(self, entities: Iterable[Tuple[str, Mapping]]) -> Iterator[Tuple[str, Mapping]]:
+        """Index (kind, entity) pairs as they stream past, yielding them unchanged."""
+        for kind, entity in entities:
+            self.add(kind, entity)
+            yield kind, entity
+
+    def clusters(self) -> List[Dict]:
+        """Every organizer with its contact keys and entity ids, largest first."""
+        find = self.sets.find
+        keys_by_root: Dict[int, List[str]] = {}
+        for key, key_id in self._key_ids.items():
+            keys_by_root.setdefault(find(key_id), []).append(key)
+        entities_by_root: Dict[int, Dict[str, List[str]]] = {}
+        for kind, entity_id, key_id in self._entities:
+            entities_by_root.setdefault(find(key_id), {}).setdefault(kind, []).append(entity_id)
+
+        clusters = []
+        for root, entities in entities_by_root.items():
+            keys = sorted(keys_by_root[root])
+            clusters.append({
+                # Named after its smallest key, so ids stay stable while the key does
+                'organizer_id': 'org-' + hashlib.sha1(keys[0].encode('utf-8')).hexdigest()[:12],
+                'keys': keys,
+                'entity_count': sum(len(ids) for ids in entities.values()),
+                'entities': {kind: entities[kind] for kind in sorted(entities)},
+            })
+        clusters.sort(key=lambda cluster: (-cluster['entity_count'], cluster['organizer_id']))
+        return clusters
+
+    def save(self, path: str) -> List[Dict]:
+        """Write clusters() atomically as a JSON array and return them."""
+        clusters = self.clusters()
+        temp_path = path + '.partial'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(clusters, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+        return clusters
+
+
+def summarize(clusters: List[Dict], unlinked: int) -> str:
+    linked = sum(cluster['entity_count'] for cluster in clusters)
+    shared = [cluster for cluster in clusters if cluster['entity_count'] > 1]
+    return (f"Linked {linked} entities to {len(clusters)} organizers "
+            f"({len(shared)} with more than one entity, {unlinked} entities without contacts)")
+
+
+def main():
+    # Imported here: db_loader imports extract_entities, which imports this module
+    from db_loader import iter_extracted
+
+    parser = argparse.ArgumentParser(description='Group previously extracted entities into organizers '
+                                                 'by shared phone, WhatsApp, Instagram or email.')
+    parser.add_argument('output_dir', help='Directory holding events/places/services from extract_entities.py')
+    parser.add_argument('--output', default=None,
+                        help=f'Where to write the organizers (default OUTPUT_DIR/{ORGANIZERS_FILE})')
+    args = parser.parse_args()
+
+    index = OrganizerIndex()
+    for kind, entity in iter_extracted(args.output_dir):
+        index.add(kind, entity)
+    path = args.output or os.path.join(args.output_dir, ORGANIZERS_FILE)
+    clusters = index.save(path)
+    print(f"{summarize(clusters, index.unlinked)} -> {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Worst-case timing for the extractor regexes on adversarial input.
+
+A pattern that is fast on real messages can backtrack quadratically (or
+worse) on input shaped to its weak spot: a long run of digits without a
+currency, "a-a-a-..." without a dot, a keyword followed by a sea of
+spaces. This harness times every extractor pattern of a rule set against
+inputs built from:
+
+- generic units repeated to the target length ('1', 'a-', '1.', 'a@', ...)
+- each literal word of the pattern followed by long filler runs
+  ('whatsapp' + '1 1 1 ...', 'location' + '    ...')
+- seeded random mixtures of those units
+
+Each input is searched the way the extractor searches it (folded text, or
+the raw body with IGNORECASE for the organizer patterns) at a quarter of the
+target length and at the full length; the ratio gives the growth exponent,
+~1 for linear patterns and ~2 for quadratic ones. The target length defaults
+to the MessageBudget window, the longest text a pattern sees in a run.
+
+Finally whole messages far longer than the window are extracted with the
+default budget, to check that the guard keeps every message bounded.
+
+USAGE:
+  python3 scripts/extraction/regex_fuzz.py
+  python3 scripts/extraction/regex_fuzz.py --rules zipolite --max-ms 50 -o fuzz.json
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import extract_entities
+from message_budget import DEFAULT_MAX_CHARS, MessageBudget
+from rule_set import load_rules
+from text_normalizer import normalize
+
+GENERIC_UNITS = ['a', '1', 'A', ' ', 'a.', 'a-', 'a_', '1-', '1.', '1,', '1 ', 'a ', 'Aa ',
+                 'a@', '@a', '.-', '$1', '1:', 'a/', 'www.a']
+FILLERS = ['1 ', 'a ', ' ', 'A', '1', '-']
+DEFAULT_MAX_MS = 100.0
+RANDOM_INPUTS = 20
+
+# Extractors that search the raw body instead of the folded view
+RAW_PATTERNS = ('location', 'organizer')
+IGNORECASE_PATTERNS = ('organizer',)
+
+# Puts the fuzzed message through classification so every extractor runs
+MESSAGE_PREFIX = 'Taller de yoga y masaje este sábado, clase en la playa. '
+
+_ESCAPE = re.compile(r'\\.')
+_CLASS = re.compile(r'\[[^\]]*\]|\{[^}]*\}|\(\?[:!=<]*')
+_LITERAL = re.compile(r"[A-Za-z$@'][A-Za-z']+")
+
+
+def pattern_literals(pattern: str) -> List[str]:
+    """Literal words of a pattern (alternation branches, keywords), best effort."""
+    text = _CLASS.sub(' ', _ESCAPE.sub(' ', pattern))
+    return sorted(set(_LITERAL.findall(text)))
+
+
+def adversarial_inputs(pattern: str, length: int, seed: int = 0,
+                       random_inputs: int = RANDOM_INPUTS) -> List[Tuple[str, str]]:
+    """(label, text) inputs of the given length aimed at pattern."""
+    def repeat(unit: str) -> str:
+        return (unit * (length // len(unit) + 1))[:length]
+
+    inputs = [(f"{unit!r} x {length // len(unit)}", repeat(unit)) for unit in GENERIC_UNITS]
+    for literal in pattern_literals(pattern):
+        for filler in FILLERS:
+            inputs.append((f"{literal!r} + {filler!r}...", (literal + repeat(filler))[:length]))
+        inputs.append((f"({literal!r} + ' 1a') x n", repeat(literal + ' 1a')))
+
+    rng = random.Random(seed)
+    units = GENERIC_UNITS + pattern_literals(pattern)
+    for index in range(random_inputs):
+        mix = rng.sample(units, 3)
+        parts, size = [], 0
+        while size < length:
+            unit = rng.choice(mix) * rng.randint(1, 50)
+            parts.append(unit)
+            size += len(unit)
+        inputs.append((f"random #{index} of {mix!r}", ''.join(parts)[:length]))
+    return inputs
+
+
+def _search_time(regex: re.Pattern, text: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        regex.search(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def fuzz_pattern(name: str, pattern: str, length: int, repeat: int = 3, seed: int = 0,
+                 random_inputs: int = RANDOM_INPUTS) -> Dict:
+    """Time one pattern on every adversarial input; return its worst case."""
+    flags = re.IGNORECASE if name.startswith(IGNORECASE_PATTERNS) else 0
+    raw = name.startswith(RAW_PATTERNS)
+    regex = re.compile(pattern, flags)
+    small_length = max(1, length // 4)
+
+    worst = {'ms': 0.0, 'index': None, 'input': None, 'exponent': None, 'stopped_at': None}
+    for index, (label, text) in enumerate(adversarial_inputs(pattern, length, seed, random_inputs)):
+        view = text if raw else normalize(text).folded
+        small = _search_time(regex, view[:small_length], repeat)
+        stopped_at = None
+        if small > 1.0:
+            # Already pathological at a quarter length; don't wait for the full one
+            full, exponent, stopped_at = small, None, small_length
+        else:
+            full = _search_time(regex, view, repeat)
+            exponent = math.log(full / small, 4) if small > 0 and full >= 0.0005 else None
+        if full * 1000 > worst['ms']:
+            worst = {'ms': full * 1000, 'index': index, 'input': label, 'exponent': exponent,
+                     'stopped_at': stopped_at}
+
+    if worst['ms'] < 1:
+        verdict = 'fast'
+    elif worst['exponent'] is None or worst['exponent'] >= 1.5:
+        verdict = 'superlinear'
+    else:
+        verdict = 'linear'
+    return {
+        'name': name,
+        'pattern': pattern,
+        'worst_ms': round(worst['ms'], 3),
+        'worst_input': worst['input'],
+        # Position of the worst input in adversarial_inputs(pattern, ..., seed, random_inputs)
+        'worst_index': worst['index'],
+        'stopped_at': worst['stopped_at'],
+        'seed': seed,
+        'random_inputs': random_inputs,
+        'growth_exponent': round(worst['exponent'], 2) if worst['exponent'] is not None else None,
+        'verdict': verdict,
+    }
+
+
+def fuzz_messages(results: List[Dict], length: int, budget: MessageBudget) -> Dict:
+    """Extract whole messages built from each pattern's worst input under budget."""
+    extract_entities.use_budget(budget)
+    slowest = 0.0
+    messages = 0
+    for result in results:
+        if result['worst_index'] is None:
+            continue
+        # The same inputs fuzz_pattern() built, in the same order, at the message length
+        inputs = adversarial_inputs(result['pattern'], length, result['seed'], result['random_inputs'])
+        _, text = inputs[result['worst_index']]
+        message = {'id': f"fuzz-{result['name']}", 'message_body': MESSAGE_PREFIX + text}
+        start = time.perf_counter()
+        extract_entities.extract_message(message, deterministic_ids=True)
+        slowest = max(slowest, time.perf_counter() - start)
+        messages += 1
+    return {
+        'messages': messages,
+        'message_chars': length + len(MESSAGE_PREFIX),
+        'max_chars': budget.max_chars,
+        'max_seconds': budget.max_seconds,
+        'slowest_message_ms': round(slowest * 1000, 3),
+        'budget': budget.counts(),
+    }
+
+
+def print_report(results: List[Dict], messages: Optional[Dict], length: int) -> None:
+    print(f"Worst case per pattern at {length} characters:\n")
+    print(f"{'pattern':<34}{'worst ms':>10}{'growth':>8}  {'verdict':<12}worst input")
+    for result in sorted(results, key=lambda result: -result['worst_ms']):
+        growth = f"n^{result['growth_exponent']:.1f}" if result['growth_exponent'] is not None else '-'
+        stopped = f" (stopped at {result['stopped_at']} chars)" if result['stopped_at'] else ''
+        print(f"{result['name']:<34}{result['worst_ms']:>10.2f}{growth:>8}  {result['verdict']:<12}"
+              f"{result['worst_input']}{stopped}")
+    if messages:
+        budget = messages['budget']
+        print(f"\n{messages['messages']} whole messages of {messages['message_chars']} characters "
+              f"with the default budget: "
+              f"slowest {messages['slowest_message_ms']:.1f} ms "
+              f"({budget['truncated']} windowed, {budget['over_time']} over time)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worst-case regex time per extractor pattern.')
+    parser.add_argument('--rules', default=None, metavar='CITY_OR_JSON',
+                        help='Rule set to fuzz (default: rules/default.json)')
+    parser.add_argument('--length', type=int, default=DEFAULT_MAX_CHARS,
+                        help=f'Input length per pattern (default {DEFAULT_MAX_CHARS}, the budget window)')
+    parser.add_argument('--pattern', action='append', default=[], metavar='NAME',
+                        help='Only fuzz patterns whose name starts with this (repeatable), e.g. contact.email')
+    parser.add_argument('--random', type=int, default=RANDOM_INPUTS,
+                        help=f'Random unit mixtures per pattern (default {RANDOM_INPUTS})')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is kept')
+    parser.add_argument('--message-length', type=int, default=DEFAULT_MAX_CHARS * 10,
+                        help='Body length for the whole-message check, 0 to skip it')
+    parser.add_argument('--max-ms', type=float, default=DEFAULT_MAX_MS,
+                        help=f'Exit non-zero if any pattern is slower than this (default {DEFAULT_MAX_MS:g})')
+    parser.add_argument('-o', '--output', help='Write results JSON here')
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules) if args.rules else extract_entities.active_rules()
+    extract_entities.use_rules(rules)
+    patterns = [(name, pattern) for name, pattern in rules.extractor_patterns()
+                if not args.pattern or name.startswith(tuple(args.pattern))]
+
+    results = []
+    for name, pattern in patterns:
+        print(f"  {name}...", end='\r', file=sys.stderr, flush=True)
+        results.append(fuzz_pattern(name, pattern, args.length, args.repeat, args.seed, args.random))
+    messages = fuzz_messages(results, args.message_length, MessageBudget()) if args.message_length else None
+    print_report(results, messages, args.length)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'rules': rules.source, 'version': rules.version, 'length': args.length,
+                       'patterns': results, 'messages': messages}, f, indent=2, ensure_ascii=False)
+        print(f"\nSaved results to {args.output}")
+
+    slow = [result for result in results if result['worst_ms'] > args.max_ms]
+    if slow:
+        print(f"\n❌ {len(slow)} pattern(s) over {args.max_ms:g} ms: {', '.join(r['name'] for r in slow)}")
+        sys.exit(1)
+    print(f"\n✅ Every pattern stays under {args.max_ms:g} ms at {args.length} characters")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Extraction rules loaded from data files.
+
+The keyword tables, category tables and extractor patterns live in
+rules/*.json instead of the code, so tuning a keyword or adding a city is a
+data change:
+
+- rules/default.json holds the Mazunte rules; a city file can start from it
+  with "extends": "default.json". Sections merge key by key, a value replaces
+  the inherited one, and a key ending in "+" appends to the inherited list
+  ("place+": [...] adds place keywords instead of replacing them).
+- Keywords are lowercase and accent-free because they are matched against
+  folded text (see text_normalizer.py); "uñas" would fold to the everyday
+  word "unas", which is why beauty services match manicure/pedicure.
+
+load_rules() hashes the rule files (the whole extends chain) and keeps the
+merged, validated and analysed rules as a pickled artifact in __pycache__,
+named by that hash: an unchanged rule set starts from the artifact, an edited
+one is recompiled and the stale artifact removed. Regexes themselves are
+compiled on first use, since compiled patterns cannot be cached across
+processes. RuleSet.changed() tells a long-running process when to reload.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules')
+DEFAULT_RULES = os.path.join(RULES_DIR, 'default.json')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+
+# Bump when the compiled layout changes so old artifacts are ignored
+ARTIFACT_VERSION = 2
+
+REQUIRED_SECTIONS = ('city_id', 'keywords', 'event_categories', 'place_types', 'service_categories',
+                     'contact', 'price', 'date', 'time', 'location', 'organizer')
+
+
+# ============================================
+# COMPILED CLASSIFIER
+# ============================================
+
+class Classification(NamedTuple):
+    """Every type flag and category for one message, from a single scan."""
+    is_event: bool
+    is_place: bool
+    is_service: bool
+    event_category: str
+    place_type: str
+    place_category: str
+    service_category: str
+
+
+class KeywordClassifier:
+    """
+    Compiles keyword tables into one combined matcher.
+
+    Keywords are lowercase and matched case-sensitively against folded text
+    (NormalizedText.folded), so no pattern needs re.IGNORECASE.
+
+    flag_tables map a name to a keyword list; category_tables map a name to an
+    ordered {label: keywords} dict. classify() scans the text once and returns
+    {name: bool} for flags and {name: first matching label or None} for
+    categories, preserving the dict order as first-match priority.
+
+    Pickling keeps only the analysed tables; the combined scanner and the
+    per-keyword patterns are compiled when first needed.
+    """
+
+    _LEADING_LITERAL = re.compile(r'\\b([^\\()\[\]?*+{|.^$])(?![?*{])')
+
+    def __init__(self, flag_tables: Dict[str, List[str]],
+                 category_tables: Dict[str, Dict[str, List[str]]]):
+        self.flag_names = list(flag_tables)
+        self.category_names = list(category_tables)
+        self.category_labels = {name: list(table) for name, table in category_tables.items()}
+
+        # Each distinct pattern is compiled once and knows which (table, label) it feeds
+        owners: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        for name, keywords in flag_tables.items():
+            for keyword in keywords:
+                owners.setdefault(keyword, []).append((name, None))
+        for name, table in category_tables.items():
+            for label, keywords in table.items():
+                for keyword in keywords:
+                    owners.setdefault(keyword, []).append((name, label))
+
+        self.keywords = list(owners)
+        self._hits = [tuple(hits) for hits in owners.values()]
+
+        # Bucket patterns by their first literal character so a hit position only
+        # has to be confirmed against the few patterns that can start there.
+        self._buckets: Dict[str, List[int]] = {}
+        self._unbucketed: List[int] = []
+        # A top-level | means the pattern can start with another branch's first
+        # character, so those go to the unbucketed group.
+        for index, keyword in enumerate(owners):
+            lead = self._LEADING_LITERAL.match(keyword)
+            if lead and not self._alternates_at_top_level(keyword):
+                self._buckets.setdefault(lead.group(1), []).append(index)
+            else:
+                self._unbucketed.append(index)
+        self._reset_compiled()
+
+    @staticmethod
+    def _alternates_at_top_level(pattern: str) -> bool:
+        """True if pattern has a | outside every group and character class."""
+        depth = 0
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if char == '\\':
+                i += 1
+            elif char == '[':
+                # A ] right after [ or [^ is a literal, not the end of the class
+                i += 1
+                if pattern[i:i + 1] == '^':
+                    i += 1
+                if pattern[i:i + 1] == ']':
+                    i += 1
+                while i < len(pattern) and pattern[i] != ']':
+                    i += 2 if pattern[i] == '\\' else 1
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == '|' and depth == 0:
+                return True
+            i += 1
+        return False
+
+    def _reset_compiled(self) -> None:
+        self._compiled: List[Optional[re.Pattern]] = [None] * len(self.keywords)
+        self._scanner: Optional[re.Pattern] = None
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        del state['_compiled'], state['_scanner']
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._reset_compiled()
+
+    def _pattern(self, index: int) -> re.Pattern:
+        pattern = self._compiled[index]
+        if pattern is None:
+            pattern = self._compiled[index] = re.compile(self.keywords[index])
+        return pattern
+
+    def matched_patterns(self, text: str) -> Iterator[int]:
+        """Yield the index of each keyword pattern match found in text."""
+        if self._scanner is None:
+            self._scanner = re.compile('|'.join(f'(?:{keyword})' for keyword in self.keywords))
+        scanner = self._scanner.search
+        compiled = self._compiled
+        buckets = self._buckets
+        unbucketed = self._unbucketed
+
+        match = scanner(text)
+        while match:
+            pos = match.start()
+            # The combined scanner stops at the first alternative; confirm every
+            # pattern that could also start here so overlapping keywords count.
+            for index in buckets.get(text[pos], ()):
+                if (compiled[index] or self._pattern(index)).match(text, pos):
+                    yield index
+            for index in unbucketed:
+                if (compiled[index] or self._pattern(index)).match(text, pos):
+                    yield index
+            match = scanner(text, pos + 1)
+
+    def hits(self, text: str) -> set:
+        """Return every (table, label) pair whose keywords occur in text."""
+        found = set()
+        hits = self._hits
+        for index in self.matched_patterns(text):
+            found.update(hits[index])
+        return found
+
+    def classify(self, text: str) -> Dict[str, Optional[object]]:
+        """Return flag and first-match category results for text."""
+        found = self.hits(text)
+        result: Dict[str, Optional[object]] = {}
+        for name in self.flag_names:
+            result[name] = (name, None) in found
+        for name in self.category_names:
+            result[name] = next(
+                (label for label in self.category_labels[name] if (name, label) in found),
+                None
+            )
+        return result
+
+
+# ============================================
+# RULE FILES
+# ============================================
+
+def _merge(base: Dict, override: Dict) -> Dict:
+    """Merge override into base: dicts recurse, 'key+' extends a list, other values replace."""
+    merged = dict(base)
+    for key, value in override.items():
+        if key.endswith('+'):
+            key = key[:-1]
+            merged[key] = list(merged.get(key, [])) + list(value)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def resolve_rules_path(name: str) -> str:
+    """Accept a rules file path or a city name with a file in rules/."""
+    if os.path.exists(name):
+        return os.path.abspath(name)
+    candidate = os.path.join(RULES_DIR, f"{name}.json")
+    if os.path.exists(candidate):
+        return candidate
+    raise FileNotFoundError(f"No rules file {name!r} (looked for {candidate})")
+
+
+def read_rule_files(path: str, _chain: Tuple[str, ...] = ()) -> Tuple[Dict, List[Tuple[str, bytes]]]:
+    """Return the merged rules of a file and its extends chain, plus each file's raw bytes."""
+    path = os.path.abspath(path)
+    if path in _chain:
+        raise ValueError(f"Rules files extend each other in a loop: {' -> '.join(_chain + (path,))}")
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+    parent = data.pop('extends', None)
+    if parent is None:
+        return data, [(path, raw)]
+    base, files = read_rule_files(os.path.join(os.path.dirname(path), parent), _chain + (path,))
+    return _merge(base, data), files + [(path, raw)]
+
+
+def rules_digest(files: List[Tuple[str, bytes]]) -> str:
+    digest = hashlib.sha256(f"rules-v{ARTIFACT_VERSION}".encode('utf-8'))
+    for _, raw in files:
+        digest.update(hashlib.sha256(raw).digest())
+    return digest.hexdigest()
+
+
+def _file_signatures(paths: List[str]) -> List[Tuple[int, int]]:
+    signatures = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signatures.append((-1, -1))
+            continue
+        signatures.append((stat.st_size, stat.st_mtime_ns))
+    return signatures
+
+
+# ============================================
+# RULE SETS
+# ============================================
+
+class RuleSet:
+    """A compiled rules file: the keyword classifier plus the extractor patterns."""
+
+    def __init__(self, data: Dict, digest: str, files: List[str]):
+        missing = [section for section in REQUIRED_SECTIONS if section not in data]
+        if missing:
+            raise ValueError(f"Rules are missing sections: {', '.join(missing)}")
+        self.digest = digest
+        self.files = files
+        self.source = files[-1]
+        self.city_id: str = data['city_id']
+
+        # Extractor patterns are kept as strings: re caches their compiled form,
+        # and the profiler counts matches per pattern string
+        contact = data['contact']
+        self.phone_patterns: List[str] = contact['phone']
+        self.whatsapp_pattern: str = contact['whatsapp']
+        self.instagram_patterns: List[str] = contact['instagram']
+        self.email_pattern: str = contact['email']
+        self.website_pattern: str = contact['website']
+
+        price = data['price']
+        self.free_pattern: str = price['free']
+        self.price_patterns: List[str] = price['patterns']
+        self.default_currency: str = price['default_currency']
+
+        date = data['date']
+        # Tried in this order; the kind says how to read the groups
+        self.date_patterns: List[Tuple[str, str]] = [
+            (kind, date[kind]) for kind in ('day_month_year', 'year_month_day', 'day_month_name_year')
+        ]
+        self.months: Dict[str, int] = {name: int(number) for name, number in date['months'].items()}
+        self.today_pattern: str = date['today']
+        self.tomorrow_pattern: str = date['tomorrow']
+
+        self.time_patterns: List[str] = data['time']
+        self.location_patterns: List[str] = data['location']
+        self.organizer_patterns: List[str] = data['organizer']
+
+        place_types = data['place_types']
+        self.place_categories: Dict[str, str] = {name: entry['category'] for name, entry in place_types.items()}
+        self.classifier = KeywordClassifier(
+            {kind: data['keywords'][kind] for kind in ('event', 'place', 'service')},
+            {
+                'event_category': data['event_categories'],
+                'place_type': {name: entry['keywords'] for name, entry in place_types.items()},
+                'service_category': data['service_categories'],
+            }
+        )
+        for keyword in self.classifier.keywords:
+            re.compile(keyword)  # fail on a bad keyword at compile time, not mid-run
+        self._signatures = _file_signatures(files)
+
+    @property
+    def version(self) -> str:
+        return self.digest[:12]
+
+    def changed(self) -> bool:
+        """True when any of the source rule files was edited since this set was loaded."""
+        return _file_signatures(self.files) != self._signatures
+
+    def mark_current(self) -> None:
+        """Treat the files as unchanged, e.g. after a failed reload, until they change again."""
+        self._signatures = _file_signatures(self.files)
+
+    def extractor_patterns(self) -> List[Tuple[str, str]]:
+        """Every extractor pattern as (name, pattern), e.g. ('contact.phone[0]', '...')."""
+        def numbered(name: str, patterns: List[str]) -> List[Tuple[str, str]]:
+            return [(f"{name}[{index}]", pattern) for index, pattern in enumerate(patterns)]
+
+        return (
+            numbered('contact.phone', self.phone_patterns)
+            + [('contact.whatsapp', self.whatsapp_pattern)]
+            + numbered('contact.instagram', self.instagram_patterns)
+            + [('contact.email', self.email_pattern), ('contact.website', self.website_pattern),
+               ('price.free', self.free_pattern)]
+            + numbered('price.patterns', self.price_patterns)
+            + [(f"date.{kind}", pattern) for kind, pattern in self.date_patterns]
+            + [('date.today', self.today_pattern), ('date.tomorrow', self.tomorrow_pattern)]
+            + numbered('time', self.time_patterns)
+            + numbered('location', self.location_patterns)
+            + numbered('organizer', self.organizer_patterns)
+        )
+
+
+def _artifact_path(cache_dir: str, source: str, digest: str) -> str:
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(cache_dir, f"rules-{name}-{digest[:16]}.pickle")
+
+
+def load_rules(path: str = DEFAULT_RULES, cache_dir: Optional[str] = CACHE_DIR) -> RuleSet:
+    """
+    Load a rules file, from its compiled artifact when the content hash
+    matches, otherwise compiling it and refreshing the artifact.
+    """
+    path = resolve_rules_path(path)
+    data, files = read_rule_files(path)
+    digest = rules_digest(files)
+    artifact = _artifact_path(cache_dir, path, digest) if cache_dir else None
+
+    if artifact and os.path.exists(artifact):
+        try:
+            with open(artifact, 'rb') as f:
+                rules = pickle.load(f)
+            if isinstance(rules, RuleSet) and rules.digest == digest:
+                rules.mark_current()
+                return rules
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+            pass  # unreadable artifact: rebuild it below
+
+    rules = RuleSet(data, digest, [file_path for file_path, _ in files])
+    if artifact:
+        _write_artifact(artifact, rules)
+    return rules
+
+
+def _write_artifact(artifact: str, rules: RuleSet) -> None:
+    prefix = os.path.basename(artifact).rsplit('-', 1)[0] + '-'
+    try:
+        os.makedirs(os.path.dirname(artifact), exist_ok=True)
+        temp_path = f"{artifact}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, artifact)
+        # Artifacts of earlier versions of the same rules file are stale now
+        for name in os.listdir(os.path.dirname(artifact)):
+            if name.startswith(prefix) and name.endswith('.pickle') and name != os.path.basename(artifact):
+                os.remove(os.path.join(os.path.dirname(artifact), name))
+    except OSError:
+        pass  # a read-only checkout just compiles on every start
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic WhatsApp message corpora for benchmarking the extractor.
+
+Messages follow the shape of the exports in data/raw (same keys, local_* ids,
+image messages without a body, ...) and their bodies mix Spanish and English
+announcements with emojis, prices, dates, times, phone numbers, handles and
+URLs. Output is written as a stream, so million-message corpora never have
+to fit in memory.
+
+USAGE: python3 scripts/extraction/synthetic_corpus.py 100000 -o /tmp/corpus-100k.json
+"""
+
+import argparse
+import json
+import random
+import string
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator
+
+GROUPS = [
+    ('Eventos & Servicios : Mazunte', '4917660004500-1610993780@g.us'),
+    ('Mazunte Community', '5219581234567-1620000000@g.us'),
+    ('Zipolite / San Agustinillo Info', '5219589876543-1630000000@g.us'),
+]
+
+GREETINGS = [
+    'Hola comunidad!', 'Buen día, bonita comunidad!', 'Hello happy Sunday!', 'Hola Community,',
+    'Buenas tardes comunidad!', 'Hi everyone 🌞', '¡Hola familia!', '',
+]
+
+EVENT_LINES = [
+    'Este viernes {venue_phrase} tendremos una fiesta con DJ 🎶',
+    'Join us this Saturday for a cacao ceremony and sound healing circle 🌿',
+    'Taller de cerámica para principiantes, próximo {weekday} {time_phrase}',
+    'Live music tonight at {venue} 🎸 concierto con banda local',
+    'Clase de yoga al amanecer en la playa {time_phrase} 🧘',
+    'Retiro de meditación de 3 días, {date_phrase}',
+    'Workshop: Introduction to Permaculture, next {weekday} {time_phrase}',
+    'Círculo de mujeres este domingo, te invitamos a compartir 💜',
+    'Sesión de breathwork y temazcal {date_phrase} {time_phrase}',
+    'Festival de arte y música en {venue}, exposición de pintura',
+]
+
+PLACE_LINES = [
+    'El café {venue} abre todos los días, horario {time_phrase}',
+    'New restaurant open on the main road, ubicación: {venue}',
+    'Cabañas disponibles cerca de la playa Mermejita 🌊',
+    'Hostel {venue} has rooms available, address: calle principal',
+    'Tienda orgánica en el centro, open hours 9am to 8pm',
+    'Nuevo espacio para eventos y talleres: {venue}',
+    'Surf shop at Playa Zipolite, rentals and lessons',
+]
+
+SERVICE_LINES = [
+    'Ofrezco masaje terapéutico y reiki a domicilio {price_phrase}',
+    'I offer private yoga classes and therapy sessions {price_phrase}',
+    'Servicio de transporte Mazunte – Huatulco, chofer con experiencia',
+    'Se vende moto Italika 2019 en buen estado {price_phrase}',
+    'Clases de español para extranjeros, lessons for all levels',
+    'Limpieza de casas y cabañas, reparación de techos',
+    'Cooking classes: comida oaxaqueña tradicional {price_phrase}',
+    'Corte de pelo y uñas, beauty service at your place',
+]
+
+CHATTER_LINES = [
+    'Muchas gracias 💜', 'Alguien tiene un número para la entrega de gasolina?',
+    'Lo siento…tanque de gas para estufa', 'HOY HOY HOY', 'English and Spanish welcome 🤗',
+    'Does anyone know if the ATM in Mazunte is working?', 'Se perdió un perro café cerca de la playa 🐕',
+    'Ahí algunas opciones, no sé si están actualizadas', 'Join us 💝',
+]
+
+VENUES = [
+    'Casa Pan de Miel', 'Hridaya Yoga', 'Foro Escénico Alternativo Mermejita', 'Hotel Noga',
+    'La Termita', 'Cafe Tesoro', 'Punta Cometa', 'Centro Mexicano de la Tortuga', 'El Copal',
+]
+
+WEEKDAYS_ES = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+WEEKDAYS_EN = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTHS_ES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+             'septiembre', 'octubre', 'noviembre', 'diciembre']
+EMOJIS = ['✨', '🌿', '💫', '🌊', '🔥', '💜', '🙏', '🌞', '🎶', '📍', '💸', '🕠', '🇲🇽', '🫶']
+DOMAINS = ['hridaya-family.com', 'mazunteconnect.mx', 'instagram.com', 'linktr.ee', 'thaliadevi.com']
+
+
+class CorpusGenerator:
+    """Deterministic generator of raw-export-shaped messages."""
+
+    def __init__(self, seed: int = 42, media_ratio: float = 0.3, start: datetime = None):
+        self.rng = random.Random(seed)
+        self.media_ratio = media_ratio
+        self.start = start or datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+    def _phone(self) -> str:
+        digits = ''.join(self.rng.choice(string.digits) for _ in range(10))
+        style = self.rng.randrange(4)
+        if style == 0:
+            return f"+52 {digits[:3]} {digits[3:6]} {digits[6:]}"
+        if style == 1:
+            return f"+521{digits}"
+        if style == 2:
+            return digits
+        return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+
+    def _date_phrase(self) -> str:
+        day = self.rng.randint(1, 28)
+        month = self.rng.randint(1, 12)
+        style = self.rng.randrange(4)
+        if style == 0:
+            return f"{day:02d}/{month:02d}/2025"
+        if style == 1:
+            return f"2025-{month:02d}-{day:02d}"
+        if style == 2:
+            return f"{day} de {MONTHS_ES[month - 1]} de 2025"
+        return self.rng.choice(['hoy', 'mañana', 'today', 'tomorrow'])
+
+    def _time_phrase(self) -> str:
+        hour = self.rng.randint(1, 12)
+        style = self.rng.randrange(3)
+        if style == 0:
+            return f"{hour}:{self.rng.choice(['00', '15', '30', '45'])} {self.rng.choice(['am', 'pm'])}"
+        if style == 1:
+            return f"{hour}{self.rng.choice(['am', 'pm', 'AM', 'PM'])}"
+        return f"{self.rng.randint(7, 21)}:{self.rng.choice(['00', '30'])} hrs"
+
+    def _price_phrase(self) -> str:
+        amount = self.rng.choice([50, 100, 150, 200, 350, 500, 800, 1200, 1500])
+        return self.rng.choice([
+            f"${amount}", f"${amount} MXN", f"{amount} pesos", f"{amount} USD",
+            f"$ {amount:,} por persona", 'gratis', 'Free entry', 'cooperación voluntaria',
+        ])
+
+    def _contact_line(self) -> str:
+        handle = ''.join(self.rng.choice(string.ascii_lowercase + '._') for _ in range(self.rng.randint(4, 12)))
+        return self.rng.choice([
+            f"WhatsApp: {self._phone()}",
+            f"Info y reservas {self._phone()}",
+            f"IG: @{handle}",
+            f"Instagram {handle}",
+            f"Más detalles: https://www.{self.rng.choice(DOMAINS)}/{handle}",
+            f"Escríbeme a {handle}@gmail.com",
+            f"📲 {self._phone()}",
+        ])
+
+    def _fill(self, template: str) -> str:
+        weekday = self.rng.choice(WEEKDAYS_ES + WEEKDAYS_EN)
+        venue = self.rng.choice(VENUES)
+        return template.format(
+            venue=venue,
+            venue_phrase=self.rng.choice([f"en {venue}", f"at {venue}", f"@ {venue}", '']),
+            weekday=weekday,
+            time_phrase=self._time_phrase(),
+            date_phrase=self._date_phrase(),
+            price_phrase=self._price_phrase(),
+        )
+
+    def body(self) -> str:
+        """Build one message body."""
+        rng = self.rng
+        roll = rng.random()
+        if roll < 0.25:
+            return rng.choice(CHATTER_LINES)
+
+        lines = [rng.choice(GREETINGS)]
+        pools = [EVENT_LINES] * 5 + [PLACE_LINES] * 2 + [SERVICE_LINES] * 3
+        for _ in range(rng.randint(1, 4)):
+            lines.append(f"{rng.choice(EMOJIS)} {self._fill(rng.choice(rng.choice(pools)))}")
+        if rng.random() < 0.5:
+            lines.append(f"💸 {self._price_phrase()}")
+        if rng.random() < 0.6:
+            lines.append(self._contact_line())
+        if rng.random() < 0.3:
+            # Bilingual reposts repeat the announcement in the other language
+            lines.extend(lines[1:])
+        return '\n'.join(line for line in lines if line)
+
+    def message(self, index: int) -> Dict:
+        """Build one message dict shaped like a data/raw export row."""
+        rng = self.rng
+        group_name, group_id = rng.choice(GROUPS)
+        sent = self.start + timedelta(seconds=index * 97 + rng.randint(0, 90))
+        created = sent + timedelta(days=2, seconds=rng.randint(0, 3600))
+        has_media = rng.random() < self.media_ratio
+        body = None if has_media and rng.random() < 0.5 else self.body()
+        sender = '521' + ''.join(rng.choice(string.digits) for _ in range(10))
+        return {
+            'id': f"local_{int(created.timestamp() * 1000)}_{''.join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(9))}",
+            'created_at': created.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'group_name': group_name,
+            'group_id': group_id,
+            'sender_name': sender,
+            'sender_phone': group_id,
+            'message_body': body,
+            'message_type': 'image' if has_media else 'text',
+            'media_url': None,
+            'media_mimetype': 'image/jpeg' if has_media else None,
+            'timestamp': sent.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'approval_status': 'pending',
+            'processed': False,
+            'metadata': {},
+        }
+
+    def messages(self, count: int) -> Iterator[Dict]:
+        for index in range(count):
+            yield self.message(index)
+
+
+def write_corpus(path: str, count: int, seed: int = 42, jsonl: bool = False) -> None:
+    """Stream a corpus of count messages to path as a JSON array or JSONL."""
+    generator = CorpusGenerator(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        if jsonl:
+            for msg in generator.messages(count):
+                f.write(json.dumps(msg, ensure_ascii=False) + '\n')
+            return
+
+        f.write('[')
+        for index, msg in enumerate(generator.messages(count)):
+            f.write((',\n' if index else '\n') + json.dumps(msg, ensure_ascii=False, indent=2))
+        f.write('\n]\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic WhatsApp message corpus.')
+    parser.add_argument('count', type=int, help='Number of messages (e.g. 1000 to 1000000)')
+    parser.add_argument('-o', '--output', required=True, help='Output file')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jsonl', action='store_true', help='Write newline-delimited JSON')
+    args = parser.parse_args()
+
+    write_corpus(args.output, args.count, args.seed, args.jsonl)
+    print(f"Wrote {args.count} messages to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Normalize-once front end for the extractors.
+
+A message body is folded once into a canonical view that every extractor
+and the keyword classifier match against:
+
+- case folded (casefold(), so "ß" becomes "ss")
+- accents stripped ("sesión" -> "sesion", "mañana" -> "manana")
+
+Whitespace, line breaks and emojis are kept as they are. They are the
+boundaries the extractor patterns rely on: a phone pattern that allows one
+optional space or dash between digit groups must not join "2025" and
+"938-009" across a line break and an emoji, which it would if the folded
+view collapsed that gap into one space. Matching on the folded view
+therefore finds what the patterns find on the raw body with re.IGNORECASE,
+only accent-insensitive.
+
+Patterns can be written in lowercase without accent variants or
+re.IGNORECASE. Extractors that return text (prices, phone numbers, URLs)
+map their match span back to the original body through NormalizedText.span(),
+so the values they return keep the author's spelling.
+
+Folding is one str.translate() call with a per-character table that fills
+itself on first sight of each character; the offset map back to the
+original text is only built for messages that ask for a span.
+"""
+
+import unicodedata
+from array import array
+from functools import cached_property
+from typing import Tuple, Union
+
+# Unicode categories kept unchanged: other symbols (most emoji), modifier
+# symbols (skin tones), format characters (ZWJ, variation selectors) and
+# private-use/surrogate code points.
+_SYMBOL_CATEGORIES = frozenset({'So', 'Sk', 'Cf', 'Co', 'Cs'})
+
+
+class _FoldTable(dict):
+    """str.translate() table: code point -> folded text, computed on first use."""
+
+    def __missing__(self, code_point: int) -> str:
+        char = chr(code_point)
+        if char.isspace() or unicodedata.category(char) in _SYMBOL_CATEGORIES:
+            folded = char
+        else:
+            decomposed = unicodedata.normalize('NFD', char.casefold())
+            folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+        self[code_point] = folded
+        return folded
+
+
+_FOLD = _FoldTable()
+
+
+def fold_char(char: str) -> str:
+    """Return what one character of the original folds to."""
+    return _FOLD[ord(char)]
+
+
+class NormalizedText:
+    """The original message body plus its folded view and an offset map between them."""
+
+    __slots__ = ('original', 'folded', '__dict__')
+
+    def __init__(self, original: str):
+        self.original = original
+        self.folded = original.translate(_FOLD)
+
+    def __repr__(self) -> str:
+        return f"NormalizedText({self.folded!r})"
+
+    def __len__(self) -> int:
+        return len(self.folded)
+
+    @cached_property
+    def offsets(self) -> array:
+        """
+        offsets[i] is the index in original of the character folded[i] came
+        from; a final entry holds len(original) so spans can end there.
+        """
+        offsets = array('I')
+        for index, char in enumerate(self.original):
+            offsets.extend([index] * len(_FOLD[ord(char)]))
+        offsets.append(len(self.original))
+        return offsets
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a [start, end) span of folded to the matching span of original."""
+        offsets = self.offsets
+        if end <= start:
+            return offsets[start], offsets[start]
+        return offsets[start], offsets[end - 1] + 1
+
+    def span(self, start: int, end: int) -> str:
+        """Return the original text behind a [start, end) span of folded."""
+        begin, finish = self.original_span(start, end)
+        return self.original[begin:finish]
+
+
+def normalize(text: Union[str, NormalizedText]) -> NormalizedText:
+    """Return text as a NormalizedText, reusing it if it already is one."""
+    return text if isinstance(text, NormalizedText) else NormalizedText(text)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Fixed-bucket latency histogram shared by the extraction server
+(extraction/extraction_server.py) and the Places scraper metrics
+(places_metrics.py).
+
+Samples are counted into buckets by upper bound, so recording is O(log
+buckets) and memory stays constant however long a server runs. Percentiles
+are estimated as the bound of the bucket that holds them, clamped to the
+largest sample seen; each caller picks bounds that fit its latencies.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with estimated percentiles."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)  # upper bounds in ms; the last bucket is open-ended
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of samples."""
+        samples = sum(self.counts)
+        if not samples:
+            return None
+        rank = fraction * samples
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def summary(self) -> Dict:
+        samples = sum(self.counts)
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': samples,
+            'mean_ms': round(self.total / samples, 3) if samples else None,
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max, 3),
+            'buckets_ms': dict(zip(labels, self.counts)),
+        }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite cache for Google Places responses.
+
+Mazunte's landmarks barely change week to week, so scrape-mazunte-google.py
+keeps every successful places_nearby() and place() response on disk:
+
+- nearby searches are keyed by their canonical request parameters, details
+  by place_id plus the requested fields
+- each entry has its own expiry (per-kind TTLs, nearby searches go stale
+  sooner than details)
+- the file is bounded by max_bytes; the least recently used entries are
+  evicted first
+- hit/miss/expired/eviction counters are kept per kind for the run summary
+
+CachedPlacesClient wraps any client with the places_nearby()/place() surface
+and sits in front of the rate limiter, so cache hits cost no quota and no
+tokens. A warm re-run makes zero network calls.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+DAY = 24 * 60 * 60
+
+DEFAULT_TTLS = {
+    'nearby': 7 * DAY,
+    'details': 30 * DAY,
+}
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+# Access-time updates from get() are committed in batches of this many
+ACCESS_COMMIT_EVERY = 100
+
+# Statuses worth remembering; errors and quota failures are always retried
+CACHEABLE_STATUSES = {'OK', 'ZERO_RESULTS', None}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+def _canonical(params: Dict) -> str:
+    """Stable JSON for request parameters (tuples become lists, keys sorted)."""
+    return json.dumps(params, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                      default=list)
+
+
+class PlacesCache:
+    """Thread-safe SQLite key/value store with per-entry TTLs and LRU size bound."""
+
+    def __init__(self, path, ttls: Optional[Dict[str, float]] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES, refresh: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.refresh = refresh  # ignore cached entries but still write fresh ones
+        self.stats = {kind: {'hits': 0, 'misses': 0, 'expired': 0} for kind in self.ttls}
+        self.evictions = 0
+        self._pending_accesses = 0  # access-time updates not committed yet
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            # Keep the recency of this run's hits for the next run's LRU eviction
+            self._commit()
+            self._conn.close()
+
+    def __enter__(self) -> 'PlacesCache':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def get(self, kind: str, key: str):
+        """Return the cached value or None (missing, expired or refreshing)."""
+        stats = self.stats.setdefault(kind, {'hits': 0, 'misses': 0, 'expired': 0})
+        now = time.time()
+        with self._lock:
+            row = None if self.refresh else self._conn.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                stats['misses'] += 1
+                return None
+            value, expires = row
+            if expires <= now:
+                stats['expired'] += 1
+                stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._pending_accesses += 1
+            if self._pending_accesses >= ACCESS_COMMIT_EVERY:
+                self._commit()
+            stats['hits'] += 1
+        return json.loads(value)
+
+    def put(self, kind: str, key: str, value, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, evicting old entries past max_bytes."""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(key) + len(data.encode('utf-8'))
+        now = time.time()
+        expires = now + (ttl if ttl is not None else self.ttls.get(kind, DEFAULT_TTLS['details']))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, size, created, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, data, size, now, expires, now),
+            )
+            self._bytes += size - (previous[0] if previous else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._commit()
+
+    def _commit(self) -> None:
+        self._conn.commit()
+        self._pending_accesses = 0
+
+    def _evict(self) -> None:
+        # Expired entries go first, then least recently used until 90% of the bound
+        now = time.time()
+        removed = self._conn.execute("DELETE FROM responses WHERE expires <= ?", (now,)).rowcount
+        self.evictions += max(removed, 0)
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = self.max_bytes * 0.9
+        if self._bytes <= target:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if self._bytes <= target:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'bytes': self._bytes,
+            'evictions': self.evictions,
+            'kinds': {kind: dict(stats) for kind, stats in self.stats.items()},
+        }
+
+
+class CachedPlacesClient:
+    """Proxy that serves places_nearby() and place() from a PlacesCache when it can."""
+
+    def __init__(self, client, cache: PlacesCache):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _cached(self, kind: str, key: str, fetch):
+        response = self.cache.get(kind, key)
+        if response is not None:
+            return response
+        response = fetch()
+        if response.get('status') in CACHEABLE_STATUSES:
+            self.cache.put(kind, key, response)
+        return response
+
+    def places_nearby(self, **params):
+        if params.get('page_token'):
+            # Page tokens are short-lived and single-use; never cache them
+            return self.client.places_nearby(**params)
+        key = 'nearby:' + _canonical(params)
+        return self._cached('nearby', key, lambda: self.client.places_nearby(**params))
+
+    def nearby_pages(self, params: Dict, fetch):
+        """
+        Serve a whole paginated search from one entry. fetch(client, params)
+        runs the query and follows its page tokens against the wrapped client;
+        tokens expire within minutes, so the page chain is stored as a unit.
+        """
+        key = 'nearby_pages:' + _canonical(params)
+        pages = self.cache.get('nearby', key)
+        if pages is not None:
+            return pages
+        pages = fetch(self.client, params)
+        if all(page.get('status') in CACHEABLE_STATUSES for page in pages):
+            self.cache.put('nearby', key, pages)
+        return pages
+
+    def place(self, place_id, **params):
+        fields = params.get('fields')
+        key = 'details:' + _canonical({'place_id': place_id, **params,
+                                       'fields': sorted(fields) if fields else None})
+        return self._cached('details', key, lambda: self.client.place(place_id, **params))
+
+
+def print_cache_summary(summary: Dict) -> None:
+    print("\n🗄️  Cache:")
+    for kind, stats in summary['kinds'].items():
+        lookups = stats['hits'] + stats['misses']
+        rate = stats['hits'] / lookups if lookups else 0.0
+        print(f"  • {kind}: {stats['hits']} hits / {stats['misses']} misses "
+              f"({rate:.0%} hit rate, {stats['expired']} expired)")
+    print(f"  • {summary['entries']} entries, {summary['bytes'] / 1024:.0f} KB, "
+          f"{summary['evictions']} evicted ({os.path.relpath(summary['path'])})")
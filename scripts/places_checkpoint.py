@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Checkpointed, resumable output for scrape-mazunte-google.py.
+
+Instead of holding every place in memory until the end of the run,
+ScrapeCheckpoint appends each row to a CSV and an NDJSON stream as soon as
+its details arrive, and after every finished search saves a small
+checkpoint next to them with:
+
+- the indices of the searches that completed
+- the CoverageEngine state (seen place_ids, searches already run)
+- the places discovered but still waiting for their details
+
+A restarted run restores the engine, skips the completed searches and only
+requests details for pending places that have no row yet, so no search or
+details request that already produced output is sent again. The NDJSON
+stream is the record of what was written: on resume a half-written last
+line is dropped and the CSV is rebuilt from it. With the response cache on,
+details that arrived just before a crash are served from the cache.
+
+The streams are written as '<name>.partial' and renamed into place by
+finish(), so the previous run's outputs stay intact until a new run
+completes. A checkpoint only resumes the same run: it is ignored when the
+searches or coverage settings changed, and removed once the run completes.
+"""
+
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+CHECKPOINT_VERSION = 1
+PARTIAL_SUFFIX = '.partial'
+
+
+class ScrapeCheckpoint:
+    """Streams place rows to <basename>.csv/.ndjson and checkpoints search progress."""
+
+    def __init__(self, output_dir, basename: str, fieldnames: Sequence[str], config: Dict,
+                 restart: bool = False):
+        output_dir = Path(output_dir)
+        self.csv_path = output_dir / f"{basename}.csv"
+        self.ndjson_path = output_dir / f"{basename}.ndjson"
+        self.path = output_dir / f"{basename}.checkpoint.json"
+        self.fieldnames = list(fieldnames)
+        # Compared with the saved copy, so normalize tuples and the like the way JSON would
+        self.config = json.loads(json.dumps(config))
+        self.rows: List[Dict] = []
+        self.state = None if restart else self._load()
+        self._ndjson = None
+        self._csv_file = None
+        self._csv = None
+
+    @staticmethod
+    def _partial(path: Path) -> Path:
+        return path.with_name(path.name + PARTIAL_SUFFIX)
+
+    def _load(self) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != CHECKPOINT_VERSION or state.get('config') != self.config:
+            print(f"⚠️ Ignoring {self.path.name}: it was written for different searches or settings")
+            return None
+        self.rows = self._read_stream(self._partial(self.ndjson_path))
+        return state
+
+    @staticmethod
+    def _read_stream(path: Path) -> List[Dict]:
+        if not path.exists():
+            return []
+        with open(path, 'rb') as f:
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        if len(complete) < len(data):
+            # Interrupted mid-line; cut the fragment so appends start on a fresh line
+            with open(path, 'r+b') as f:
+                f.truncate(len(complete))
+        return [json.loads(line) for line in complete.decode('utf-8').splitlines() if line.strip()]
+
+    # ------------------------------------------------------------------
+    # Resume state
+    # ------------------------------------------------------------------
+
+    @property
+    def resumed(self) -> bool:
+        return self.state is not None
+
+    @property
+    def completed(self) -> set:
+        """Indices (1-based) of the searches finished before the restart."""
+        return set(self.state['completed']) if self.state else set()
+
+    @property
+    def coverage(self) -> Optional[Dict]:
+        return self.state['coverage'] if self.state else None
+
+    def pending(self) -> List[Dict]:
+        """Places discovered before the restart whose rows were never written."""
+        if not self.state:
+            return []
+        written = {row.get('place_id') for row in self.rows}
+        return [entry for entry in self.state['pending'] if entry['place_id'] not in written]
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def open(self) -> 'ScrapeCheckpoint':
+        """Open the streams: append to a resumed NDJSON, start fresh otherwise."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        mode = 'a' if self.resumed else 'w'
+        self._ndjson = open(self._partial(self.ndjson_path), mode, encoding='utf-8')
+        # The CSV is rebuilt from the stream, so a torn last row never survives a resume
+        self._csv_file = open(self._partial(self.csv_path), 'w', newline='', encoding='utf-8')
+        self._csv = csv.DictWriter(self._csv_file, fieldnames=self.fieldnames)
+        self._csv.writeheader()
+        self._csv.writerows(self.rows)
+        self._csv_file.flush()
+        return self
+
+    def append(self, row: Dict) -> None:
+        """Write one place to both streams and flush them."""
+        self._ndjson.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self._ndjson.flush()
+        self._csv.writerow(row)
+        self._csv_file.flush()
+        self.rows.append(row)
+
+    def save(self, completed, coverage: Dict, pending: List[Dict]) -> None:
+        """Checkpoint the finished searches, the engine state and the places awaiting details."""
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'config': self.config,
+            'completed': sorted(completed),
+            'coverage': coverage,
+            'pending': pending,
+            'rows': len(self.rows),
+        }
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def finish(self) -> None:
+        """Move the complete streams into place and drop the checkpoint."""
+        self.close()
+        for path in (self.csv_path, self.ndjson_path):
+            os.replace(self._partial(path), path)
+        if self.path.exists():
+            self.path.unlink()
+
+    def close(self) -> None:
+        """Close the streams, keeping them and the checkpoint for a later resume."""
+        for f in (self._ndjson, self._csv_file):
+            if f is not None:
+                f.close()
+        self._ndjson = self._csv_file = self._csv = None
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Client helpers for the Google Places scraper (scrape-mazunte-google.py).
+
+- TokenBucket: thread-safe rate limiter shared by every worker, so the
+  scraper never exceeds its queries-per-second budget however many details
+  requests are in flight
+- RateLimitedClient: wraps a googlemaps.Client (or a fake) and takes a token
+  before every Places call
+- FakePlacesClient: offline stand-in with the same places_nearby()/place()
+  surface, deterministic results and injected latency, for exercising the
+  scraper without an API key or quota
+"""
+
+import math
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_QPS = 10.0
+
+# Nearby Search returns at most 20 results per page
+PAGE_SIZE = 20
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, bursts of up to `capacity`.
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float = DEFAULT_QPS, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available, then take them."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+                self.waited += wait
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """Proxy that rate-limits places_nearby() and place(); everything else passes through."""
+
+    def __init__(self, client, limiter: TokenBucket):
+        self.client = client
+        self.limiter = limiter
+        self.calls = {'places_nearby': 0, 'place': 0}
+        self._lock = threading.Lock()  # details workers count calls concurrently
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def places_nearby(self, **params):
+        self.limiter.acquire()
+        self._count('places_nearby')
+        return self.client.places_nearby(**params)
+
+    def place(self, place_id, **params):
+        self.limiter.acquire()
+        self._count('place')
+        return self.client.place(place_id=place_id, **params)
+
+
+# ============================================
+# FAKE CLIENT
+# ============================================
+
+_TYPES = ['restaurant', 'cafe', 'bar', 'lodging', 'store', 'tourist_attraction', 'spa', 'gym']
+_WORDS = ['Casa', 'Luna', 'Mar', 'Sol', 'Playa', 'Cielo', 'Jardín', 'Palapa', 'Tortuga', 'Océano']
+
+
+def _hash(text: str) -> int:
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def distance_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Equirectangular distance in meters; plenty accurate at town scale."""
+    lat = math.radians((a[0] + b[0]) / 2)
+    dx = math.radians(b[1] - a[1]) * math.cos(lat)
+    dy = math.radians(b[0] - a[0])
+    return 6371000 * math.hypot(dx, dy)
+
+
+class FakePlacesClient:
+    """
+    Offline Places backend with injected latency.
+
+    Generates `count` places scattered around `center`. places_nearby()
+    filters them by distance and keyword/type the way the real API does
+    (up to 20 per page, next_page_token for more), and place() returns
+    details. Results depend only on the arguments, so runs are repeatable.
+    """
+
+    def __init__(self, center: Tuple[float, float], count: int = 400, spread_m: float = 4000,
+                 latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = {'places_nearby': 0, 'place': 0}
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, Tuple[Dict, int]] = {}
+        self.places = [self._make_place(i, center, spread_m) for i in range(count)]
+        self._by_id = {place['place_id']: place for place in self.places}
+
+    @staticmethod
+    def _make_place(i: int, center: Tuple[float, float], spread_m: float) -> Dict:
+        h = _hash(f"place-{i}")
+        # Denser toward the center, like a town around its main street
+        radius = spread_m * (h & 0xFFFF) / 0xFFFF
+        angle = ((h >> 16) & 0xFFFF) / 0xFFFF * 2 * math.pi
+        lat = center[0] + radius * math.cos(angle) / 111320
+        lng = center[1] + radius * math.sin(angle) / (111320 * math.cos(math.radians(center[0])))
+        kind = _TYPES[h % len(_TYPES)]
+        name = f"{_WORDS[h % len(_WORDS)]} {_WORDS[(h >> 8) % len(_WORDS)]} {kind.replace('_', ' ').title()} {i}"
+        return {
+            'place_id': f"fake-{i:05d}",
+            'name': name,
+            'types': [kind, 'point_of_interest', 'establishment'],
+            'geometry': {'location': {'lat': round(lat, 7), 'lng': round(lng, 7)}},
+            'rating': round(3 + (h % 21) / 10, 1),
+            'user_ratings_total': h % 500,
+            'prominence': h % 1000,
+        }
+
+    def _sleep(self, key: str) -> None:
+        if self.latency > 0:
+            spread = ((_hash(key) % 1000) / 1000 - 0.5) * 2 * self.jitter
+            time.sleep(max(0.0, self.latency * (1 + spread)))
+
+    def _count(self, method: str, key: str) -> None:
+        with self._lock:
+            self.calls[method] += 1
+            call = self.calls[method]
+        self._sleep(f"{key}:{call}")
+        if self.error_rate and (_hash(f"error:{key}:{call}") % 10000) / 10000 < self.error_rate:
+            raise RuntimeError(f"fake transient error on {method}")
+
+    def _matches(self, place: Dict, params: Dict) -> bool:
+        if distance_m(params['location'], self._location(place)) > params.get('radius', 0):
+            return False
+        if params.get('type') and params['type'] not in place['types']:
+            return False
+        keyword = params.get('keyword')
+        if keyword:
+            haystack = (place['name'] + ' ' + ' '.join(place['types'])).lower()
+            # Loosely match like the real service: keyword text or a stable share of nearby places
+            return keyword.lower() in haystack or _hash(keyword + place['place_id']) % 4 == 0
+        return True
+
+    @staticmethod
+    def _location(place: Dict) -> Tuple[float, float]:
+        location = place['geometry']['location']
+        return location['lat'], location['lng']
+
+    def places_nearby(self, location=None, radius=None, keyword=None, type=None, page_token=None, **_):
+        self._count('places_nearby', f"{location}:{radius}:{keyword}:{type}:{page_token}")
+        if page_token:
+            with self._lock:
+                params, offset = self._tokens.pop(page_token)
+        else:
+            params = {'location': tuple(location), 'radius': radius, 'keyword': keyword, 'type': type}
+            offset = 0
+
+        matches = sorted((p for p in self.places if self._matches(p, params)),
+                         key=lambda p: (-p['prominence'], p['place_id']))
+        page = matches[offset:offset + PAGE_SIZE]
+        response = {
+            'status': 'OK' if page else 'ZERO_RESULTS',
+            'results': [
+                {key: value for key, value in place.items() if key != 'prominence'}
+                for place in page
+            ],
+        }
+        # The real API caps a search at 3 pages (60 results)
+        if offset + PAGE_SIZE < min(len(matches), 3 * PAGE_SIZE):
+            token = f"token-{_hash(repr(params))}-{offset + PAGE_SIZE}"
+            with self._lock:
+                self._tokens[token] = (params, offset + PAGE_SIZE)
+            response['next_page_token'] = token
+        return response
+
+    def place(self, place_id=None, fields: Optional[List[str]] = None, **_):
+        self._count('place', place_id)
+        place = self._by_id.get(place_id)
+        if place is None:
+            return {'status': 'NOT_FOUND', 'result': {}}
+        h = _hash(place_id)
+        result = {
+            'name': place['name'],
+            'formatted_address': f"{h % 200} Calle {_WORDS[h % len(_WORDS)]}, Mazunte, Oax., Mexico",
+            'geometry': place['geometry'],
+            'formatted_phone_number': f"958 {h % 900 + 100} {h % 9000 + 1000}" if h % 3 else None,
+            'website': f"https://{place_id}.example.com" if h % 4 == 0 else None,
+            'rating': place['rating'],
+            'user_ratings_total': place['user_ratings_total'],
+            'opening_hours': {'open_now': bool(h % 2), 'weekday_text': ['Monday: 9:00 AM – 9:00 PM']},
+            'price_level': h % 4 + 1 if h % 5 else None,
+            'type': place['types'],
+            'url': f"https://maps.google.com/?cid={h}",
+        }
+        result = {key: value for key, value in result.items() if value is not None}
+        if fields:
+            result = {key: value for key, value in result.items() if key in fields}
+        return {'status': 'OK', 'result': result}
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Adaptive coverage for Places Nearby Search.
+
+One nearby search returns at most 60 results (3 pages of 20), so a single
+3 km query per category silently drops places in dense categories.
+CoverageEngine searches each term adaptively:
+
+- every tile query follows next_page_token to the end
+- a tile whose query saturates (returns the 60-result cap) is split into
+  four quadrants, quadtree-style, down to max_depth; sparse tiles are never
+  split, so quiet areas cost one request
+- a saturated tile whose results were all found by earlier queries is not
+  split: an earlier, broader search (e.g. type=lodging before
+  keyword=hotel) already covers it. Identical searches are skipped
+  outright. Pass exhaustive=True to split on saturation alone.
+
+Tiles are visited depth-first in a fixed quadrant order and results are
+filtered to the original search circle, so output order is deterministic.
+"""
+
+import json
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from places_client import PAGE_SIZE, distance_m
+
+MAX_RESULTS = 3 * PAGE_SIZE  # the API's per-query cap
+MAX_DEPTH = 3
+# A fresh next_page_token takes a moment to become valid on Google's side
+PAGE_TOKEN_DELAY = 2.0
+PAGE_RETRIES = 3
+
+_METERS_PER_DEGREE = 111320
+
+# (north/south, east/west) offsets of the four child tiles, in visiting order
+_QUADRANTS = [(1, -1), (1, 1), (-1, -1), (-1, 1)]
+
+
+def offset(point: Tuple[float, float], north_m: float, east_m: float) -> Tuple[float, float]:
+    """Move a (lat, lng) point by meters north and east."""
+    lat = point[0] + north_m / _METERS_PER_DEGREE
+    lng = point[1] + east_m / (_METERS_PER_DEGREE * math.cos(math.radians(point[0])))
+    return round(lat, 6), round(lng, 6)
+
+
+def _location(place: Dict) -> Optional[Tuple[float, float]]:
+    location = place.get('geometry', {}).get('location')
+    if not location:
+        return None
+    return location['lat'], location['lng']
+
+
+class CoverageEngine:
+    """
+    Finds every place for a sequence of search terms with as few nearby
+    requests as it can. search() returns the places not returned by any
+    earlier search, in deterministic order.
+    """
+
+    def __init__(self, client, center: Tuple[float, float], radius: float,
+                 max_depth: int = MAX_DEPTH, page_delay: float = PAGE_TOKEN_DELAY,
+                 exhaustive: bool = False):
+        self.client = client
+        self.center = center
+        self.radius = radius
+        self.max_depth = max_depth
+        self.page_delay = page_delay
+        self.exhaustive = exhaustive
+        self.seen = set()
+        self.terms: List[Dict] = []
+        self._done = set()
+
+    # ------------------------------------------------------------------
+    # Paging
+    # ------------------------------------------------------------------
+
+    def _fetch_pages(self, client, params: Dict) -> List[Dict]:
+        """Run one query and follow next_page_token to the last page."""
+        pages = [client.places_nearby(**params)]
+        token = pages[-1].get('next_page_token')
+        while token:
+            if self.page_delay:
+                time.sleep(self.page_delay)
+            for attempt in range(PAGE_RETRIES):
+                try:
+                    page = client.places_nearby(page_token=token)
+                except Exception:
+                    # Token not valid yet (INVALID_REQUEST); wait and retry
+                    if attempt == PAGE_RETRIES - 1:
+                        raise
+                    time.sleep(self.page_delay or 0.5)
+                    continue
+                if page.get('status') == 'INVALID_REQUEST' and attempt < PAGE_RETRIES - 1:
+                    time.sleep(self.page_delay or 0.5)
+                    continue
+                break
+            pages.append(page)
+            token = page.get('next_page_token')
+        return pages
+
+    def _query(self, params: Dict) -> List[Dict]:
+        # A caching client can store the whole page chain as one entry
+        cached = getattr(self.client, 'nearby_pages', None)
+        if cached is not None:
+            pages = cached(params, self._fetch_pages)
+        else:
+            pages = self._fetch_pages(self.client, params)
+        return [place for page in pages for place in page.get('results', [])]
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def search(self, params: Dict, name: Optional[str] = None) -> List[Dict]:
+        """Cover the search circle for one term; return places new to this engine."""
+        key = json.dumps(params, sort_keys=True, default=list)
+        stats = {'name': name, 'queries': 0, 'splits': 0, 'results': 0,
+                 'new': 0, 'saturated': 0, 'skipped': key in self._done}
+        self.terms.append(stats)
+        if stats['skipped']:
+            return []
+        self._done.add(key)
+
+        new_places: List[Dict] = []
+        term_seen = set()
+        # Root tile keeps the original circle; children are squares queried by their circumcircle
+        stack = [(self.center, self.radius, self.radius, 0)]
+        while stack:
+            center, half_side, query_radius, depth = stack.pop()
+            results = self._query({**params, 'location': center, 'radius': round(query_radius)})
+            stats['queries'] += 1
+
+            fresh_for_engine = 0
+            for place in results:
+                place_id = place.get('place_id')
+                location = _location(place)
+                if location is not None and distance_m(self.center, location) > self.radius:
+                    continue
+                if place_id in term_seen:
+                    continue
+                term_seen.add(place_id)
+                stats['results'] += 1
+                if place_id in self.seen:
+                    continue
+                self.seen.add(place_id)
+                fresh_for_engine += 1
+                new_places.append(place)
+
+            if len(results) < MAX_RESULTS:
+                continue
+            stats['saturated'] += 1
+            if depth >= self.max_depth or (not self.exhaustive and not fresh_for_engine):
+                continue
+
+            stats['splits'] += 1
+            child_half = half_side / 2
+            # Push in reverse so quadrants are visited NW, NE, SW, SE
+            for north, east in reversed(_QUADRANTS):
+                child = offset(center, north * child_half, east * child_half)
+                stack.append((child, child_half, child_half * math.sqrt(2), depth + 1))
+
+        stats['new'] = len(new_places)
+        return new_places
+
+    # ------------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------------
+
+    def state(self) -> Dict:
+        """JSON-serializable snapshot of what has been searched and found so far."""
+        return {
+            'seen': sorted(self.seen),
+            'done': sorted(self._done),
+            'terms': [dict(term) for term in self.terms],
+        }
+
+    def restore(self, state: Dict) -> None:
+        """Continue from a state() snapshot, e.g. one saved by an interrupted run."""
+        self.seen = set(state['seen'])
+        self._done = set(state['done'])
+        self.terms = [dict(term) for term in state['terms']]
+
+    def summary(self) -> Dict:
+        return {
+            'terms': len(self.terms),
+            'skipped_terms': sum(1 for term in self.terms if term['skipped']),
+            'queries': sum(term['queries'] for term in self.terms),
+            'splits': sum(term['splits'] for term in self.terms),
+            'unique_places': len(self.seen),
+        }
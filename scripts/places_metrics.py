@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Request metrics and quota accounting for the Places scraper.
+
+InstrumentedClient sits innermost in the client chain
+(CachedPlacesClient -> RateLimitedClient -> InstrumentedClient -> googlemaps),
+so it sees exactly the requests that reach Google: cache hits cost nothing
+and time spent waiting on the rate limiter is not counted as latency.
+
+ScrapeMetrics keeps, per endpoint (places_nearby, place):
+- calls, errors (exceptions and statuses other than OK/ZERO_RESULTS) and
+  retries (a request repeated after it failed, e.g. a page token that was
+  not valid yet)
+- response status counts and a latency histogram
+- the billed SKUs of every request, priced at SKU_PRICES
+
+and, per entry in SEARCHES, the requests it caused and their estimated cost,
+the details calls that failed, and the new-vs-duplicate yield from the
+CoverageEngine. report() assembles all of it for the JSON file written next
+to the CSV.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from latency_histogram import LatencyHistogram
+
+LATENCY_BUCKETS_MS = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# USD per 1000 requests (Places API list prices; check the current price sheet)
+SKU_PRICES = {
+    'nearby_search': 32.0,
+    'place_details': 17.0,
+    'contact_data': 3.0,
+    'atmosphere_data': 5.0,
+}
+
+# Nearby Search returns every field, so it bills the data SKUs too
+NEARBY_SKUS = ('nearby_search', 'contact_data', 'atmosphere_data')
+
+CONTACT_FIELDS = {
+    'formatted_phone_number', 'international_phone_number', 'opening_hours',
+    'current_opening_hours', 'secondary_opening_hours', 'website',
+}
+ATMOSPHERE_FIELDS = {
+    'price_level', 'rating', 'reviews', 'user_ratings_total', 'curbside_pickup', 'delivery',
+    'dine_in', 'reservable', 'serves_beer', 'serves_breakfast', 'serves_brunch',
+    'serves_dinner', 'serves_lunch', 'serves_vegetarian_food', 'serves_wine', 'takeout',
+}
+
+OK_STATUSES = {'OK', 'ZERO_RESULTS'}
+ENDPOINTS = ('places_nearby', 'place')
+
+
+def details_skus(fields: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    """SKUs billed by one Place Details request for the requested fields (all fields if None)."""
+    fields = set(fields) if fields else None
+    skus = ['place_details']
+    if fields is None or fields & CONTACT_FIELDS:
+        skus.append('contact_data')
+    if fields is None or fields & ATMOSPHERE_FIELDS:
+        skus.append('atmosphere_data')
+    return tuple(skus)
+
+
+def _cost(skus: Iterable[str]) -> float:
+    return sum(SKU_PRICES[sku] for sku in skus) / 1000
+
+
+def _new_endpoint() -> Dict:
+    return {'calls': 0, 'errors': 0, 'retries': 0, 'statuses': {}, 'latency': LatencyHistogram(LATENCY_BUCKETS_MS),
+            'skus': {}}
+
+
+def _new_search() -> Dict:
+    return {'nearby_calls': 0, 'details_calls': 0, 'details_failed': 0, 'errors': 0, 'usd': 0.0}
+
+
+class ScrapeMetrics:
+    """Thread-safe counters for one scraper run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {endpoint: _new_endpoint() for endpoint in ENDPOINTS}
+        self.searches: Dict[str, Dict] = {}
+        self.current_search: Optional[str] = None  # set while a search's nearby queries run
+        self.terms: List[Dict] = []
+        self.places = 0
+        self._place_search: Dict[str, str] = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def attribute(self, place_id: str, search: str) -> None:
+        """Charge the details request for place_id to the search that found it."""
+        with self._lock:
+            self._place_search[place_id] = search
+
+    def search_for(self, place_id: str) -> Optional[str]:
+        with self._lock:
+            return self._place_search.get(place_id)
+
+    def record(self, endpoint: str, key: str, search: Optional[str], seconds: float,
+               status: Optional[str], skus: Sequence[str]) -> None:
+        """Record one request; status is None when it raised instead of returning."""
+        with self._lock:
+            stats = self.endpoints[endpoint]
+            stats['calls'] += 1
+            stats['latency'].add(seconds * 1000)
+            label = status if status is not None else 'EXCEPTION'
+            stats['statuses'][label] = stats['statuses'].get(label, 0) + 1
+            if (endpoint, key) in self._failed:
+                stats['retries'] += 1
+            failed = status not in OK_STATUSES
+            if failed:
+                stats['errors'] += 1
+                self._failed.add((endpoint, key))
+            else:
+                self._failed.discard((endpoint, key))
+
+            # Requests that got a response are billed, whatever its status
+            billed = skus if status is not None else ()
+            for sku in billed:
+                stats['skus'][sku] = stats['skus'].get(sku, 0) + 1
+
+            if search is not None:
+                entry = self.searches.setdefault(search, _new_search())
+                entry['nearby_calls' if endpoint == 'places_nearby' else 'details_calls'] += 1
+                entry['errors'] += failed
+                if endpoint == 'place' and failed:
+                    entry['details_failed'] += 1
+                entry['usd'] += _cost(billed)
+
+    def record_coverage(self, terms: List[Dict], places: int) -> None:
+        """Keep the CoverageEngine's per-search yield and the number of places written."""
+        self.terms = [dict(term) for term in terms]
+        self.places = places
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def report(self, cache: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            endpoints = {}
+            sku_calls: Dict[str, int] = {}
+            for endpoint, stats in self.endpoints.items():
+                endpoints[endpoint] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'statuses': dict(stats['statuses']),
+                    'latency': stats['latency'].summary(),
+                }
+                for sku, count in stats['skus'].items():
+                    sku_calls[sku] = sku_calls.get(sku, 0) + count
+
+            skus = {sku: {'requests': count, 'usd': round(count * SKU_PRICES[sku] / 1000, 4)}
+                    for sku, count in sku_calls.items()}
+            total_usd = sum(sku['usd'] for sku in skus.values())
+
+            searches = []
+            for term in self.terms:
+                name = term.get('name')
+                calls = self.searches.get(name, _new_search())
+                new = term.get('new', 0)
+                searches.append({
+                    'name': name,
+                    'skipped': term.get('skipped', False),
+                    'tile_queries': term.get('queries', 0),
+                    'splits': term.get('splits', 0),
+                    'saturated': term.get('saturated', 0),
+                    'results': term.get('results', 0),
+                    'new': new,
+                    'duplicates': term.get('results', 0) - new,
+                    'nearby_calls': calls['nearby_calls'],
+                    'details_calls': calls['details_calls'],
+                    'details_failed': calls['details_failed'],
+                    'errors': calls['errors'],
+                    'usd': round(calls['usd'], 4),
+                    'usd_per_new_place': round(calls['usd'] / new, 4) if new else None,
+                })
+
+        report = {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': round(time.time() - self.started, 3),
+            'places': self.places,
+            'endpoints': endpoints,
+            'cost': {
+                'prices_per_1000': dict(SKU_PRICES),
+                'skus': skus,
+                'total_usd': round(total_usd, 4),
+                'usd_per_place': round(total_usd / self.places, 4) if self.places else None,
+            },
+            'searches': searches,
+        }
+        if cache is not None:
+            report['cache'] = cache
+        return report
+
+
+def write_report(report: Dict, path) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def print_metrics_summary(report: Dict) -> None:
+    print("\n📈 Requests:")
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats['latency']
+        if not stats['calls']:
+            continue
+        print(f"  • {endpoint}: {stats['calls']} calls, {stats['errors']} errors, {stats['retries']} retries, "
+              f"p50 {latency['p50_ms']:.0f} ms / p90 {latency['p90_ms']:.0f} ms / max {latency['max_ms']:.0f} ms")
+    cost = report['cost']
+    per_place = f" (${cost['usd_per_place']:.4f} per place)" if cost['usd_per_place'] else ""
+    print(f"  • estimated cost: ${cost['total_usd']:.2f}{per_place}")
+    wasteful = sorted((search for search in report['searches'] if search['new']),
+                      key=lambda search: -(search['usd_per_new_place'] or 0))[:3]
+    if wasteful:
+        print("  • costliest searches per new place: " + ", ".join(
+            f"{search['name']} ${search['usd_per_new_place']:.3f}" for search in wasteful))
+
+
+class InstrumentedClient:
+    """Proxy that times places_nearby() and place() and records them in a ScrapeMetrics."""
+
+    def __init__(self, client, metrics: ScrapeMetrics):
+        self.client = client
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _call(self, endpoint: str, key: str, search: Optional[str], skus: Sequence[str], call):
+        started = time.perf_counter()
+        try:
+            response = call()
+        except Exception:
+            self.metrics.record(endpoint, key, search, time.perf_counter() - started, None, skus)
+            raise
+        status = response.get('status') if isinstance(response, dict) else None
+        self.metrics.record(endpoint, key, search, time.perf_counter() - started, status or 'OK', skus)
+        return response
+
+    def places_nearby(self, **params):
+        key = json.dumps(params, sort_keys=True, default=list)
+        return self._call('places_nearby', key, self.metrics.current_search, NEARBY_SKUS,
+                          lambda: self.client.places_nearby(**params))
+
+    def place(self, place_id=None, **params):
+        fields = params.get('fields')
+        key = json.dumps({'place_id': place_id, **params}, sort_keys=True, default=list)
+        return self._call('place', key, self.metrics.search_for(place_id), details_skus(fields),
+                          lambda: self.client.place(place_id=place_id, **params))
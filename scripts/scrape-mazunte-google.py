@@ -3,16 +3,32 @@
 MAZUNTE LANDMARKS SCRAPER - Using Google Places API
 Fetches real coordinates, phone numbers, hours, ratings from Google
 
-USAGE: python3 scripts/scrape-mazunte-google.py
+USAGE: python3 scripts/scrape-mazunte-google.py [--workers 8] [--qps 10]
+       python3 scripts/scrape-mazunte-google.py --fake --output-dir /tmp/places
+
+Places are written as they arrive and progress is checkpointed after every
+search; re-running after a crash resumes where the last search finished.
 """
 
-import googlemaps
-import csv
+import argparse
 import json
-import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import googlemaps
+except ImportError:  # only needed for live runs; --fake works without it
+    googlemaps = None
+
+from places_cache import DAY, DEFAULT_MAX_BYTES, CachedPlacesClient, PlacesCache, print_cache_summary
+from places_checkpoint import ScrapeCheckpoint
+from places_client import DEFAULT_QPS, FakePlacesClient, RateLimitedClient, TokenBucket
+from places_coverage import MAX_DEPTH, PAGE_TOKEN_DELAY, CoverageEngine
+from places_metrics import InstrumentedClient, ScrapeMetrics, print_metrics_summary, write_report
+
 # ============================================
 # CONFIGURATION
 # ============================================
@@ -38,6 +54,16 @@ SEARCH_RADIUS = 3000  # meters (3km to cover entire area)
 OUTPUT_DIR = Path(__file__).parent.parent / 'data' / 'outputs'
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Response cache (see places_cache.py)
+CACHE_PATH = Path(__file__).parent.parent / 'data' / 'cache' / 'places-cache.sqlite'
+
+OUTPUT_BASENAME = 'Mazunte_Landmarks_Google_API'
+CSV_FIELDS = [
+    'name', 'category', 'latitude', 'longitude', 'address',
+    'phone', 'website', 'google_maps_url', 'rating', 'review_count',
+    'price_level', 'hours', 'open_now', 'types', 'place_id'
+]
+
 # ============================================
 # DEFINE SEARCHES
 # ============================================
@@ -85,100 +111,216 @@ SEARCHES = [
 # MAIN SCRAPER FUNCTION
 # ============================================
 
-def scrape_mazunte_places(api_key):
+DETAILS_FIELDS = [
+    'name', 'formatted_address', 'geometry',
+    'formatted_phone_number', 'international_phone_number',
+    'website', 'rating', 'user_ratings_total',
+    'opening_hours', 'price_level', 'type', 'url'
+]
+
+DETAILS_WORKERS = 8  # concurrent place-details requests
+MAX_QPS = DEFAULT_QPS  # shared budget for all Places requests
+
+
+def scrape_mazunte_places(api_key, client=None, workers=DETAILS_WORKERS, qps=MAX_QPS, cache=None,
+                          max_depth=MAX_DEPTH, page_delay=PAGE_TOKEN_DELAY, exhaustive=False,
+                          checkpoint=None, metrics=None):
     """
     Scrape all Mazunte landmarks using Google Places API
     Returns list of place dictionaries with coordinates
+
+    Details requests run on a pool of `workers` threads while the searches
+    continue; every request takes a token from one bucket so the run stays
+    under `qps`. Places are returned in first-seen order regardless of which
+    details response arrives first. Pass `client` to use any object with
+    places_nearby()/place() (e.g. FakePlacesClient) instead of googlemaps.
+    With a PlacesCache, cached responses are served without touching the
+    network or the rate limit.
+
+    Each search goes through a CoverageEngine: pages are followed, saturated
+    areas are split into quadrants (up to `max_depth`) and searches already
+    covered by earlier ones are not subdivided.
+
+    With a ScrapeCheckpoint, each place is appended to its CSV/NDJSON streams
+    as soon as its details are in, and progress is saved after every search.
+    A checkpoint left by an interrupted run is resumed: finished searches are
+    skipped and only the places still missing details are requested again.
+
+    With a ScrapeMetrics, every request that reaches the API is timed,
+    priced and attributed to the search that caused it (see places_metrics).
     """
 
-    if not api_key:
-        print("❌ No API key found in .env file")
-        return []
+    if client is None:
+        if not api_key:
+            print("❌ No API key found in .env file")
+            return []
 
-    try:
-        gmaps = googlemaps.Client(key=api_key, timeout=10)
-    except Exception as e:
-        print(f"❌ Failed to initialize Google Maps client: {e}")
-        print("   Make sure your API key is valid.")
-        return []
+        if googlemaps is None:
+            print("❌ googlemaps is not installed (pip install googlemaps)")
+            return []
 
+        try:
+            client = googlemaps.Client(key=api_key, timeout=10)
+        except Exception as e:
+            print(f"❌ Failed to initialize Google Maps client: {e}")
+            print("   Make sure your API key is valid.")
+            return []
+
+    if metrics is not None:
+        # Innermost, so cache hits and rate-limit waits are not counted
+        client = InstrumentedClient(client, metrics)
+    limited = RateLimitedClient(client, TokenBucket(qps))
+    gmaps = CachedPlacesClient(limited, cache) if cache is not None else limited
+    coverage = CoverageEngine(gmaps, MAZUNTE_CENTER, SEARCH_RADIUS, max_depth=max_depth,
+                              page_delay=page_delay, exhaustive=exhaustive)
+
+    completed = set()
     all_places = []
-    seen_place_ids = set()  # Avoid duplicates
+    pending = deque()  # (place, category, future) in first-seen order
+    lock = threading.Lock()
 
     print("🔍 Starting Mazunte landmark search...\n")
     print(f"📍 Center: {MAZUNTE_CENTER}")
-    print(f"📏 Radius: {SEARCH_RADIUS}m\n")
-
-    for i, search in enumerate(SEARCHES, 1):
-        search_name = search.get('name', 'Unknown')
-        print(f"[{i}/{len(SEARCHES)}] Searching: {search_name}...", end=" ", flush=True)
-
+    print(f"📏 Radius: {SEARCH_RADIUS}m")
+    print(f"⚡ Details workers: {workers}, rate limit: {qps:g} req/s\n")
+
+    if checkpoint is not None:
+        if checkpoint.resumed:
+            coverage.restore(checkpoint.coverage)
+            completed = checkpoint.completed
+            all_places = list(checkpoint.rows)
+            print(f"♻️  Resuming: {len(completed)}/{len(SEARCHES)} searches done, "
+                  f"{len(all_places)} places already saved\n")
+        checkpoint.open()
+
+    def collect(_=None):
+        """Write the finished details at the head of the queue, in submission order."""
+        with lock:
+            while pending and pending[0][2].done() and not pending[0][2].cancelled():
+                place, search_name, future = pending.popleft()
+                try:
+                    details_response = future.result()
+                except Exception as e:
+                    print(f"   ⚠️ Error getting details for {place.get('name')}: {e}")
+                    continue
+                row = build_place_data(details_response.get('result', {}), search_name, place.get('place_id'))
+                all_places.append(row)
+                if checkpoint is not None:
+                    checkpoint.append(row)
+
+    def submit(entries):
+        for place, search_name in entries:
+            if metrics is not None:
+                metrics.attribute(place.get('place_id'), search_name)
+            future = pool.submit(gmaps.place, place.get('place_id'), fields=DETAILS_FIELDS)
+            with lock:
+                pending.append((place, search_name, future))
+            # Rows are written as soon as they are next in line, from whichever thread finishes
+            future.add_done_callback(collect)
+
+    def save_checkpoint(new_entries=()):
+        if checkpoint is None:
+            return
+        with lock:
+            waiting = [(place, search_name) for place, search_name, _ in pending]
+            checkpoint.save(completed, coverage.state(), [
+                {'place_id': place.get('place_id'), 'name': place.get('name'), 'category': search_name}
+                for place, search_name in waiting + list(new_entries)
+            ])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
         try:
-            # Remove 'name' from search dict before passing to API
-            search_params = {k: v for k, v in search.items() if k != 'name'}
-            search_params['location'] = MAZUNTE_CENTER
-            search_params['radius'] = SEARCH_RADIUS
-
-            # Make the nearby search request
-            response = gmaps.places_nearby(**search_params)
+            if checkpoint is not None:
+                submit([(entry, entry['category']) for entry in checkpoint.pending()])
 
-            places_found = len(response.get('results', []))
-            new_places = 0
-
-            # Extract place data
-            for place in response.get('results', []):
-                place_id = place.get('place_id')
-
-                # Skip if already added
-                if place_id in seen_place_ids:
+            for i, search in enumerate(SEARCHES, 1):
+                search_name = search.get('name', 'Unknown')
+                if i in completed:
+                    print(f"[{i}/{len(SEARCHES)}] {search_name}: done before the restart")
                     continue
+                print(f"[{i}/{len(SEARCHES)}] Searching: {search_name}...", end=" ", flush=True)
+                snapshot = coverage.state()
+                if metrics is not None:
+                    metrics.current_search = search_name
+                new_entries = []
 
-                seen_place_ids.add(place_id)
-                new_places += 1
-
-                # Get detailed information
                 try:
-                    details_response = gmaps.place(
-                        place_id=place_id,
-                        fields=[
-                            'name', 'formatted_address', 'geometry',
-                            'formatted_phone_number', 'international_phone_number',
-                            'website', 'rating', 'user_ratings_total',
-                            'opening_hours', 'price_level', 'type', 'url'
-                        ]
-                    )
-
-                    result = details_response.get('result', {})
-
-                    place_data = {
-                        'name': result.get('name', 'N/A'),
-                        'category': search_name,
-                        'latitude': result.get('geometry', {}).get('location', {}).get('lat', 'N/A'),
-                        'longitude': result.get('geometry', {}).get('location', {}).get('lng', 'N/A'),
-                        'address': result.get('formatted_address', 'N/A'),
-                        'phone': result.get('formatted_phone_number', result.get('international_phone_number', 'N/A')),
-                        'website': result.get('website', 'N/A'),
-                        'google_maps_url': result.get('url', 'N/A'),
-                        'rating': result.get('rating', 'N/A'),
-                        'review_count': result.get('user_ratings_total', 'N/A'),
-                        'price_level': format_price_level(result.get('price_level')),
-                        'hours': format_hours(result.get('opening_hours', {})),
-                        'open_now': result.get('opening_hours', {}).get('open_now', 'Unknown'),
-                        'types': ', '.join(result.get('type', [])),
-                        'place_id': place_id,
-                    }
-
-                    all_places.append(place_data)
+                    # Remove 'name' from search dict before passing to API
+                    search_params = {k: v for k, v in search.items() if k != 'name'}
+
+                    # Cover the search area; only places no earlier search returned come back
+                    new_places = coverage.search(search_params, name=search_name)
+                    term = coverage.terms[-1]
+                    new_entries = [(place, search_name) for place in new_places]
+                    completed.add(i)
+
+                    if term['skipped']:
+                        print("Skipped (same search as before)")
+                    else:
+                        split = f", {term['splits']} splits" if term['splits'] else ""
+                        print(f"Found {term['results']} ({len(new_places)} new) "
+                              f"[{term['queries']} queries{split}]")
 
                 except Exception as e:
-                    print(f"   ⚠️ Error getting details for {place.get('name')}: {e}")
-
-            print(f"Found {places_found} ({new_places} new)")
+                    print(f"❌ Error: {e}")
+                    # Forget the half-covered search: its places were never queued for details,
+                    # so a later search (or a resumed run) must still see them as new
+                    coverage.restore(snapshot)
+
+                # Checkpoint before queueing details, so every row written later is for a place it lists
+                save_checkpoint(new_entries)
+                submit(new_entries)
+
+            print(f"\n⏳ Collecting details for {len(pending)} places...")
+            while True:
+                with lock:
+                    if not pending:
+                        break
+                    head = pending[0][2]
+                wait([head])
+                collect()
+            save_checkpoint()
+        except BaseException:
+            # Don't spend quota on details nobody will write; the checkpoint lists them as pending
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    print_coverage_summary(coverage.summary(), limited.calls, len(all_places))
+    if metrics is not None:
+        metrics.record_coverage(coverage.terms, len(all_places))
+    return all_places
 
-        except Exception as e:
-            print(f"❌ Error: {e}")
 
-    return all_places
+def print_coverage_summary(summary, calls, places):
+    """Print request counts and the API calls spent per unique place"""
+    total = calls['places_nearby'] + calls['place']
+    print(f"\n📡 API calls: {calls['places_nearby']} nearby + {calls['place']} details = {total}")
+    print(f"   {summary['queries']} tile queries, {summary['splits']} splits, "
+          f"{summary['skipped_terms']} searches skipped")
+    if places:
+        print(f"   {total / places:.2f} calls per unique place "
+              f"({calls['places_nearby'] / places:.2f} for discovery)")
+
+
+def build_place_data(result, category, place_id):
+    """Flatten a place-details result into one output row"""
+    return {
+        'name': result.get('name', 'N/A'),
+        'category': category,
+        'latitude': result.get('geometry', {}).get('location', {}).get('lat', 'N/A'),
+        'longitude': result.get('geometry', {}).get('location', {}).get('lng', 'N/A'),
+        'address': result.get('formatted_address', 'N/A'),
+        'phone': result.get('formatted_phone_number', result.get('international_phone_number', 'N/A')),
+        'website': result.get('website', 'N/A'),
+        'google_maps_url': result.get('url', 'N/A'),
+        'rating': result.get('rating', 'N/A'),
+        'review_count': result.get('user_ratings_total', 'N/A'),
+        'price_level': format_price_level(result.get('price_level')),
+        'hours': format_hours(result.get('opening_hours', {})),
+        'open_now': result.get('opening_hours', {}).get('open_now', 'Unknown'),
+        'types': ', '.join(result.get('type', [])),
+        'place_id': place_id,
+    }
 
 
 # ============================================
@@ -203,41 +345,14 @@ def format_hours(opening_hours):
     return "N/A"
 
 
-def save_to_csv(places, filename='Mazunte_Landmarks_Google_API.csv'):
-    """Save places data to CSV file"""
-    if not places:
-        print("❌ No data to save")
-        return False
-
-    try:
-        filepath = OUTPUT_DIR / filename
-
-        fieldnames = [
-            'name', 'category', 'latitude', 'longitude', 'address',
-            'phone', 'website', 'google_maps_url', 'rating', 'review_count',
-            'price_level', 'hours', 'open_now', 'types', 'place_id'
-        ]
-
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(places)
-
-        print(f"✅ Saved {len(places)} places to {filepath}")
-        return True
-    except Exception as e:
-        print(f"❌ Error saving to CSV: {e}")
-        return False
-
-
-def save_to_json(places, filename='Mazunte_Landmarks_Google_API.json'):
+def save_to_json(places, filename='Mazunte_Landmarks_Google_API.json', output_dir=OUTPUT_DIR):
     """Save places data to JSON file"""
     if not places:
         print("❌ No data to save")
         return False
 
     try:
-        filepath = OUTPUT_DIR / filename
+        filepath = Path(output_dir) / filename
 
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(places, f, indent=2, ensure_ascii=False)
@@ -312,15 +427,91 @@ def print_sample(places, count=5):
 # ============================================
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scrape Mazunte landmarks from the Google Places API.')
+    parser.add_argument('--workers', type=int, default=DETAILS_WORKERS,
+                        help=f'Concurrent place-details requests (default {DETAILS_WORKERS})')
+    parser.add_argument('--qps', type=float, default=MAX_QPS,
+                        help=f'Max Places requests per second, 0 for unlimited (default {MAX_QPS:g})')
+    parser.add_argument('--fake', action='store_true',
+                        help='Use the offline FakePlacesClient instead of the real API')
+    parser.add_argument('--fake-latency', type=float, default=0.05,
+                        help='Seconds of latency per fake request (default 0.05)')
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH,
+                        help=f'How many times a saturated area may be split (default {MAX_DEPTH})')
+    parser.add_argument('--exhaustive', action='store_true',
+                        help='Split every saturated area, even where earlier searches found everything')
+    parser.add_argument('--fake-error-rate', type=float, default=0.0,
+                        help='Share of fake requests that fail with a transient error (default 0)')
+    parser.add_argument('--fake-places', type=int, default=400,
+                        help='Number of places in the fake backend (default 400)')
+    parser.add_argument('--cache', default=str(CACHE_PATH),
+                        help=f'Response cache database (default {CACHE_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the API')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Ignore cached responses but store the fresh ones')
+    parser.add_argument('--cache-ttl-days', type=float,
+                        help='Override the TTL for all cached responses (days)')
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='Evict least recently used responses beyond this size')
+    parser.add_argument('--output-dir', help=f'Where to save results (default {OUTPUT_DIR}; '
+                                             'fake runs only save when this is set)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore the checkpoint of an interrupted run and start over')
+    args = parser.parse_args()
+
     print("\n" + "="*70)
     print("🌴 MAZUNTE LANDMARKS SCRAPER - Google Places API")
     print("="*70 + "\n")
 
+    client = None
+    if args.fake:
+        client = FakePlacesClient(MAZUNTE_CENTER, count=args.fake_places, latency=args.fake_latency,
+                                  error_rate=args.fake_error_rate)
+        print(f"🧪 Using fake Places client ({args.fake_latency}s latency)\n")
+    output_dir = Path(args.output_dir) if args.output_dir else (None if args.fake else OUTPUT_DIR)
+
+    cache = None
+    if not args.no_cache:
+        ttls = None
+        if args.cache_ttl_days is not None:
+            ttls = {'nearby': args.cache_ttl_days * DAY, 'details': args.cache_ttl_days * DAY}
+        cache = PlacesCache(args.cache, ttls=ttls, max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                            refresh=args.refresh_cache)
+
+    checkpoint = None
+    if output_dir is not None:
+        # A checkpoint only resumes a run with the same searches and coverage settings
+        config = {
+            'searches': SEARCHES, 'center': MAZUNTE_CENTER, 'radius': SEARCH_RADIUS,
+            'max_depth': args.max_depth, 'exhaustive': args.exhaustive,
+            'client': f'fake:{args.fake_places}' if args.fake else 'google',
+        }
+        checkpoint = ScrapeCheckpoint(output_dir, OUTPUT_BASENAME, CSV_FIELDS, config, restart=args.restart)
+
     # Run scraper
-    places = scrape_mazunte_places(API_KEY)
+    metrics = ScrapeMetrics()
+    cache_summary = None
+    started = datetime.now()
+    try:
+        places = scrape_mazunte_places(API_KEY, client=client, workers=args.workers, qps=args.qps,
+                                       cache=cache, max_depth=args.max_depth,
+                                       # Fake page tokens are valid immediately
+                                       page_delay=0 if args.fake else PAGE_TOKEN_DELAY,
+                                       exhaustive=args.exhaustive, checkpoint=checkpoint,
+                                       metrics=metrics)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if cache is not None:
+            cache_summary = cache.summary()
+            print_cache_summary(cache_summary)
+            cache.close()
+    report = metrics.report(cache=cache_summary)
+    print_metrics_summary(report)
+    elapsed = (datetime.now() - started).total_seconds()
 
     if places:
-        print(f"\n✅ Successfully scraped {len(places)} unique places!\n")
+        print(f"\n✅ Successfully scraped {len(places)} unique places in {elapsed:.1f}s!\n")
 
         # Display summary
         print_summary(places)
@@ -328,14 +519,21 @@ if __name__ == '__main__':
         # Display sample
         print_sample(places, count=10)
 
-        # Save to files
-        print("\n💾 Saving data...")
-        save_to_csv(places)
-        save_to_json(places)
-
-        print(f"\n✨ Done! Files saved to: {OUTPUT_DIR}")
-        print("   • Mazunte_Landmarks_Google_API.csv")
-        print("   • Mazunte_Landmarks_Google_API.json")
-        print("\n   You can now use these in Google Maps, Excel, or any app.\n")
+        if output_dir is None:
+            print("\n🧪 Fake run: nothing saved (pass --output-dir to keep the results)\n")
+        else:
+            # The CSV and NDJSON were streamed during the run; move them into place
+            print("\n💾 Saving data...")
+            checkpoint.finish()
+            print(f"✅ Saved {len(places)} places to {checkpoint.csv_path} and {checkpoint.ndjson_path.name}")
+            save_to_json(places, filename=f'{OUTPUT_BASENAME}.json', output_dir=output_dir)
+            write_report(report, output_dir / f'{OUTPUT_BASENAME}.metrics.json')
+
+            print(f"\n✨ Done! Files saved to: {output_dir}")
+            print(f"   • {OUTPUT_BASENAME}.csv")
+            print(f"   • {OUTPUT_BASENAME}.ndjson")
+            print(f"   • {OUTPUT_BASENAME}.json")
+            print(f"   • {OUTPUT_BASENAME}.metrics.json (request metrics and cost estimate)")
+            print("\n   You can now use these in Google Maps, Excel, or any app.\n")
     else:
         print("\n❌ No places found. Check your API key and internet connection.\n")
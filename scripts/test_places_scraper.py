@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Tests for the Google Places scraper, run against FakePlacesClient so they
+need no API key, network or quota.
+
+USAGE: python3 -m pytest scripts
+"""
+
+import importlib.util
+import json
+import threading
+import time
+from pathlib import Path
+
+from places_cache import PlacesCache
+from places_checkpoint import ScrapeCheckpoint
+from places_client import PAGE_SIZE, FakePlacesClient, RateLimitedClient, TokenBucket, distance_m
+from places_coverage import MAX_RESULTS, CoverageEngine
+from places_metrics import ScrapeMetrics, write_report
+
+# The scraper's file name is not a valid module name, so load it by path
+_spec = importlib.util.spec_from_file_location('scrape_mazunte_google',
+                                               Path(__file__).parent / 'scrape-mazunte-google.py')
+scraper = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scraper)
+
+# API calls a cold run makes against the default fake backend: nearby pages plus one details call per place
+COLD_RUN_CALLS = 415
+
+
+def fake_client(**kwargs) -> FakePlacesClient:
+    return FakePlacesClient(scraper.MAZUNTE_CENTER, latency=kwargs.pop('latency', 0), **kwargs)
+
+
+def run_scraper(client, **kwargs):
+    """Run one scrape without rate limiting or page-token delays."""
+    return scraper.scrape_mazunte_places(None, client=client, qps=0, page_delay=0, **kwargs)
+
+
+def run_to_csv(client, output_dir, **kwargs) -> bytes:
+    """Run one scrape that streams to output_dir and return the finished CSV."""
+    checkpoint = ScrapeCheckpoint(output_dir, scraper.OUTPUT_BASENAME, scraper.CSV_FIELDS, {'test': True})
+    run_scraper(client, checkpoint=checkpoint, **kwargs)
+    checkpoint.finish()
+    return checkpoint.csv_path.read_bytes()
+
+
+# ============================================
+# RATE LIMITER
+# ============================================
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # The first token is free, the other ten cost 1/50 s each
+    assert time.monotonic() - started >= 0.18
+    assert bucket.waited > 0
+
+
+def test_token_bucket_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate=0)
+    for _ in range(1000):
+        bucket.acquire()
+    assert bucket.waited == 0
+
+
+def test_rate_limited_client_counts_concurrent_calls():
+    client = fake_client()
+    limited = RateLimitedClient(client, TokenBucket(rate=0))
+    place_ids = [place['place_id'] for place in client.places]
+
+    def fetch(ids):
+        for place_id in ids:
+            limited.place(place_id, fields=['name'])
+
+    threads = [threading.Thread(target=fetch, args=(place_ids[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limited.calls == {'places_nearby': 0, 'place': len(place_ids)}
+    assert limited.calls == client.calls
+
+
+# ============================================
+# CONCURRENT DETAILS
+# ============================================
+
+def test_cold_run_call_count():
+    client = fake_client()
+    places = run_scraper(client)
+    assert client.calls['place'] == len(places)
+    assert client.calls['places_nearby'] + client.calls['place'] == COLD_RUN_CALLS
+
+
+def test_rows_keep_first_seen_order_under_concurrency():
+    serial = run_scraper(fake_client(), workers=1)
+    # Jittered latency makes details responses arrive out of order
+    concurrent = run_scraper(fake_client(latency=0.002), workers=8)
+    assert concurrent == serial
+    assert len({row['place_id'] for row in serial}) == len(serial)
+
+
+# ============================================
+# RESPONSE CACHE
+# ============================================
+
+def test_warm_cache_run_makes_no_calls(tmp_path):
+    with PlacesCache(tmp_path / 'cache.sqlite') as cache:
+        cold_client = fake_client()
+        cold = run_to_csv(cold_client, tmp_path / 'cold', cache=cache)
+    with PlacesCache(tmp_path / 'cache.sqlite') as cache:
+        warm_client = fake_client()
+        warm = run_to_csv(warm_client, tmp_path / 'warm', cache=cache)
+        summary = cache.summary()
+
+    assert sum(cold_client.calls.values()) == COLD_RUN_CALLS
+    assert warm_client.calls == {'places_nearby': 0, 'place': 0}
+    assert summary['entries'] > 0
+    assert warm == cold
+
+
+def test_cached_run_writes_the_uncached_csv(tmp_path):
+    uncached = run_to_csv(fake_client(), tmp_path / 'uncached')
+    with PlacesCache(tmp_path / 'cache.sqlite') as cache:
+        cached = run_to_csv(fake_client(), tmp_path / 'cached', cache=cache)
+    assert cached == uncached
+
+
+# ============================================
+# COVERAGE ENGINE
+# ============================================
+
+def coverage_engine(client, **kwargs) -> CoverageEngine:
+    return CoverageEngine(client, scraper.MAZUNTE_CENTER, scraper.SEARCH_RADIUS, page_delay=0, **kwargs)
+
+
+def places_in_radius(client):
+    return {
+        place['place_id'] for place in client.places
+        if distance_m(scraper.MAZUNTE_CENTER, tuple(place['geometry']['location'].values())) <= scraper.SEARCH_RADIUS
+    }
+
+
+def test_coverage_follows_pagination():
+    client = fake_client()
+    engine = coverage_engine(client, max_depth=0)
+    assert len(engine.search({})) == MAX_RESULTS
+    assert client.calls['places_nearby'] == MAX_RESULTS // PAGE_SIZE
+
+
+def test_coverage_splits_saturated_areas_until_complete():
+    client = fake_client()
+    engine = coverage_engine(client)
+    found = engine.search({}, name='everything')
+    assert {place['place_id'] for place in found} == places_in_radius(client)
+    term = engine.terms[-1]
+    assert term['splits'] > 0 and term['queries'] > 1
+    assert engine.summary()['unique_places'] == len(found)
+
+
+def test_coverage_skips_repeated_searches_and_known_places():
+    client = fake_client()
+    engine = coverage_engine(client)
+    everything = engine.search({})
+    calls = dict(client.calls)
+
+    assert engine.search({}) == []
+    assert engine.terms[-1]['skipped']
+    assert client.calls == calls
+
+    # A narrower term only finds places the first one already returned
+    assert engine.search({'type': 'restaurant'}) == []
+    assert engine.terms[-1]['results'] > 0
+    assert len(engine.seen) == len(everything)
+
+
+def test_coverage_state_round_trip():
+    first = coverage_engine(fake_client())
+    first.search({'type': 'cafe'})
+    resumed = coverage_engine(fake_client())
+    resumed.restore(first.state())
+    fresh = coverage_engine(fake_client())
+    fresh.search({'type': 'cafe'})
+
+    assert resumed.search({'type': 'bar'}) == fresh.search({'type': 'bar'})
+    assert resumed.summary() == fresh.summary()
+
+
+# ============================================
+# REQUEST METRICS
+# ============================================
+
+def test_metrics_match_the_calls_made(tmp_path):
+    client = fake_client()
+    metrics = ScrapeMetrics()
+    places = run_scraper(client, metrics=metrics)
+    report = metrics.report()
+
+    for endpoint, calls in client.calls.items():
+        assert report['endpoints'][endpoint]['calls'] == calls
+        assert report['endpoints'][endpoint]['latency']['count'] == calls
+    # Every call is attributed to the search that caused it
+    assert sum(search['nearby_calls'] for search in report['searches']) == client.calls['places_nearby']
+    assert sum(search['details_calls'] for search in report['searches']) == client.calls['place']
+    assert sum(search['new'] for search in report['searches']) == len(places) == report['places']
+    assert all(search['new'] + search['duplicates'] == search['results'] for search in report['searches'])
+    assert report['cost']['total_usd'] > 0
+
+    write_report(report, tmp_path / 'metrics.json')
+    assert json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))['places'] == len(places)
+
+
+def test_metrics_count_failed_requests():
+    client = fake_client(error_rate=0.05)
+    metrics = ScrapeMetrics()
+    run_scraper(client, metrics=metrics)
+    report = metrics.report()
+    endpoints = report['endpoints']
+
+    assert sum(stats['calls'] for stats in endpoints.values()) == sum(client.calls.values())
+    assert endpoints['place']['errors'] > 0
+    assert endpoints['place']['statuses']['EXCEPTION'] == endpoints['place']['errors']
+    assert sum(search['details_failed'] for search in report['searches']) == endpoints['place']['errors']
+
+
+def test_metrics_skip_cached_responses(tmp_path):
+    with PlacesCache(tmp_path / 'cache.sqlite') as cache:
+        run_scraper(fake_client(), cache=cache)
+        metrics = ScrapeMetrics()
+        run_scraper(fake_client(), cache=cache, metrics=metrics)
+    report = metrics.report()
+    assert all(stats['calls'] == 0 for stats in report['endpoints'].values())
+    assert report['cost']['total_usd'] == 0